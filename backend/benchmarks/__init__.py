@@ -0,0 +1 @@
+"""Benchmarks für das Backend (Aufruf mit `python -m benchmarks.<name>` aus backend/)."""
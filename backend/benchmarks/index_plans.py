@@ -0,0 +1,197 @@
+"""
+Vergleicht die Query-Pläne der häufigsten Abfragen auf evaluations und
+round_analysis ohne und mit den Indizes aus migrations/versions/add_query_indexes.py.
+
+Die Daten werden mit generate_series in einem eigenen Schema erzeugt, das mit
+der Transaktion wieder verworfen wird; die eigentlichen Tabellen werden nicht
+angefasst. Benötigt PostgreSQL 15+.
+
+    python -m benchmarks.index_plans --cases 200 --users 20 --criteria 10 --technologies 8 --rounds 3
+    python -m benchmarks.index_plans --json results/index_plans.json
+"""
+import argparse
+import json
+import os
+
+from sqlalchemy import create_engine, text
+
+from config.config import Config
+
+SCHEMA = f"bench_index_plans_{os.getpid()}"
+
+TABLES = [
+    """
+    CREATE TABLE evaluations (
+        id serial PRIMARY KEY,
+        case_id integer NOT NULL,
+        round integer NOT NULL,
+        user_id integer NOT NULL,
+        criterion_id integer NOT NULL,
+        technology_id integer,
+        score numeric(5,2) NOT NULL,
+        created_at timestamp DEFAULT now(),
+        needs_reevaluation boolean DEFAULT false,
+        fuzzy_vector_a double precision DEFAULT 0,
+        fuzzy_vector_b double precision DEFAULT 0,
+        fuzzy_vector_c double precision DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE round_analysis (
+        id serial PRIMARY KEY,
+        case_id integer NOT NULL,
+        round_number integer NOT NULL,
+        created_at timestamp DEFAULT now(),
+        passed_analysis boolean NOT NULL,
+        mean_distance_value double precision NOT NULL
+    )
+    """,
+]
+
+# Muss mit add_query_indexes übereinstimmen
+INDEXES = [
+    "CREATE INDEX ix_evaluations_case_round_cell ON evaluations (case_id, round, criterion_id, technology_id)",
+    """ALTER TABLE evaluations ADD CONSTRAINT uq_evaluations_user_cell
+       UNIQUE NULLS NOT DISTINCT (case_id, user_id, round, criterion_id, technology_id)""",
+    "CREATE INDEX ix_evaluations_needs_reevaluation ON evaluations (case_id, round, user_id) WHERE needs_reevaluation",
+    "ALTER TABLE round_analysis ADD CONSTRAINT uq_round_analysis_case_round UNIQUE (case_id, round_number)",
+]
+
+# Abfragen der Hot Paths (Analyse, Ergebnisansicht, Bewertungsformular, Neubewertung)
+QUERIES = {
+    "cell_evaluations": """
+        SELECT user_id, score, fuzzy_vector_a, fuzzy_vector_b, fuzzy_vector_c FROM evaluations
+        WHERE case_id = :case_id AND round = :round AND criterion_id = :criterion_id AND technology_id = :technology_id
+    """,
+    "round_aggregate": """
+        SELECT criterion_id, technology_id, avg(fuzzy_vector_a), avg(fuzzy_vector_b), avg(fuzzy_vector_c)
+        FROM evaluations WHERE case_id = :case_id AND round = :round
+        GROUP BY criterion_id, technology_id
+    """,
+    "user_round": """
+        SELECT criterion_id, technology_id, score FROM evaluations
+        WHERE case_id = :case_id AND user_id = :user_id AND round = :round
+    """,
+    "needs_reevaluation": """
+        SELECT user_id, criterion_id, technology_id FROM evaluations
+        WHERE case_id = :case_id AND round = :round AND needs_reevaluation
+    """,
+    "round_analysis": """
+        SELECT passed_analysis, mean_distance_value FROM round_analysis
+        WHERE case_id = :case_id AND round_number = :round
+    """,
+}
+
+
+def seed(conn, args):
+    """Erzeugt alle Bewertungen aller Runden (Kriterien plus Matrix) und die Rundenanalysen."""
+    # technology_id 0 steht für eine reine Kriterienbewertung (wird zu NULL)
+    conn.execute(text("""
+        INSERT INTO evaluations (case_id, round, user_id, criterion_id, technology_id, score,
+                                 needs_reevaluation, fuzzy_vector_a, fuzzy_vector_b, fuzzy_vector_c)
+        SELECT c, r, u, k, NULLIF(t, 0), s, random() < :reevaluation_share,
+               greatest((s - 2) / 6.0, 0), (s - 1) / 6.0, least(s / 6.0, 1)
+        FROM (
+            SELECT c, r, u, k, t, 1 + floor(random() * 7)::int AS s
+            FROM generate_series(1, :cases) c,
+                 generate_series(1, :rounds) r,
+                 generate_series(1, :users) u,
+                 generate_series(1, :criteria) k,
+                 generate_series(0, :technologies) t
+        ) scores
+    """), {
+        "cases": args.cases, "rounds": args.rounds, "users": args.users,
+        "criteria": args.criteria, "technologies": args.technologies,
+        "reevaluation_share": args.reevaluation_share,
+    })
+    conn.execute(text("""
+        INSERT INTO round_analysis (case_id, round_number, passed_analysis, mean_distance_value)
+        SELECT c, r, r = :rounds, random() FROM generate_series(1, :cases) c, generate_series(1, :rounds) r
+    """), {"cases": args.cases, "rounds": args.rounds})
+    conn.execute(text("ANALYZE evaluations"))
+    conn.execute(text("ANALYZE round_analysis"))
+
+
+def _scan_nodes(plan):
+    """Alle Scan-Knoten des Plans (z. B. 'Seq Scan', 'Index Scan using ix_...')."""
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        label = plan["Node Type"]
+        if plan.get("Index Name"):
+            label += f" using {plan['Index Name']}"
+        nodes.append(label)
+    for child in plan.get("Plans", []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+def explain(conn, params, repeat):
+    """Führt EXPLAIN ANALYZE für alle Abfragen aus (bestes von `repeat` Läufen)."""
+    results = {}
+    for name, sql in QUERIES.items():
+        best = None
+        for _ in range(repeat):
+            plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), params).scalar_one()
+            if best is None or plan[0]["Execution Time"] < best[0]["Execution Time"]:
+                best = plan
+        root = best[0]["Plan"]
+        results[name] = {
+            "execution_ms": round(best[0]["Execution Time"], 3),
+            "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+            "scans": _scan_nodes(root),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", Config.SQLALCHEMY_DATABASE_URI))
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--criteria", type=int, default=10)
+    parser.add_argument("--technologies", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--reevaluation-share", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    params = {
+        "case_id": max(args.cases // 2, 1), "round": max(args.rounds - 1, 1),
+        "user_id": max(args.users // 2, 1), "criterion_id": 1, "technology_id": 1,
+    }
+
+    # Alles läuft in einer Transaktion, die am Ende verworfen wird (inkl. Schema)
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+        for ddl in TABLES:
+            conn.execute(text(ddl))
+        seed(conn, args)
+        rows = conn.execute(text("SELECT count(*) FROM evaluations")).scalar()
+        before = explain(conn, params, args.repeat)
+        for ddl in INDEXES:
+            conn.execute(text(ddl))
+        conn.execute(text("ANALYZE evaluations"))
+        conn.execute(text("ANALYZE round_analysis"))
+        after = explain(conn, params, args.repeat)
+        conn.rollback()
+
+    print(f"{rows} evaluations, parameters {params}\n")
+    print(f"{'query':<20} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'buffers':>15}  plan after")
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        speedup = b["execution_ms"] / a["execution_ms"] if a["execution_ms"] else float("inf")
+        buffers = f"{b['buffers']} -> {a['buffers']}"
+        print(f"{name:<20} {b['execution_ms']:>10.3f} {a['execution_ms']:>10.3f} {speedup:>7.1f}x "
+              f"{buffers:>15}  {', '.join(a['scans'])}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"rows": rows, "parameters": params, "before": before, "after": after}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
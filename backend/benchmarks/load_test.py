@@ -0,0 +1,337 @@
+"""
+Lasttest einer kompletten Delphi-Runde gegen ein laufendes Backend (z. B.
+docker compose up oder gunicorn --config gunicorn.conf.py wsgi:app).
+
+Simuliert den Abgabeschluss einer Runde: der Master legt die Experten (über
+/admin/users/bulk) und die Cases an, danach arbeiten alle Experten parallel
+den Ablauf des Frontends ab – Login, Case laden, Bewertungen speichern,
+Neubewertungen abrufen. Währenddessen fragt der Master die Übersicht ab und
+analysiert anschließend die Runde. Fällt ein Case durch, bewerten die
+markierten Experten in Runde 2 neu (näher am Konsens) und der Master
+analysiert erneut.
+
+    python -m benchmarks.load_test --base-url http://localhost:9000 --experts 50
+    python -m benchmarks.load_test --experts 200 --cases 3 --concurrency 50 --json results/load.json
+
+Ausgabe: Durchsatz pro Phase sowie Anzahl, Fehlerquote und p50/p95/p99 pro
+Endpoint. Die angelegten Cases und Benutzer werden am Ende wieder gelöscht
+(--keep behält sie). Exit-Code 1, wenn die Fehlerquote über --max-error-rate
+liegt.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.workload import DISAGREEMENT, FUZZY_SCALE, MASTER, USER_PASSWORD
+
+
+class Recorder:
+    """Sammelt Dauer und Ergebnis aller Requests (threadsicher)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []  # (Phase, Endpoint, ms, ok)
+        self.phase = None
+
+    def add(self, endpoint, elapsed_ms, ok):
+        with self.lock:
+            self.samples.append((self.phase, endpoint, elapsed_ms, ok))
+
+
+class Client:
+    """
+    HTTP-Client eines simulierten Benutzers. Die JWT-Cookies sind als Secure
+    markiert und würden über HTTP nicht mitgeschickt – sie werden deshalb nach
+    dem Login als Cookie-Header gesetzt, zusammen mit dem CSRF-Token.
+    """
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.user = None
+
+    def request(self, endpoint, method, path, body=None):
+        """Führt einen Request aus und misst ihn unter dem Namen endpoint; None bei Verbindungsfehlern."""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.recorder.add(endpoint, (time.perf_counter() - start) * 1000, False)
+            print(f"ERROR: {method} {path}: {e}")
+            return None
+        ok = response.status_code < 400
+        self.recorder.add(endpoint, (time.perf_counter() - start) * 1000, ok)
+        if not ok:
+            print(f"ERROR: {method} {path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def login(self, username, password):
+        response = self.request("POST /auth/login", "POST", "/auth/login", {"username": username, "password": password})
+        if response is None or response.status_code != 200:
+            return False
+        cookies = {cookie.name: cookie.value for cookie in response.cookies}
+        self.session.cookies.clear()
+        self.session.headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+        self.session.headers["X-CSRF-TOKEN"] = cookies.get("csrf_access_token", "")
+        self.user = response.json()["user"]
+        return True
+
+
+def percentile(sorted_values, p):
+    """Perzentil nach dem Nearest-Rank-Verfahren."""
+    return sorted_values[max(0, math.ceil(len(sorted_values) * p / 100) - 1)]
+
+
+def fuzzy_evaluation(rng, user_id, round_number, criterion_id, technology_id, consensus, spread):
+    score = min(7, max(1, round(rng.gauss(consensus, spread))))
+    a, b, c = FUZZY_SCALE[score]
+    return {
+        "user_id": user_id, "round": round_number, "criterion_id": criterion_id, "technology_id": technology_id,
+        "score": score, "fuzzy_vector": {"a": a, "b": b, "c": c},
+    }
+
+
+def setup(master, args, run_id):
+    """Legt die Experten und Cases an; gibt die Experten (Username, ID) und die Case-IDs zurück."""
+    experts = []
+    usernames = [f"loadtest-{run_id}-{i}@example.com" for i in range(args.experts)]
+    for start in range(0, len(usernames), 1000):
+        response = master.request("POST /admin/users/bulk", "POST", "/admin/users/bulk", {"users": [
+            {"username": username, "password": USER_PASSWORD} for username in usernames[start:start + 1000]
+        ]})
+        if response is None or response.status_code != 201:
+            raise RuntimeError("Could not create the experts")
+        experts += [(row["user"]["username"], row["user"]["id"])
+                    for row in response.json()["results"] if row["status"] == "created"]
+
+    case_ids = []
+    for i in range(args.cases):
+        response = master.request("POST /cases/", "POST", "/cases/", {
+            "name": f"Load test {run_id} #{i}", "case_type": "internal",
+            "criteria": [f"Load test criterion {j}" for j in range(args.criteria)],
+            "technologies": [f"Load test technology {j}" for j in range(args.technologies)],
+            "selected_users": [user_id for _, user_id in experts],
+        })
+        if response is None or response.status_code != 201:
+            raise RuntimeError("Could not create the cases")
+        case_ids.append(response.json()["case_id"])
+    return experts, case_ids
+
+
+def expert_round(client, case_ids, round_number, consensus, args, rng):
+    """Ablauf eines Experten in einer Runde; in Runde 2+ nur die markierten Zellen."""
+    user_id = client.user["id"]
+    client.request("GET /cases/assigned/{user_id}", "GET", f"/cases/assigned/{user_id}")
+    for case_id in case_ids:
+        response = client.request("GET /cases/{case_id}", "GET", f"/cases/{case_id}")
+        if response is None or response.status_code != 200:
+            continue
+        case = response.json()
+        reevaluations = client.request(
+            "GET /cases/{case_id}/reevaluations/{user_id}", "GET", f"/cases/{case_id}/reevaluations/{user_id}"
+        )
+        if round_number == 1:
+            cells = [(criterion["id"], technology_id) for criterion in case["criteria"]
+                     for technology_id in [None] + [technology["id"] for technology in case["technologies"]]]
+        elif reevaluations is not None and reevaluations.status_code == 200:
+            cells = [(row["criterion_id"], row["technology_id"]) for row in reevaluations.json()]
+        else:
+            continue
+        if not cells:
+            continue
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+        # Mit jeder Runde nähern sich die Bewertungen dem Konsens an
+        spread = args.spread / round_number
+        client.request("POST /cases/{case_id}/evaluations", "POST", f"/cases/{case_id}/evaluations", {
+            "evaluations": [
+                fuzzy_evaluation(rng, user_id, round_number, criterion_id, technology_id,
+                                 consensus[(case_id, criterion_id, technology_id)], spread)
+                for criterion_id, technology_id in cells
+            ]
+        })
+
+
+def poll_overview(master, stop, interval):
+    """Der Master beobachtet während der Runde die Übersicht."""
+    while not stop.wait(interval):
+        master.request("GET /cases/admin/overview", "GET", "/cases/admin/overview")
+
+
+def run(args):
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    run_id = f"{int(time.time())}-{os.getpid()}"
+    master = Client(args.base_url, recorder, args.timeout)
+    phases = {}
+
+    def phase(name, work):
+        recorder.phase = name
+        start = time.perf_counter()
+        result = work()
+        phases[name] = time.perf_counter() - start
+        print(f"{name}: {phases[name]:.1f} s")
+        return result
+
+    if not master.login(args.master_username, args.master_password):
+        raise RuntimeError("Master login failed")
+    experts, created_case_ids = phase("setup", lambda: setup(master, args, run_id))
+    case_ids = created_case_ids
+    clients = [Client(args.base_url, recorder, args.timeout) for _ in experts]
+    # Konsens pro Zelle; die Kriterien und Technologien kommen aus get_case
+    consensus = defaultdict(lambda: rng.randint(2, 6))
+    for case_id in case_ids:
+        case = master.request("GET /cases/{case_id}", "GET", f"/cases/{case_id}").json()
+        for criterion in case["criteria"]:
+            for technology_id in [None] + [technology["id"] for technology in case["technologies"]]:
+                consensus[(case_id, criterion["id"], technology_id)]
+    seeds = [rng.randrange(2**32) for _ in experts]
+
+    def experts_submit(round_number):
+        stop = threading.Event()
+        poller = threading.Thread(target=poll_overview, args=(master, stop, args.poll_interval), daemon=True)
+        poller.start()
+
+        def work(index):
+            client, (username, _) = clients[index], experts[index]
+            expert_rng = random.Random(seeds[index] + round_number)
+            if args.think_time:
+                time.sleep(expert_rng.uniform(0, args.think_time))
+            if round_number == 1 and not client.login(username, USER_PASSWORD):
+                return
+            expert_round(client, case_ids, round_number, consensus, args, expert_rng)
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(work, range(len(clients))))
+        stop.set()
+        poller.join()
+
+    def analyze(round_number):
+        open_case_ids = []
+        for case_id in case_ids:
+            response = master.request("POST /cases/{case_id}/analyze-round", "POST", f"/cases/{case_id}/analyze-round")
+            if response is not None and response.status_code == 200:
+                result = response.json()
+                print(f"  case {case_id} round {round_number}: passed={result['passed_analysis']} "
+                      f"mean distance={result['mean_distance_value']:.3f}")
+                if not result["passed_analysis"]:
+                    open_case_ids.append(case_id)
+        return open_case_ids
+
+    try:
+        for round_number in range(1, args.rounds + 1):
+            phase(f"round {round_number} submit", lambda: experts_submit(round_number))
+            open_case_ids = phase(f"round {round_number} analyze", lambda: analyze(round_number))
+            if not open_case_ids:
+                break
+            case_ids = open_case_ids
+    finally:
+        if not args.keep:
+            recorder.phase = "cleanup"
+            for case_id in created_case_ids:
+                master.request("DELETE /admin/delete-case/{case_id}", "DELETE", f"/admin/delete-case/{case_id}")
+            for _, user_id in experts:
+                master.request("DELETE /admin/delete-user/{user_id}", "DELETE", f"/admin/delete-user/{user_id}")
+    return recorder.samples, phases
+
+
+def summarize(samples, phases):
+    """Durchsatz pro Phase und Latenzen pro Endpoint (ohne Aufräumen)."""
+    by_endpoint, by_phase = defaultdict(list), defaultdict(list)
+    for phase, endpoint, elapsed_ms, ok in samples:
+        if phase == "cleanup":
+            continue
+        by_endpoint[endpoint].append((elapsed_ms, ok))
+        by_phase[phase].append(ok)
+
+    endpoints = {}
+    for endpoint, values in sorted(by_endpoint.items()):
+        durations = sorted(elapsed_ms for elapsed_ms, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "p50_ms": round(percentile(durations, 50), 2),
+            "p95_ms": round(percentile(durations, 95), 2),
+            "p99_ms": round(percentile(durations, 99), 2),
+            "max_ms": round(durations[-1], 2),
+        }
+    phase_stats = {
+        name: {
+            "seconds": round(seconds, 3),
+            "requests": len(by_phase[name]),
+            "errors": by_phase[name].count(False),
+            "throughput_rps": round(len(by_phase[name]) / seconds, 1) if seconds else 0.0,
+        }
+        for name, seconds in phases.items()
+    }
+    total = sum(stats["requests"] for stats in phase_stats.values())
+    errors = sum(stats["errors"] for stats in phase_stats.values())
+    return {"phases": phase_stats, "endpoints": endpoints, "requests": total, "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0}
+
+
+def report(summary):
+    print(f"\n{'phase':<20} {'seconds':>8} {'requests':>9} {'errors':>7} {'req/s':>8}")
+    for name, stats in summary["phases"].items():
+        print(f"{name:<20} {stats['seconds']:>8.1f} {stats['requests']:>9} {stats['errors']:>7} "
+              f"{stats['throughput_rps']:>8.1f}")
+    print(f"\n{'endpoint':<46} {'requests':>9} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<46} {stats['requests']:>9} {stats['errors']:>7} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+    print(f"(times in ms)\n\n{summary['requests']} requests, error rate {summary['error_rate']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:9000")
+    parser.add_argument("--master-username", default=MASTER["username"])
+    parser.add_argument("--master-password", default=MASTER["password"])
+    parser.add_argument("--experts", type=int, default=50)
+    parser.add_argument("--cases", type=int, default=1)
+    parser.add_argument("--criteria", type=int, default=8, help="Kriterien pro Case")
+    parser.add_argument("--technologies", type=int, default=5, help="Technologien pro Case")
+    parser.add_argument("--rounds", type=int, default=2, help="Höchstens so viele Runden")
+    parser.add_argument("--disagreement", default="medium",
+                        help="low, medium, high oder die Standardabweichung in Likert-Stufen")
+    parser.add_argument("--concurrency", type=int, help="Gleichzeitig aktive Experten (Standard: alle)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Zufällige Pause bis zu so vielen Sekunden vor Login und Abgabe")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Abfrageintervall der Master-Übersicht")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Cases und Benutzer nicht löschen")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON in diese Datei schreiben")
+    args = parser.parse_args()
+    args.concurrency = args.concurrency or args.experts
+    args.spread = DISAGREEMENT[args.disagreement] if args.disagreement in DISAGREEMENT else float(args.disagreement)
+
+    samples, phases = run(args)
+    summary = summarize(samples, phases)
+    report(summary)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"parameters": vars(args), **summary}, f, indent=2)
+
+    if summary["error_rate"] > args.max_error_rate:
+        print(f"\nFAIL: error rate {summary['error_rate']:.2%} above {args.max_error_rate:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Misst den Kaltstart des Backends: Importzeit pro Modul (python -X importtime),
+die Dauer von create_app() und des ersten Requests – jeweils in einem frischen
+Interpreter, wie beim Start eines Workers.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 30 --profile
+    python -m benchmarks.startup --budget-ms 800 --forbid numpy
+
+Das Skript endet mit Exit-Code 1, wenn der Median des Kaltstarts das Budget
+(--budget-ms bzw. STARTUP_BUDGET_MS) überschreitet oder ein Modul aus
+LAZY_MODULES bzw. --forbid bereits beim Start importiert wird
+(Regressionstest für CI).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Schwere Abhängigkeiten, die erst im jeweiligen Codepfad geladen werden (immer geprüft)
+LAZY_MODULES = ["numpy"]
+
+# Läuft im Kindprozess; gibt die Zeiten als JSON auf stdout aus
+_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+if {profile}:
+    import cProfile, io, pstats
+    profiler = cProfile.Profile()
+    app = profiler.runcall(main.create_app)
+else:
+    app = main.create_app()
+created = time.perf_counter()
+app.test_client().get("/__startup_probe__")
+first_request = time.perf_counter()
+result = {{
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (first_request - created) * 1000,
+    "modules": sorted(sys.modules),
+}}
+if {profile}:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats({top})
+    result["profile"] = out.getvalue()
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr):
+    """Liest die Ausgabe von -X importtime: {Modul: (self µs, kumuliert µs, Tiefe)}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def run_once(python, profile, top):
+    code = _CHILD.format(profile=profile, top=top)
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"Startup failed:\n{proc.stderr[-4000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_importtime(proc.stderr)
+    result["total_ms"] = result["import_ms"] + result["create_app_ms"]
+    return result
+
+
+def _is_own_module(name):
+    return name in ("main", "config", "src") or name.startswith(("src.", "config."))
+
+
+def report(runs, top):
+    best = min(runs, key=lambda run: run["total_ms"])
+    imports = best["imports"]
+
+    print(f"{'stage':<20} {'median ms':>10} {'min ms':>10}")
+    for stage in ("import_ms", "create_app_ms", "first_request_ms", "total_ms"):
+        values = [run[stage] for run in runs]
+        print(f"{stage[:-3]:<20} {statistics.median(values):>10.1f} {min(values):>10.1f}")
+
+    # Kumulierte Zeit enthält die vom Paket ausgelösten Importe anderer Pakete
+    print("\nPackages by cumulative import time (fastest run):")
+    packages = sorted(
+        ((name, cumulative) for name, (_, cumulative, _) in imports.items()
+         if "." not in name and not _is_own_module(name)),
+        key=lambda item: item[1], reverse=True,
+    )
+    for name, cumulative in packages[:top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    print("\nBackend modules (self / cumulative ms):")
+    for name, (self_us, cumulative_us, _) in sorted(
+        imports.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        if _is_own_module(name):
+            print(f"  {self_us / 1000:>8.1f} {cumulative_us / 1000:>8.1f}  {name}")
+
+    if best.get("profile"):
+        print("\ncreate_app() profile:")
+        print(best["profile"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20, help="Anzahl der angezeigten Pakete/Funktionen")
+    parser.add_argument("--profile", action="store_true", help="create_app() zusätzlich mit cProfile messen")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", 0)) or None,
+                        help="Maximaler Median für Import + create_app()")
+    parser.add_argument("--forbid", action="append", default=[],
+                        help="Modul, das beim Start nicht importiert werden darf (mehrfach möglich)")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON in diese Datei schreiben")
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args()
+
+    runs = [run_once(args.python, args.profile, args.top) for _ in range(args.runs)]
+    report(runs, args.top)
+
+    failures = []
+    median_total = statistics.median(run["total_ms"] for run in runs)
+    if args.budget_ms and median_total > args.budget_ms:
+        failures.append(f"cold start {median_total:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    loaded = set(runs[0]["modules"])
+    for module in LAZY_MODULES + args.forbid:
+        if module in loaded:
+            failures.append(f"module '{module}' is imported at startup")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({
+                "median_total_ms": median_total,
+                "runs": [{key: value for key, value in run.items() if key not in ("modules", "imports", "profile")}
+                         for run in runs],
+                "imports": runs[0]["imports"],
+            }, f, indent=2)
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"\nOK: cold start {median_total:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark-Suite der zentralen Endpoints auf dem synthetischen Workload
+(benchmarks/workload.py): misst analyze_round, get_cases_overview, get_case,
+save_case_evaluations sowie die Listen assigned und history mit dem
+Flask-Test-Client (Laufzeit inkl. Serialisierung, ohne Netzwerk) und zählt die
+SQL-Statements pro Request.
+
+Ohne --database-url läuft die Suite gegen eine eingebettete SQLite-Datenbank,
+sonst in einem eigenen Schema der angegebenen PostgreSQL-Datenbank, das am Ende
+wieder gelöscht wird. Die Zahlen sind nur innerhalb derselben Datenbank und
+Maschine vergleichbar.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --cases 200 --users 500 --disagreement high --json results/suite.json
+    python -m benchmarks.suite --compare results/suite.json --max-regression 0.25
+
+analyze_round verbraucht pro Messung einen offenen Case (eine Runde lässt sich
+nur einmal analysieren); --repeat ist dort durch die Zahl der offenen Cases
+begrenzt. save_case_evaluations speichert den Bewertungsbogen eines Experten
+aus Runde 1 eines abgeschlossenen Cases erneut.
+
+Exit-Code 1, wenn ein Request nicht mit 2xx antwortet oder – mit --compare –
+ein Median um mehr als --max-regression langsamer ist bzw. ein Endpoint mehr
+SQL-Statements ausführt als in der Baseline.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.workload import add_workload_arguments, benchmark_app, login, seed_workload
+
+
+def evaluation_sheets(app, data, count):
+    """Bewertungsbögen (Runde 1) für save_case_evaluations: (case_id, Body)."""
+    from src.models import Evaluation
+
+    case_ids = data["completed_case_ids"] or data["case_ids"]
+    sheets = []
+    with app.app_context():
+        for i in range(count):
+            case_id = case_ids[i % len(case_ids)]
+            members = data["members"][case_id]
+            user_id = members[(i // len(case_ids)) % len(members)]
+            rows = Evaluation.query.filter_by(case_id=case_id, user_id=user_id, round=1).order_by(Evaluation.id)
+            sheets.append((case_id, {"evaluations": [{
+                "user_id": row.user_id, "round": 1, "criterion_id": row.criterion_id,
+                "technology_id": row.technology_id, "score": float(row.score),
+                "fuzzy_vector": {"a": row.fuzzy_vector_a, "b": row.fuzzy_vector_b, "c": row.fuzzy_vector_c},
+            } for row in rows]}))
+    return sheets
+
+
+def benchmarks_for(app, data, args):
+    """
+    Die Benchmarks in Ausführungsreihenfolge (lesende zuerst, analyze_round
+    zuletzt): Name -> Funktion, die für Messung i (Methode, Pfad, Body) liefert.
+    """
+    case_ids, user_ids, open_case_ids = data["case_ids"], data["user_ids"], data["open_case_ids"]
+    sheets = evaluation_sheets(app, data, args.repeat + args.warmup)
+
+    def save(i):
+        case_id, body = sheets[i]
+        return "POST", f"/cases/{case_id}/evaluations", body
+
+    return {
+        "get_cases_overview": lambda i: ("GET", "/cases/admin/overview", None),
+        "get_case": lambda i: ("GET", f"/cases/{case_ids[i % len(case_ids)]}", None),
+        "assigned": lambda i: ("GET", f"/cases/assigned/{user_ids[i % len(user_ids)]}", None),
+        "history": lambda i: ("GET", f"/cases/history/{user_ids[i % len(user_ids)]}", None),
+        "save_case_evaluations": save,
+        "analyze_round": lambda i: ("POST", f"/cases/{open_case_ids[i]}/analyze-round", None),
+    }
+
+
+def summarize(durations, statements, errors):
+    durations = sorted(durations)
+    return {
+        "n": len(durations),
+        "min_ms": round(durations[0], 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(durations[math.ceil(len(durations) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "max_ms": round(durations[-1], 3),
+        "statements": max(statements),
+        "errors": errors,
+    }
+
+
+def run_suite(app, engine, data, args):
+    """Führt die Benchmarks aus; gibt die Statistik pro Benchmark und die Fehler zurück."""
+    client = app.test_client()
+    headers = login(client)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    results, failures = {}, []
+    for name, request_for in benchmarks_for(app, data, args).items():
+        if args.only and name not in args.only:
+            continue
+        # Jede Runde lässt sich nur einmal analysieren: ohne Aufwärmen, ein Case pro Messung
+        warmup = 0 if name == "analyze_round" else args.warmup
+        repeat = min(args.repeat, len(data["open_case_ids"])) if name == "analyze_round" else args.repeat
+        if repeat == 0:
+            print(f"{name}: skipped (no open cases)")
+            continue
+
+        durations, counts, errors = [], [], 0
+        for i in range(warmup + repeat):
+            method, path, body = request_for(i)
+            statements.clear()
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            elapsed = (time.perf_counter() - start) * 1000
+            if not 200 <= response.status_code < 300:
+                errors += 1
+                failures.append(f"{name}: {method} {path} returned {response.status_code}: "
+                                f"{response.get_data(as_text=True)[:300]}")
+            if i >= warmup:
+                durations.append(elapsed)
+                counts.append(len(statements))
+        results[name] = summarize(durations, counts, errors)
+    return results, failures
+
+
+def compare(results, baseline, max_regression):
+    """Vergleicht die Mediane und Statement-Zahlen mit einer früheren JSON-Ausgabe."""
+    regressions = []
+    print(f"\n{'benchmark':<24} {'baseline':>10} {'current':>10} {'change':>8}  SQL")
+    for name, current in results.items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        change = current["median_ms"] / previous["median_ms"] - 1 if previous["median_ms"] else 0.0
+        print(f"{name:<24} {previous['median_ms']:>10.2f} {current['median_ms']:>10.2f} {change:>+8.1%}  "
+              f"{previous['statements']} -> {current['statements']}")
+        if change > max_regression:
+            regressions.append(f"{name}: median {previous['median_ms']:.2f} ms -> {current['median_ms']:.2f} ms "
+                               f"({change:+.1%}, allowed {max_regression:+.1%})")
+        if current["statements"] > previous["statements"]:
+            regressions.append(f"{name}: {previous['statements']} -> {current['statements']} SQL statements")
+    return regressions
+
+
+def report(results):
+    print(f"\n{'benchmark':<24} {'n':>4} {'min':>9} {'median':>9} {'p95':>9} {'max':>9} {'SQL':>5} {'errors':>7}")
+    for name, stats in results.items():
+        print(f"{name:<24} {stats['n']:>4} {stats['min_ms']:>9.2f} {stats['median_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['max_ms']:>9.2f} {stats['statements']:>5} {stats['errors']:>7}")
+    print("(times in ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_workload_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=20, help="Messungen pro Benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="Ungemessene Requests vor den Messungen")
+    parser.add_argument("--only", nargs="+", help="Nur diese Benchmarks ausführen")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON in diese Datei schreiben")
+    parser.add_argument("--compare", help="JSON-Ausgabe eines früheren Laufs als Baseline")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Erlaubte Verlangsamung des Medians gegenüber der Baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    with benchmark_app(args.database_url, TESTING=True) as app:
+        from src.models import db
+
+        with app.app_context():
+            start = time.perf_counter()
+            data = seed_workload(args)
+            seed_seconds = time.perf_counter() - start
+            engine = db.engine
+        print(f"Seeded {len(data['user_ids'])} users, {len(data['case_ids'])} cases "
+              f"({len(data['open_case_ids'])} open), {data['evaluations']} evaluations in {seed_seconds:.1f} s")
+        results, failures = run_suite(app, engine, data, args)
+        database = engine.dialect.name
+
+    report(results)
+    output = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "database": database},
+        "workload": {key: value for key, value in vars(args).items()
+                     if key in ("users", "cases", "users_per_case", "criteria", "technologies", "rounds",
+                                "disagreement", "completed", "seed")},
+        "evaluations": data["evaluations"],
+        "seed_seconds": round(seed_seconds, 3),
+        "benchmarks": results,
+    }
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["workload"] != output["workload"] or baseline["environment"]["database"] != database:
+            print("WARNING: baseline was recorded with a different workload or database")
+        failures += compare(results, baseline, args.max_regression)
+
+    if failures:
+        for failure in failures:
+            print(f"\nFAIL: {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Synthetischer Delphi-Workload für Benchmarks und Lasttests.
+
+seed_workload() legt Benutzer, Kriterien, Technologien und Cases mit
+mehreren Bewertungsrunden an. Die Bewertungen einer Zelle streuen um einen
+Konsenswert (Likert 1-7, Fuzzy-Vektoren wie im Frontend); die Streuung
+(--disagreement) bestimmt, wie viele Bewertungen in die nächste Runde gehen.
+Die Markierungen für die Neubewertung berechnet die echte Rundenanalyse
+(src/analysis.py); in jeder Folgerunde bewerten nur die markierten Experten
+neu und nähern sich dem Konsens an.
+
+Am Ende ist ein Teil der Cases abgeschlossen (letzte Analyse bestanden), die
+übrigen stehen in der letzten Runde mit vollständigen Bewertungen bereit für
+analyze-round.
+
+benchmark_app() erzeugt die App gegen eine Wegwerf-Datenbank: ein eigenes
+Schema in PostgreSQL oder eine eingebettete SQLite-Datei.
+"""
+import os
+import random
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, insert, text
+from werkzeug.security import generate_password_hash
+
+from config.config import Config
+
+MASTER = {"username": "master@example.com", "password": "master"}
+USER_PASSWORD = "benchmark"
+
+# Likert-Skala 1-7 als Dreiecks-Fuzzy-Zahlen (siehe LikertScale.tsx im Frontend)
+FUZZY_SCALE = {
+    1: (0.0, 0.0, 0.1), 2: (0.0, 0.1, 0.3), 3: (0.1, 0.3, 0.5), 4: (0.3, 0.5, 0.7),
+    5: (0.5, 0.7, 0.9), 6: (0.7, 0.9, 1.0), 7: (0.9, 1.0, 1.0),
+}
+
+# Standardabweichung der Bewertungen um den Konsens (in Likert-Stufen)
+DISAGREEMENT = {"low": 0.6, "medium": 1.2, "high": 2.0}
+
+
+def add_workload_arguments(parser, **defaults):
+    """Gemeinsame Größenparameter der Benchmarks; defaults überschreibt die Standardwerte."""
+    sizes = {"users": 200, "cases": 40, "users_per_case": 15, "criteria": 10, "technologies": 6, "rounds": 2}
+    sizes.update(defaults)
+    group = parser.add_argument_group("workload")
+    group.add_argument("--users", type=int, default=sizes["users"])
+    group.add_argument("--cases", type=int, default=sizes["cases"])
+    group.add_argument("--users-per-case", type=int, default=sizes["users_per_case"])
+    group.add_argument("--criteria", type=int, default=sizes["criteria"], help="Kriterien pro Case")
+    group.add_argument("--technologies", type=int, default=sizes["technologies"], help="Technologien pro Case")
+    group.add_argument("--rounds", type=int, default=sizes["rounds"], help="Bewertungsrunden pro Case")
+    group.add_argument("--disagreement", default="medium",
+                       help="low, medium, high oder die Standardabweichung in Likert-Stufen")
+    group.add_argument("--completed", type=float, default=0.25, help="Anteil abgeschlossener Cases")
+    group.add_argument("--seed", type=int, default=42)
+    group.add_argument("--database-url", default=None,
+                       help="PostgreSQL-URL (eigenes Schema, wird gelöscht); ohne Angabe eingebettetes SQLite")
+    return parser
+
+
+def _spread(disagreement):
+    return DISAGREEMENT[disagreement] if disagreement in DISAGREEMENT else float(disagreement)
+
+
+def _evaluation(rng, case_id, user_id, round_number, criterion_id, technology_id, consensus, spread):
+    score = min(7, max(1, round(rng.gauss(consensus, spread))))
+    a, b, c = FUZZY_SCALE[score]
+    return {
+        "case_id": case_id, "user_id": user_id, "round": round_number, "criterion_id": criterion_id,
+        "technology_id": technology_id, "score": score, "needs_reevaluation": False,
+        "fuzzy_vector_a": a, "fuzzy_vector_b": b, "fuzzy_vector_c": c,
+    }
+
+
+def _insert_evaluations(rows):
+    from src.models import db, Evaluation
+
+    for start in range(0, len(rows), 10000):
+        db.session.execute(Evaluation.__table__.insert(), rows[start:start + 10000])
+
+
+def seed_workload(args):
+    """
+    Legt den Workload an (im App-Kontext) und gibt die IDs für die Benchmarks
+    zurück: user_ids, case_ids, open_case_ids, completed_case_ids.
+    """
+    from main import create_master_user
+    from flask import current_app
+    from src.analysis import analyze_case_round
+    from src.round_results import build_result_document
+    from src.models import (
+        db, Case, CaseRound, ConsensusCell, Criterion, Evaluation, Project, RoundAnalysis, RoundResultDocument, Technology, User,
+        case_criteria, case_technologies, case_users, normalize_catalog_name,
+    )
+
+    rng = random.Random(args.seed)
+    spread = _spread(args.disagreement)
+
+    create_master_user(current_app._get_current_object())
+    master_id = User.query.filter_by(username=MASTER["username"]).one().id
+    db.session.add(Project(name="Benchmark", master_id=master_id))
+
+    # Ein Hash für alle Benutzer – das Hashen würde sonst das Seeding dominieren
+    password_hash = generate_password_hash(USER_PASSWORD)
+    db.session.execute(insert(User), [{
+        "username": f"user{i}@example.com", "email": f"user{i}@example.com", "password_hash": password_hash,
+        "role": "user", "custom_fields": [f"team-{i % 7}"],
+    } for i in range(args.users)])
+    # Doppelt so groß wie pro Case benötigt, damit sich die Cases den Katalog teilen
+    db.session.execute(insert(Criterion), [
+        {"name": f"Criterion {i}", "normalized_name": normalize_catalog_name(f"Criterion {i}"), "project_id": 1}
+        for i in range(args.criteria * 2)
+    ])
+    db.session.execute(insert(Technology), [
+        {"name": f"Technology {i}", "normalized_name": normalize_catalog_name(f"Technology {i}"), "project_id": 1}
+        for i in range(args.technologies * 2)
+    ])
+    db.session.execute(insert(Case), [{
+        "name": f"Case {i}", "case_type": "internal", "project_id": 1, "current_round": 1,
+        "threshold_distance_mean": 0.166667, "threshold_criteria_percent": 75.0, "threshold_tech_percent": 75.0,
+    } for i in range(args.cases)])
+
+    user_ids = [row.id for row in db.session.query(User.id).filter(User.role == "user").order_by(User.id)]
+    criterion_ids = [row.id for row in db.session.query(Criterion.id).order_by(Criterion.id)]
+    technology_ids = [row.id for row in db.session.query(Technology.id).order_by(Technology.id)]
+    case_ids = [row.id for row in db.session.query(Case.id).order_by(Case.id)]
+
+    # Zuordnungen und der Konsens jeder Zelle
+    links = {"users": [], "criteria": [], "technologies": []}
+    members, consensus = {}, {}
+    round_one = []
+    for case_id in case_ids:
+        members[case_id] = rng.sample(user_ids, args.users_per_case)
+        criteria = rng.sample(criterion_ids, args.criteria)
+        technologies = rng.sample(technology_ids, args.technologies)
+        links["users"] += [{"case_id": case_id, "user_id": user_id} for user_id in members[case_id]]
+        links["criteria"] += [{"case_id": case_id, "criterion_id": criterion_id} for criterion_id in criteria]
+        links["technologies"] += [{"case_id": case_id, "technology_id": technology_id} for technology_id in technologies]
+        for criterion_id in criteria:
+            for technology_id in [None] + technologies:
+                consensus[(case_id, criterion_id, technology_id)] = rng.randint(2, 6)
+                round_one += [
+                    _evaluation(rng, case_id, user_id, 1, criterion_id, technology_id,
+                                consensus[(case_id, criterion_id, technology_id)], spread)
+                    for user_id in members[case_id]
+                ]
+    db.session.execute(case_users.insert(), links["users"])
+    db.session.execute(case_criteria.insert(), links["criteria"])
+    db.session.execute(case_technologies.insert(), links["technologies"])
+    _insert_evaluations(round_one)
+    db.session.commit()
+
+    completed_case_ids = set(rng.sample(case_ids, round(len(case_ids) * args.completed)))
+    evaluation_count = len(round_one)
+    for round_number in range(1, args.rounds + 1):
+        # Runde analysieren (markiert die Neubewertungen); der Ausgang ist vorgegeben:
+        # abgeschlossene Cases bestehen die letzte Runde, offene bleiben in ihr stehen
+        last_round = round_number == args.rounds
+        cases = Case.query.filter(Case.id.in_(case_ids)).order_by(Case.id).all()
+        analyses, rounds, outcomes = [], [], {}
+        for case in cases:
+            rounds.append({"case_id": case.id, "round_number": round_number})
+            if last_round and case.id not in completed_case_ids:
+                continue
+            result, details = analyze_case_round(case)
+            result["passed_analysis"] = last_round
+            analyses.append({"case_id": case.id, "round_number": round_number, **result})
+            outcomes[case.id] = (case, result, details)
+        db.session.execute(insert(CaseRound), rounds)
+        if analyses:
+            db.session.execute(insert(RoundAnalysis), analyses)
+            analysis_ids = db.session.query(RoundAnalysis.case_id, RoundAnalysis.id).filter(
+                RoundAnalysis.round_number == round_number, RoundAnalysis.case_id.in_(outcomes)
+            ).all()
+            db.session.execute(insert(RoundResultDocument), [
+                build_result_document(outcomes[case_id][0], round_number, analysis_id, *outcomes[case_id][1:])
+                for case_id, analysis_id in analysis_ids
+            ])
+            db.session.execute(insert(ConsensusCell).execution_options(render_nulls=True), [
+                {"case_id": case_id, "round_number": round_number, "analysis_id": analysis_id, **cell}
+                for case_id, analysis_id in analysis_ids for cell in outcomes[case_id][2]["cells"]
+            ])
+        db.session.commit()
+        if last_round:
+            break
+
+        # Folgerunde: nur die markierten Bewertungen, mit geringerer Streuung
+        flagged = db.session.query(
+            Evaluation.case_id, Evaluation.user_id, Evaluation.criterion_id, Evaluation.technology_id
+        ).filter(Evaluation.round == round_number, Evaluation.needs_reevaluation.is_(True)).all()
+        next_round = [
+            _evaluation(rng, row.case_id, row.user_id, round_number + 1, row.criterion_id, row.technology_id,
+                        consensus[(row.case_id, row.criterion_id, row.technology_id)], spread / (round_number + 1))
+            for row in flagged
+        ]
+        _insert_evaluations(next_round)
+        db.session.query(Case).filter(Case.id.in_(case_ids)).update(
+            {Case.current_round: round_number + 1}, synchronize_session=False
+        )
+        db.session.commit()
+        evaluation_count += len(next_round)
+
+    return {
+        "user_ids": user_ids,
+        "case_ids": case_ids,
+        "open_case_ids": [case_id for case_id in case_ids if case_id not in completed_case_ids],
+        "completed_case_ids": sorted(completed_case_ids),
+        "members": members,
+        "evaluations": evaluation_count,
+    }
+
+
+def _use_single_column_key():
+    """
+    SQLite kennt weder Partitionen noch Autoincrement in einem zusammengesetzten
+    Primärschlüssel: evaluations bekommt dort den einfachen Schlüssel (id).
+    """
+    from sqlalchemy import PrimaryKeyConstraint
+    from src.models import Evaluation
+
+    table = Evaluation.__table__
+    table.c.case_id.primary_key = False
+    table.constraints.discard(table.primary_key)
+    table.primary_key = PrimaryKeyConstraint(table.c.id)
+    table.append_constraint(table.primary_key)
+
+
+@contextmanager
+def benchmark_app(database_url=None, **config):
+    """
+    App mit leerem Schema in einer Wegwerf-Datenbank. Mit einer PostgreSQL-URL
+    arbeitet die App in einem eigenen Schema, das danach gelöscht wird; ohne
+    URL in einer temporären SQLite-Datei. config setzt zusätzliche Werte.
+    """
+    schema = f"bench_{os.getpid()}"
+    admin_engine = tempdir = None
+    if database_url:
+        admin_engine = create_engine(database_url)
+        with admin_engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+        # Alle Verbindungen der App arbeiten im Benchmark-Schema (pg_trgm liegt in public)
+        engine_options = {"connect_args": {"options": f"-c search_path={schema},public"}}
+    else:
+        tempdir = tempfile.mkdtemp(prefix="bench_")
+        database_url = f"sqlite:///{os.path.join(tempdir, 'bench.db')}"
+        engine_options = {}
+        _use_single_column_key()
+
+    try:
+        Config.SQLALCHEMY_DATABASE_URI = database_url
+        Config.SQLALCHEMY_ENGINE_OPTIONS = engine_options
+        for key, value in config.items():
+            setattr(Config, key, value)
+
+        from main import create_app
+        from src.models import db
+
+        app = create_app()
+        # Der Test-Client spricht HTTP, die Cookies sind sonst nur über HTTPS gültig
+        app.config["JWT_COOKIE_SECURE"] = False
+        with app.app_context():
+            db.create_all()
+        try:
+            yield app
+        finally:
+            with app.app_context():
+                db.engine.dispose()
+    finally:
+        if admin_engine is not None:
+            with admin_engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            admin_engine.dispose()
+        if tempdir:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+
+def login(client, credentials=MASTER):
+    """Meldet den Test-Client an; gibt die Header mit dem CSRF-Token zurück."""
+    response = client.post("/auth/login", json=credentials)
+    if response.status_code != 200:
+        raise RuntimeError(f"Login failed: {response.status_code} {response.get_data(as_text=True)}")
+    return {"X-CSRF-TOKEN": client.get_cookie("csrf_access_token").value}
@@ -6,13 +6,102 @@ class Config:
     DBPASS = os.getenv("DBPASS", "asdf1234")
     DBHOST = os.getenv("DBHOST", "PT_db")
 
-    SQLALCHEMY_DATABASE_URI = f"postgresql://{DBUSER}:{DBPASS}@{DBHOST}/{DBNAME}"
+    # DATABASE_URL überschreibt die Einzelwerte (z. B. für PgBouncer oder einen anderen Host/Port)
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or f"postgresql://{DBUSER}:{DBPASS}@{DBHOST}/{DBNAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')
 
     # Konvertiere 'DEBUG' Umgebungsvariable in ein boolesches Flag
     DEBUG = os.getenv('DEBUG', 'True').lower() in ['true', '1', 'yes']
 
+    # Connection-Pool (siehe src/db_pool.py) – die Größe gilt pro Worker-Prozess
+    # und sollte der Anzahl der Threads pro Worker entsprechen
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', os.getenv('GUNICORN_THREADS', 5)))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # Sekunden Wartezeit auf eine freie Verbindung
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Sekunden, -1 = aus
+    # Prüft Verbindungen vor der Ausgabe (verhindert Fehler nach einem Postgres-Neustart)
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ['true', '1', 'yes']
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 5))  # Sekunden
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))  # Millisekunden, 0 = aus
+    # PgBouncer im Transaction-Mode: kein eigener Pool und keine Session-Parameter
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False').lower() in ['true', '1', 'yes']
+
+    # Optionaler Redis-Server für geteilte Caches und Pub/Sub (leer = nur In-Process)
+    REDIS_URL = os.getenv('REDIS_URL')
+
+    # Revocation-Cache für die Token-Blacklist (siehe src/token_revocation.py)
+    TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv('TOKEN_REVOCATION_SYNC_INTERVAL', 5))  # Sekunden
+    # Abgleich liest Einträge dieses Zeitraums erneut (später committete Logouts mit kleinerer ID)
+    TOKEN_REVOCATION_SYNC_OVERLAP = float(os.getenv('TOKEN_REVOCATION_SYNC_OVERLAP', 60))  # Sekunden
+    # Kompletter Neuaufbau des Bloom-Filters als Absicherung für längere Transaktionen
+    TOKEN_REVOCATION_FULL_RELOAD_INTERVAL = float(os.getenv('TOKEN_REVOCATION_FULL_RELOAD_INTERVAL', 300))  # Sekunden
+    # Löschen abgelaufener Blacklist-Einträge (0 = nur per `flask prune-token-blacklist`)
+    TOKEN_BLACKLIST_PRUNE_INTERVAL = float(os.getenv('TOKEN_BLACKLIST_PRUNE_INTERVAL', 3600))  # Sekunden
+    TOKEN_BLACKLIST_PRUNE_BATCH_SIZE = int(os.getenv('TOKEN_BLACKLIST_PRUNE_BATCH_SIZE', 1000))
+
+    # Cache der Case-Stammdaten (siehe src/case_cache.py)
+    CASE_CACHE_ENABLED = os.getenv('CASE_CACHE_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    CASE_CACHE_TTL = int(os.getenv('CASE_CACHE_TTL', 300))  # Sekunden (Redis)
+    CASE_CACHE_LOCAL_SIZE = int(os.getenv('CASE_CACHE_LOCAL_SIZE', 1024))  # Einträge pro Prozess
+    # Ohne Redis sehen andere Worker Änderungen erst nach dieser Zeit
+    CASE_CACHE_LOCAL_TTL = float(os.getenv('CASE_CACHE_LOCAL_TTL', 5))  # Sekunden
+
+    # Bulk-Anlage von Benutzern (POST /admin/users/bulk)
+    BULK_USER_MAX_ROWS = int(os.getenv('BULK_USER_MAX_ROWS', 1000))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None  # None = Anzahl CPUs
+
+    # Response-Komprimierung (gzip/Brotli, siehe src/compression.py)
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # Bytes
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+    # Overrides pro Blueprint – die Cases-Routen liefern die großen JSON-Antworten
+    COMPRESS_BLUEPRINTS = {
+        'cases': {'min_size': 512},
+    }
+
+    # Prometheus-Metriken (siehe src/metrics.py)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    # Server-Timing-Header (DB-Zeit, Anzahl Statements); ohne Angabe nur mit explizit gesetztem DEBUG –
+    # DEBUG selbst steht ohne Umgebungsvariable auf True, auch im Container
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', os.getenv('DEBUG', 'False')).lower() in ['true', '1', 'yes']
+    # Optionales Bearer-Token für GET /metrics
+    METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN')
+
+    # Query-Budgets pro Endpoint (siehe src/query_budget.py): off | warn | raise
+    QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off').lower()
+    QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 0)) or None  # None = nur deklarierte Budgets
+    # Overrides pro Endpoint, z. B. {'cases.get_case': 8}
+    QUERY_BUDGETS = {}
+
+    # Logging (siehe src/logging_config.py)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # Level pro Logger, z. B. "src.routes.cases=DEBUG,sqlalchemy.engine=INFO"
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # text | json
+    # Anteil der ausgegebenen DEBUG/INFO-Einträge pro Logger, z. B. "src.routes.cases=0.01"
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+
+    # Spitzen-Speicher der Rundenanalyse mit tracemalloc messen (Telemetrie in RoundAnalysis);
+    # verlangsamt die Analyse etwa um das Dreifache, daher nur zur Untersuchung einschalten
+    ANALYSIS_TRACE_MEMORY = os.getenv('ANALYSIS_TRACE_MEMORY', 'False').lower() in ['true', '1', 'yes']
+
+    # Cache-Dauer (Sekunden) der Ergebnisdokumente GET /cases/<id>/rounds/<n>/result;
+    # danach validiert der Client per ETag (304)
+    ROUND_RESULT_MAX_AGE = int(os.getenv('ROUND_RESULT_MAX_AGE', 3600))
+
+    # Cache der Technologie-Rankings pro Analyse (siehe src/ranking.py)
+    RANKING_CACHE_TTL = int(os.getenv('RANKING_CACHE_TTL', 86400))  # Sekunden (Redis)
+    RANKING_CACHE_LOCAL_SIZE = int(os.getenv('RANKING_CACHE_LOCAL_SIZE', 256))  # Einträge pro Prozess
+
+    # Request-Profiling (siehe src/profiling.py): Header "X-Profile: 1" für Master
+    # und/oder eine zufällige Stichprobe aller Requests
+    PROFILE_HEADER_ENABLED = os.getenv('PROFILE_HEADER_ENABLED', 'True').lower() in ['true', '1', 'yes']
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))  # Ringpuffer über alle Worker
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
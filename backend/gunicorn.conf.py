@@ -0,0 +1,64 @@
+"""
+gunicorn-Konfiguration für den Produktionsbetrieb (gunicorn --config gunicorn.conf.py wsgi:app).
+
+Alle Werte lassen sich über Umgebungsvariablen setzen. Die App wird im
+Master-Prozess einmal geladen (preload) und an die Worker vererbt; die Worker
+öffnen ihre Datenbankverbindungen erst nach dem Fork.
+
+Graceful Reload: `kill -HUP <master-pid>` startet neue Worker und beendet die
+alten, sobald sie ihre laufenden Requests abgeschlossen haben. Mit preload_app
+wird dabei kein neuer Code geladen – für ein Deployment den Container neu
+starten oder GUNICORN_PRELOAD=False setzen.
+"""
+import multiprocessing
+import os
+import shutil
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ["true", "1", "yes"]
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:9000")
+
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# Mit mehreren Threads pro Worker den gthread-Worker verwenden
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Worker regelmäßig ersetzen (begrenzt Speicherwachstum), versetzt um Lastspitzen zu vermeiden
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+# Prometheus-Metriken aller Worker zusammenführen (src/metrics.py). Muss vor dem
+# Laden der App gesetzt sein; beim Reload (HUP) bleibt das Verzeichnis erhalten
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    _metrics_dir = os.getenv("METRICS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = _metrics_dir
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Vom Master geerbte Verbindungen nicht weiterverwenden (Sockets wären geteilt)
+    from src.models import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
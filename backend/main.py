@@ -1,11 +1,25 @@
+import logging
 import os
-from flask import Flask
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config.config import config
-from src.models import db, TokenBlacklist, User
+from src.models import db, User
+from src.case_cache import init_case_cache
+from src.compression import init_compression
+from src.db_pool import init_db_pool
+from src.logging_config import init_logging
+from src.metrics import init_metrics
+from src.profiling import init_profiling
+from src.query_budget import init_query_budget
+from src.token_revocation import revocation_cache
 from werkzeug.security import generate_password_hash
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp, upgrade
+from sqlalchemy import inspect
+
+logger = logging.getLogger(__name__)
 
 def create_master_user(app):
     with app.app_context():
@@ -22,9 +36,43 @@ def create_master_user(app):
             )
             db.session.add(master_user)
             db.session.commit()
-            print("Master user created successfully")
+            logger.info("Master user created successfully")
         else:
-            print("Master user already exists")
+            logger.info("Master user already exists")
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """
+    Einmalige Initialisierung vor dem Start der Worker: legt das Schema an bzw.
+    migriert es und erstellt den Master-Benutzer. Kann gefahrlos mehrfach laufen.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    if not tables - {"alembic_version"}:
+        # Leere Datenbank: Schema aus den Models, Migrationsstand auf den neuesten setzen
+        db.create_all()
+        stamp()
+        click.echo("Database schema created")
+    elif "alembic_version" in tables:
+        upgrade()
+        click.echo("Database schema upgraded")
+    else:
+        # Schema aus db.create_all() älterer Versionen ohne Migrationshistorie
+        columns = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in ("users", "token_blacklist") if table in tables
+        }
+        if "expires_at" in columns.get("token_blacklist", set()):
+            raise click.ClickException(
+                "Existing schema without migration history - run 'flask db stamp <revision>' first (see readme)"
+            )
+        if "custom_fields" in columns.get("users", set()):
+            # Stand von add_custom_fields (Basis der Migrationskette)
+            stamp(revision="add_custom_fields")
+        upgrade()
+        click.echo("Database schema migrated from unversioned schema")
+    create_master_user(current_app._get_current_object())
 
 def create_app():
     app = Flask(__name__)
@@ -33,6 +81,9 @@ def create_app():
     env_config = config.get("development")
     app.config.from_object(env_config)
 
+    # Logging zuerst, damit auch die Initialisierung der Erweiterungen darüber läuft
+    init_logging(app)
+
     # Zusätzliche Sicherheitskonfigurationen für JWT (verwende Umgebungsvariablen!)
     app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "supersecretkey")
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 900         # 15 Minuten
@@ -60,21 +111,28 @@ def create_app():
              }
          })
 
+    # Pool-Einstellungen aus der Konfiguration (muss vor db.init_app passieren)
+    init_db_pool(app)
+
     # SQLAlchemy mit der Flask-App verbinden
     db.init_app(app)
     
-    # Flask-Migrate initialisieren
-    migrate = Migrate(app, db)
+    # Flask-Migrate initialisieren (unabhängig vom Arbeitsverzeichnis)
+    migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"))
 
     # Initialisiere JWTManager
     jwt = JWTManager(app)
 
-    # Callback für Token-Blacklist (Token werden hier geprüft, wenn sie in der DB stehen)
+    # Revocation-Cache (Bloom-Filter + LRU/Redis) vor der Token-Blacklist
+    revocation_cache.init_app(app)
+
+    # Cache der Case-Stammdaten (Redis bzw. LRU pro Prozess)
+    init_case_cache(app)
+
+    # Callback für Token-Blacklist – die DB wird nur bei Bloom-Treffern gefragt
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload["jti"]
-        token = TokenBlacklist.query.filter_by(jti=jti).first()
-        return token is not None
+        return revocation_cache.is_revoked(jwt_payload["jti"])
 
     # Blueprint-Registrierung (API-Routen)
     from src.routes.auth import auth_bp
@@ -82,26 +140,40 @@ def create_app():
     from src.routes.admin import admin_bp  
     from src.routes.criteria import criteria_bp
     from src.routes.technologies import technologies_bp
+    from src.routes.templates import templates_bp
+    from src.routes.internal import internal_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(cases_bp, url_prefix='/cases')  
     app.register_blueprint(admin_bp, url_prefix='/admin')  
     app.register_blueprint(criteria_bp, url_prefix='/criteria')
     app.register_blueprint(technologies_bp, url_prefix='/technologies')
+    app.register_blueprint(templates_bp, url_prefix='/case-templates')
+    app.register_blueprint(internal_bp, url_prefix='/internal')
+
+    # Profiling einzelner Requests (X-Profile-Header, Stichprobe); zuerst registriert,
+    # damit das Profil auch die Metriken und die Komprimierung enthält
+    init_profiling(app)
+
+    # Latenz, SQL-Statements und Antwortgrößen pro Endpoint (GET /metrics);
+    # vor der Komprimierung registrieren, damit die komprimierte Größe gemessen wird
+    init_metrics(app)
+
+    # SQL-Statements pro Endpoint gegen das deklarierte Budget prüfen (QUERY_BUDGET_MODE)
+    init_query_budget(app)
+
+    # Große JSON-Antworten komprimiert ausliefern (gzip/Brotli je nach Client)
+    init_compression(app)
 
     # Disable strict slashes to prevent automatic redirects
     app.url_map.strict_slashes = False
 
-    # Erstelle die Datenbank-Tabellen beim Start
-    with app.app_context():
-        db.create_all()
-        # Create master user after database initialization
-        create_master_user(app)
+    # Schema und Master-Benutzer werden nicht beim Start angelegt, sondern
+    # einmalig mit `flask init-db` – Worker schreiben beim Booten nichts in die DB
+    app.cli.add_command(init_db_command)
 
     return app
 
-app = create_app()
-
 if __name__ == '__main__':
-    # In Produktion: debug=False und ggf. einen Production-Server verwenden
-    app.run(host='0.0.0.0', port=9000, debug=True)
+    # Nur für die Entwicklung – in Produktion gunicorn (siehe gunicorn.conf.py)
+    create_app().run(host='0.0.0.0', port=9000, debug=True)
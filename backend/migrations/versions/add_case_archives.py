@@ -0,0 +1,31 @@
+"""Add case archives
+
+Revision ID: add_case_archives
+Revises: add_case_templates
+Create Date: 2026-10-19 12:48:03.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'add_case_archives'
+down_revision = 'add_case_templates'
+
+def upgrade():
+    op.create_table('case_archives',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('case_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('case_type', sa.String(length=10), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('evaluation_count', sa.Integer(), nullable=False),
+        sa.Column('evaluations', postgresql.JSONB(), nullable=False),
+    )
+    op.create_index('ix_case_archives_case_id', 'case_archives', ['case_id'])
+    # Archived evaluations are large and write-once: compress with lz4 (PostgreSQL 14+)
+    op.execute("ALTER TABLE case_archives ALTER COLUMN evaluations SET COMPRESSION lz4")
+
+def downgrade():
+    op.drop_index('ix_case_archives_case_id', table_name='case_archives')
+    op.drop_table('case_archives')
@@ -0,0 +1,42 @@
+"""Add case templates
+
+Revision ID: add_case_templates
+Revises: add_catalog_normalized_names
+Create Date: 2026-10-19 12:02:55.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_case_templates'
+down_revision = 'add_catalog_normalized_names'
+
+def upgrade():
+    op.create_table('case_templates',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('case_type', sa.String(length=10), nullable=False),
+        sa.Column('threshold_distance_mean', sa.Float(), nullable=True),
+        sa.Column('threshold_criteria_percent', sa.Float(), nullable=True),
+        sa.Column('threshold_tech_percent', sa.Float(), nullable=True),
+        sa.Column('source_case_id', sa.Integer(), sa.ForeignKey('cases.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_table('case_template_criteria',
+        sa.Column('template_id', sa.Integer(), sa.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('criterion_id', sa.Integer(), sa.ForeignKey('criteria.id'), primary_key=True),
+    )
+    op.create_table('case_template_technologies',
+        sa.Column('template_id', sa.Integer(), sa.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('technology_id', sa.Integer(), sa.ForeignKey('technologies.id'), primary_key=True),
+    )
+    op.create_table('case_template_users',
+        sa.Column('template_id', sa.Integer(), sa.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    )
+
+def downgrade():
+    op.drop_table('case_template_users')
+    op.drop_table('case_template_technologies')
+    op.drop_table('case_template_criteria')
+    op.drop_table('case_templates')
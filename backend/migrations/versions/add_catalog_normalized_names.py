@@ -0,0 +1,85 @@
+"""Deduplicate criteria/technologies into a shared catalog
+
+Revision ID: add_catalog_normalized_names
+Revises: add_user_search_indexes
+Create Date: 2026-10-19 11:20:37.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_catalog_normalized_names'
+down_revision = 'add_user_search_indexes'
+
+# (table, association table, association column, evaluations column)
+CATALOGS = [
+    ('criteria', 'case_criteria', 'criterion_id', 'criterion_id'),
+    ('technologies', 'case_technologies', 'technology_id', 'technology_id'),
+]
+
+def upgrade():
+    op.add_column('criteria', sa.Column('normalized_name', sa.String(length=255), nullable=True))
+    op.add_column('technologies', sa.Column('normalized_name', sa.String(length=100), nullable=True))
+
+    for table, assoc_table, assoc_column, eval_column in CATALOGS:
+        # Same normalization as models.normalize_catalog_name
+        op.execute(f"""
+            UPDATE {table}
+            SET normalized_name = NULLIF(lower(regexp_replace(btrim(name), '\\s+', ' ', 'g')), '')
+        """)
+
+        # Rows that only differ in case/whitespace but belong to the same case are
+        # distinct entries of that case; merging them would put their evaluations
+        # into one cell (and add_query_indexes would then drop all but one).
+        # Abort and let an operator rename them instead.
+        conflicts = op.get_bind().execute(sa.text(f"""
+            SELECT a.case_id, string_agg(t.name, ' / ' ORDER BY t.id) AS names
+            FROM {assoc_table} a JOIN {table} t ON t.id = a.{assoc_column}
+            WHERE t.normalized_name IS NOT NULL
+            GROUP BY a.case_id, t.normalized_name
+            HAVING count(*) > 1
+            ORDER BY a.case_id
+        """)).fetchall()
+        if conflicts:
+            raise RuntimeError(
+                f"Cannot merge {table} that differ only in case or whitespace within the same case; "
+                "rename them first: " + "; ".join(f"case {case_id}: {names}" for case_id, names in conflicts)
+            )
+
+        # Map every duplicate onto the oldest row with the same normalized name
+        op.execute(f"""
+            CREATE TEMPORARY TABLE catalog_duplicates ON COMMIT DROP AS
+            SELECT id AS duplicate_id, keep_id
+            FROM (
+                SELECT id, min(id) OVER (PARTITION BY normalized_name) AS keep_id
+                FROM {table}
+                WHERE normalized_name IS NOT NULL
+            ) ranked
+            WHERE id <> keep_id
+        """)
+        op.execute(f"""
+            INSERT INTO {assoc_table} (case_id, {assoc_column})
+            SELECT a.case_id, d.keep_id
+            FROM {assoc_table} a JOIN catalog_duplicates d ON a.{assoc_column} = d.duplicate_id
+            ON CONFLICT DO NOTHING
+        """)
+        op.execute(f"""
+            DELETE FROM {assoc_table} a USING catalog_duplicates d
+            WHERE a.{assoc_column} = d.duplicate_id
+        """)
+        op.execute(f"""
+            UPDATE evaluations e SET {eval_column} = d.keep_id
+            FROM catalog_duplicates d WHERE e.{eval_column} = d.duplicate_id
+        """)
+        op.execute(f"DELETE FROM {table} t USING catalog_duplicates d WHERE t.id = d.duplicate_id")
+        op.execute("DROP TABLE catalog_duplicates")
+
+    op.create_index('ix_criteria_normalized_name', 'criteria', ['normalized_name'], unique=True)
+    op.create_index('ix_technologies_normalized_name', 'technologies', ['normalized_name'], unique=True)
+
+def downgrade():
+    # Merged duplicates are not restored
+    op.drop_index('ix_technologies_normalized_name', table_name='technologies')
+    op.drop_index('ix_criteria_normalized_name', table_name='criteria')
+    op.drop_column('technologies', 'normalized_name')
+    op.drop_column('criteria', 'normalized_name')
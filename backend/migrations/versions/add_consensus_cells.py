@@ -0,0 +1,34 @@
+"""Add consensus cells
+
+Revision ID: add_consensus_cells
+Revises: add_round_result_documents
+Create Date: 2026-10-19 17:48:12.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_consensus_cells'
+down_revision = 'add_round_result_documents'
+
+def upgrade():
+    op.create_table('consensus_cells',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('case_id', sa.Integer(), sa.ForeignKey('cases.id'), nullable=False),
+        sa.Column('round_number', sa.Integer(), nullable=False),
+        sa.Column('analysis_id', sa.Integer(), sa.ForeignKey('round_analysis.id'), nullable=False),
+        sa.Column('criterion_id', sa.Integer(), sa.ForeignKey('criteria.id'), nullable=False),
+        sa.Column('technology_id', sa.Integer(), sa.ForeignKey('technologies.id'), nullable=True),
+        sa.Column('mean_a', sa.Float(), nullable=False),
+        sa.Column('mean_b', sa.Float(), nullable=False),
+        sa.Column('mean_c', sa.Float(), nullable=False),
+        sa.Column('mean_distance', sa.Float(), nullable=False),
+        sa.Column('expert_count', sa.Integer(), nullable=False),
+        sa.Column('ok', sa.Boolean(), nullable=False),
+    )
+    # All readers select the cells of one case and round
+    op.create_index('ix_consensus_cells_case_round', 'consensus_cells', ['case_id', 'round_number'])
+
+def downgrade():
+    op.drop_index('ix_consensus_cells_case_round', table_name='consensus_cells')
+    op.drop_table('consensus_cells')
@@ -8,6 +8,9 @@ Create Date: 2024-03-24 13:42:51.000000
 from alembic import op
 import sqlalchemy as sa
 
+revision = 'add_custom_fields'
+down_revision = None
+
 def upgrade():
     # Add custom_fields column to users table
     op.add_column('users', sa.Column('custom_fields', sa.Text(), nullable=True))
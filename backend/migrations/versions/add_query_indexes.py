@@ -0,0 +1,60 @@
+"""Add composite indexes and uniqueness constraints for the hot query paths
+
+Revision ID: add_query_indexes
+Revises: add_case_archives
+Create Date: 2026-10-19 13:30:41.000000
+
+"""
+from alembic import op
+
+revision = 'add_query_indexes'
+down_revision = 'add_case_archives'
+
+def upgrade():
+    # Remove duplicates that would violate the new constraints (keep the newest row)
+    op.execute("""
+        DELETE FROM evaluations e USING evaluations d
+        WHERE e.case_id = d.case_id
+          AND e.user_id = d.user_id
+          AND e.round = d.round
+          AND e.criterion_id = d.criterion_id
+          AND e.technology_id IS NOT DISTINCT FROM d.technology_id
+          AND e.id < d.id
+    """)
+    op.execute("""
+        DELETE FROM round_analysis r USING round_analysis d
+        WHERE r.case_id = d.case_id AND r.round_number = d.round_number AND r.id < d.id
+    """)
+    op.execute("""
+        DELETE FROM case_rounds r USING case_rounds d
+        WHERE r.case_id = d.case_id AND r.round_number = d.round_number AND r.id > d.id
+    """)
+
+    # Leftover from the old schema (evaluations.case_round_id is no longer queried)
+    op.execute("DROP INDEX IF EXISTS evaluations_case_round_id_idx")
+
+    op.create_index('ix_evaluations_case_round_cell', 'evaluations',
+                    ['case_id', 'round', 'criterion_id', 'technology_id'])
+    # technology_id is NULL for plain criterion ratings, so NULLs must collide (PostgreSQL 15+)
+    op.execute("""
+        ALTER TABLE evaluations ADD CONSTRAINT uq_evaluations_user_cell
+        UNIQUE NULLS NOT DISTINCT (case_id, user_id, round, criterion_id, technology_id)
+    """)
+    op.create_index('ix_evaluations_needs_reevaluation', 'evaluations', ['case_id', 'round', 'user_id'],
+                    postgresql_where='needs_reevaluation')
+
+    op.create_unique_constraint('uq_round_analysis_case_round', 'round_analysis', ['case_id', 'round_number'])
+    op.create_unique_constraint('uq_case_rounds_case_round', 'case_rounds', ['case_id', 'round_number'])
+    op.create_index('ix_case_users_user_id', 'case_users', ['user_id'])
+    op.create_index('ix_cases_assigned_user_id', 'cases', ['assigned_user_id'])
+
+    op.execute("ANALYZE evaluations")
+
+def downgrade():
+    op.drop_index('ix_cases_assigned_user_id', table_name='cases')
+    op.drop_index('ix_case_users_user_id', table_name='case_users')
+    op.drop_constraint('uq_case_rounds_case_round', 'case_rounds', type_='unique')
+    op.drop_constraint('uq_round_analysis_case_round', 'round_analysis', type_='unique')
+    op.drop_index('ix_evaluations_needs_reevaluation', table_name='evaluations')
+    op.drop_constraint('uq_evaluations_user_cell', 'evaluations', type_='unique')
+    op.drop_index('ix_evaluations_case_round_cell', table_name='evaluations')
@@ -0,0 +1,30 @@
+"""Add analysis run telemetry to round_analysis
+
+Revision ID: add_round_analysis_telemetry
+Revises: partition_evaluations
+Create Date: 2026-10-19 16:10:42.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_round_analysis_telemetry'
+down_revision = 'partition_evaluations'
+
+COLUMNS = (
+    ('wall_time_ms', sa.Float()),
+    ('db_time_ms', sa.Float()),
+    ('cell_count', sa.Integer()),
+    ('evaluation_count', sa.Integer()),
+    ('peak_memory_kb', sa.Integer()),
+    ('engine_version', sa.String(length=20)),
+)
+
+def upgrade():
+    # Nullable without default: existing analyses simply have no telemetry
+    for name, type_ in COLUMNS:
+        op.add_column('round_analysis', sa.Column(name, type_, nullable=True))
+
+def downgrade():
+    for name, _ in reversed(COLUMNS):
+        op.drop_column('round_analysis', name)
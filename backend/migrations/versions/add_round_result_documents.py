@@ -0,0 +1,34 @@
+"""Add round result documents
+
+Revision ID: add_round_result_documents
+Revises: add_round_analysis_telemetry
+Create Date: 2026-10-19 17:05:26.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_round_result_documents'
+down_revision = 'add_round_analysis_telemetry'
+
+def upgrade():
+    op.create_table('round_result_documents',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('case_id', sa.Integer(), sa.ForeignKey('cases.id'), nullable=False),
+        sa.Column('round_number', sa.Integer(), nullable=False),
+        sa.Column('analysis_id', sa.Integer(), sa.ForeignKey('round_analysis.id'), nullable=False),
+        sa.Column('format_version', sa.Integer(), nullable=False),
+        sa.Column('engine_version', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('etag', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('content', sa.LargeBinary(), nullable=False),
+        sa.UniqueConstraint('case_id', 'round_number', name='uq_round_result_documents_case_round'),
+        sa.UniqueConstraint('analysis_id', name='round_result_documents_analysis_id_key'),
+    )
+    # The content is gzip-compressed already: store it out of line without TOAST compression.
+    # Analyses from before this revision have no document (GET .../result answers 404).
+    op.execute("ALTER TABLE round_result_documents ALTER COLUMN content SET STORAGE EXTERNAL")
+
+def downgrade():
+    op.drop_table('round_result_documents')
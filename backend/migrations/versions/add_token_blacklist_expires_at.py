@@ -0,0 +1,24 @@
+"""Add expires_at to token_blacklist
+
+Revision ID: add_token_blacklist_expires_at
+Revises: add_custom_fields
+Create Date: 2026-10-19 09:12:40.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_token_blacklist_expires_at'
+down_revision = 'add_custom_fields'
+
+def upgrade():
+    # Add expires_at column (exp claim of the revoked token)
+    op.add_column('token_blacklist', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_token_blacklist_expires_at', 'token_blacklist', ['expires_at'])
+
+    # Existing rows: refresh tokens live at most one day (JWT_REFRESH_TOKEN_EXPIRES)
+    op.execute("UPDATE token_blacklist SET expires_at = created_at + INTERVAL '1 day' WHERE expires_at IS NULL")
+
+def downgrade():
+    op.drop_index('ix_token_blacklist_expires_at', table_name='token_blacklist')
+    op.drop_column('token_blacklist', 'expires_at')
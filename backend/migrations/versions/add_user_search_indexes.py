@@ -0,0 +1,24 @@
+"""Add search indexes to users
+
+Revision ID: add_user_search_indexes
+Revises: add_token_blacklist_expires_at
+Create Date: 2026-10-19 10:05:12.000000
+
+"""
+from alembic import op
+
+revision = 'add_user_search_indexes'
+down_revision = 'add_token_blacklist_expires_at'
+
+def upgrade():
+    # Trigram indexes for substring search on username/email
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)")
+    # Containment filter on custom_fields (stored as json, indexed as jsonb)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_custom_fields ON users USING gin ((custom_fields::jsonb) jsonb_path_ops)")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_users_custom_fields")
+    op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_users_username_trgm")
@@ -0,0 +1,61 @@
+"""Hash-partition evaluations by case_id
+
+Revision ID: partition_evaluations
+Revises: add_query_indexes
+Create Date: 2026-10-19 15:02:17.000000
+
+"""
+from alembic import op
+
+revision = 'partition_evaluations'
+down_revision = 'add_query_indexes'
+
+# Must match Evaluation.PARTITIONS
+PARTITIONS = 16
+
+FOREIGN_KEYS = [
+    ('case_id', 'cases'),
+    ('user_id', 'users'),
+    ('criterion_id', 'criteria'),
+    ('technology_id', 'technologies'),
+]
+
+def _finish_table(primary_key):
+    """Keys and indexes of the (renamed) evaluations table, see models.Evaluation."""
+    op.execute(f"ALTER TABLE evaluations ADD CONSTRAINT evaluations_pkey PRIMARY KEY ({primary_key})")
+    for column, referred in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE evaluations ADD FOREIGN KEY ({column}) REFERENCES {referred} (id)")
+    op.create_index('ix_evaluations_case_round_cell', 'evaluations',
+                    ['case_id', 'round', 'criterion_id', 'technology_id'])
+    op.execute("""
+        ALTER TABLE evaluations ADD CONSTRAINT uq_evaluations_user_cell
+        UNIQUE NULLS NOT DISTINCT (case_id, user_id, round, criterion_id, technology_id)
+    """)
+    op.create_index('ix_evaluations_needs_reevaluation', 'evaluations', ['case_id', 'round', 'user_id'],
+                    postgresql_where='needs_reevaluation')
+    # The id sequence survives the swap and belongs to the new table again
+    op.execute("ALTER SEQUENCE evaluations_id_seq OWNED BY evaluations.id")
+    op.execute("ANALYZE evaluations")
+
+def _swap_table(partition_clause, create_partitions):
+    # Partitioning cannot be added to an existing table: copy into a new one and swap
+    op.execute(f"CREATE TABLE evaluations_new (LIKE evaluations INCLUDING DEFAULTS) {partition_clause}")
+    create_partitions()
+    op.execute("LOCK TABLE evaluations IN EXCLUSIVE MODE")
+    op.execute("INSERT INTO evaluations_new SELECT * FROM evaluations")
+    op.execute("ALTER SEQUENCE evaluations_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE evaluations")
+    op.execute("ALTER TABLE evaluations_new RENAME TO evaluations")
+
+def upgrade():
+    def create_partitions():
+        for i in range(PARTITIONS):
+            op.execute(f"CREATE TABLE evaluations_p{i:02d} PARTITION OF evaluations_new "
+                       f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})")
+
+    _swap_table("PARTITION BY HASH (case_id)", create_partitions)
+    _finish_table("id, case_id")
+
+def downgrade():
+    _swap_table("", lambda: None)
+    _finish_table("id")
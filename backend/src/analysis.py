@@ -0,0 +1,337 @@
+"""
+Rundenanalyse eines Cases (Distanz zum Mittelwert der Fuzzy-Vektoren).
+
+Die Bewertungen der aktuellen und der vorherigen Runde werden mit einer
+Abfrage geladen und im Speicher nach Zellen gruppiert (Kriterium bzw.
+Kriterium × Technologie). Die Markierungen für die Neubewertung werden mit
+höchstens zwei UPDATE-Statements geschrieben – die Anzahl der Statements hängt
+nicht von der Zahl der Benutzer, Kriterien und Technologien ab.
+
+NumPy wird nur hier gebraucht; cases.py importiert dieses Modul erst in
+analyze_round (Kaltstart, siehe benchmarks/startup.py).
+
+Jeder Lauf liefert zusätzlich Telemetrie für RoundAnalysis: Laufzeit, DB-Zeit
+der eigenen Statements, Anzahl Zellen und verarbeiteter Bewertungen, den
+Spitzen-Speicher und ENGINE_VERSION. Der Speicher wird nur mit
+ANALYSIS_TRACE_MEMORY über tracemalloc gemessen: das verlangsamt jede
+Allokation des Prozesses (die Analyse etwa um das Dreifache, auch die
+gemessene Laufzeit). Ist tracemalloc schon aktiv oder läuft im selben
+Prozess eine zweite Analyse, bleibt der Wert leer.
+"""
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.models import db, Evaluation
+
+# Version des Analyseverfahrens; bei Änderungen an der Berechnung erhöhen
+ENGINE_VERSION = "2"
+
+_COLUMNS = (
+    Evaluation.id,
+    Evaluation.user_id,
+    Evaluation.round,
+    Evaluation.criterion_id,
+    Evaluation.technology_id,
+    Evaluation.needs_reevaluation,
+    Evaluation.fuzzy_vector_a,
+    Evaluation.fuzzy_vector_b,
+    Evaluation.fuzzy_vector_c,
+)
+
+
+_run = threading.local()         # DB-Zeit des laufenden Analyselaufs (pro Thread)
+_memory_lock = threading.Lock()  # tracemalloc ist prozessweit
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_run, "db_time", None) is not None:
+        conn.info["analysis_query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("analysis_query_start", None)
+    if start is not None and getattr(_run, "db_time", None) is not None:
+        _run.db_time += time.perf_counter() - start
+
+
+class _Telemetry:
+    """Misst einen Analyselauf; cell_count und evaluation_count setzt die Analyse."""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.cell_count = None
+        self.evaluation_count = None
+
+    def __enter__(self):
+        self.tracing = self.trace_memory and _memory_lock.acquire(blocking=False)
+        if self.tracing and tracemalloc.is_tracing():
+            # Von außen gestartet (z. B. ein Profiler) – nicht stören
+            _memory_lock.release()
+            self.tracing = False
+        if self.tracing:
+            tracemalloc.start()
+        _run.db_time = 0.0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time = time.perf_counter() - self.start
+        self.db_time, _run.db_time = _run.db_time, None
+        self.peak_memory = None
+        if self.tracing:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _memory_lock.release()
+
+    def fields(self):
+        return {
+            "wall_time_ms": round(self.wall_time * 1000, 3),
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "cell_count": self.cell_count,
+            "evaluation_count": self.evaluation_count,
+            "peak_memory_kb": None if self.peak_memory is None else round(self.peak_memory / 1024),
+            "engine_version": ENGINE_VERSION,
+        }
+
+
+class IncompleteRoundError(Exception):
+    """Es fehlen Bewertungen der aktuellen Runde; details ist der Body der 400-Antwort."""
+
+    def __init__(self, details):
+        super().__init__(details["message"])
+        self.details = details
+
+
+def calculate_fuzzy_distance(vector1, vector2):
+    """
+    Berechnet die Distanz zwischen zwei Fuzzy-Vektoren nach der Formel:
+    d(A, B) = sqrt((a1-a2)² + (b1-b2)² + (c1-c2)²) / sqrt(3)
+    Die Komponenten von vector1 dürfen Arrays sein (eine Distanz pro Bewertung).
+    """
+    a_diff = vector1[0] - vector2[0]
+    b_diff = vector1[1] - vector2[1]
+    c_diff = vector1[2] - vector2[2]
+
+    # Euklidische Distanz geteilt durch sqrt(3) für Normalisierung
+    distance = np.sqrt(a_diff**2 + b_diff**2 + c_diff**2) / np.sqrt(3)
+    return distance
+
+
+def _cell_distances(rows):
+    """Mittelwert einer Zelle und die Distanz jeder Bewertung dazu (in der Reihenfolge von rows)."""
+    vectors = (
+        np.array([row.fuzzy_vector_a for row in rows], dtype=float),
+        np.array([row.fuzzy_vector_b for row in rows], dtype=float),
+        np.array([row.fuzzy_vector_c for row in rows], dtype=float),
+    )
+    mean_vector = tuple(float(np.mean(values)) for values in vectors)
+    return mean_vector, calculate_fuzzy_distance(vectors, mean_vector).tolist()
+
+
+def _group_by_cell(rows):
+    cells = defaultdict(list)
+    for row in rows:
+        cells[(row.criterion_id, row.technology_id)].append(row)
+    return cells
+
+
+def _check_complete(case, current, previous, users, criteria, technologies):
+    if case.current_round == 1:
+        # In Runde 1 müssen alle Bewertungen vorliegen
+        total_expected_evaluations = len(users) * (len(criteria) + len(criteria) * len(technologies))
+        if len(current) < total_expected_evaluations:
+            raise IncompleteRoundError({
+                "message": "Cannot analyze round: Not all users have completed their evaluations",
+                "completed_evaluations": len(current),
+                "total_expected_evaluations": total_expected_evaluations
+            })
+        return
+
+    # In höheren Runden muss jede zur Neubewertung markierte Bewertung der Vorrunde neu vorliegen
+    submitted = {(row.user_id, row.criterion_id, row.technology_id) for row in current}
+    missing_evaluations = [
+        {"user_id": row.user_id, "criterion_id": row.criterion_id, "technology_id": row.technology_id}
+        for row in previous
+        if row.needs_reevaluation and (row.user_id, row.criterion_id, row.technology_id) not in submitted
+    ]
+    if missing_evaluations:
+        raise IncompleteRoundError({
+            "message": "Cannot analyze round: Not all users have completed their evaluations",
+            "missing_evaluations": missing_evaluations,
+            "total_missing": len(missing_evaluations)
+        })
+
+
+def _update_reevaluation_flags(case_id, rows, flags):
+    """Schreibt die geänderten Markierungen (ein UPDATE pro Wert)."""
+    for value in (True, False):
+        ids = [row.id for row in rows if row.id in flags and flags[row.id] is value and row.needs_reevaluation is not value]
+        if ids:
+            db.session.execute(
+                db.update(Evaluation)
+                .where(Evaluation.case_id == case_id, Evaluation.id.in_(ids))
+                .values(needs_reevaluation=value),
+                execution_options={"synchronize_session": False}
+            )
+
+
+def analyze_case_round(case):
+    """
+    Analysiert die aktuelle Runde eines Cases und markiert die Bewertungen
+    dieser Runde, deren Distanz zum Mittelwert über dem Grenzwert liegt (ohne
+    Commit). Gibt die Werte für RoundAnalysis (Ergebnis und Telemetrie) und die
+    Details pro Zelle zurück:
+
+        cells    - pro Zelle Mittelwert (mean_a/b/c), mittlere Distanz,
+                   Anzahl der Bewertungen (expert_count) und ok
+        flagged  - die zur Neubewertung markierten Bewertungen mit ihrer Distanz
+
+    Wirft IncompleteRoundError, wenn Bewertungen fehlen.
+    """
+    with _Telemetry(current_app.config.get("ANALYSIS_TRACE_MEMORY", False)) as telemetry:
+        result, details = _analyze(case, telemetry)
+    return {**result, **telemetry.fields()}, details
+
+
+def _analyze(case, telemetry):
+    current_round = case.current_round
+    threshold_distance_mean = case.threshold_distance_mean
+    users = case.users
+    criteria = case.criteria
+    technologies = case.technologies
+
+    rows = (
+        db.session.query(*_COLUMNS)
+        .filter(Evaluation.case_id == case.id, Evaluation.round.in_((current_round, current_round - 1)))
+        .order_by(Evaluation.id)
+        .all()
+    )
+    current = [row for row in rows if row.round == current_round]
+    previous = [row for row in rows if row.round == current_round - 1]
+
+    _check_complete(case, current, previous, users, criteria, technologies)
+
+    current_cells = _group_by_cell(current)
+    # In höheren Runden zählen die Bewertungen der Vorrunde mit, die nicht neu bewertet werden mussten
+    carried_cells = _group_by_cell(row for row in previous if row.needs_reevaluation is False)
+
+    # Zellen im grünen Bereich und Markierungen für die nächste Runde
+    flags = {}
+    cell_results = []
+    flagged = []
+
+    def count_ok_cells(cells):
+        ok_cells = 0
+        for cell in cells:
+            cell_rows = current_cells.get(cell, []) + carried_cells.get(cell, [])
+            if not cell_rows:
+                continue
+            mean_vector, distances = _cell_distances(cell_rows)
+            mean_distance = sum(distances) / len(cell_rows)
+            ok = mean_distance <= threshold_distance_mean
+            if ok:
+                ok_cells += 1
+            cell_results.append({
+                "criterion_id": cell[0],
+                "technology_id": cell[1],
+                "mean_a": mean_vector[0],
+                "mean_b": mean_vector[1],
+                "mean_c": mean_vector[2],
+                "mean_distance": mean_distance,
+                "expert_count": len(cell_rows),
+                "ok": ok,
+            })
+            for row, distance in zip(cell_rows, distances):
+                if row.round == current_round:  # Nur Bewertungen der aktuellen Runde markieren
+                    flags[row.id] = distance > threshold_distance_mean
+                    if flags[row.id]:
+                        flagged.append({
+                            "evaluation_id": row.id,
+                            "user_id": row.user_id,
+                            "criterion_id": row.criterion_id,
+                            "technology_id": row.technology_id,
+                            "distance": distance,
+                        })
+        return ok_cells
+
+    criteria_cells = [(criterion.id, None) for criterion in criteria]
+    tech_cells = [(criterion.id, technology.id) for technology in technologies for criterion in criteria]
+    telemetry.cell_count = len(criteria_cells) + len(tech_cells)
+    telemetry.evaluation_count = len(current) + sum(len(cell_rows) for cell_rows in carried_cells.values())
+
+    # Die Zähler gelten pro Benutzer und Zelle (jeder Benutzer sieht dieselben Zellen)
+    criteria_ok_count = 0
+    tech_ok_count = 0
+    if users:
+        criteria_ok_count = count_ok_cells(criteria_cells) * len(users)
+        tech_ok_count = count_ok_cells(tech_cells) * len(users)
+        _update_reevaluation_flags(case.id, current, flags)
+    criteria_total_count = len(criteria) * len(users)
+    tech_total_count = len(criteria) * len(technologies) * len(users)
+
+    # Prozentsätze berechnen
+    criteria_ok_percent = (criteria_ok_count / criteria_total_count * 100) if criteria_total_count > 0 else 0
+    tech_ok_percent = (tech_ok_count / tech_total_count * 100) if tech_total_count > 0 else 0
+
+    criteria_passed = criteria_ok_percent >= case.threshold_criteria_percent
+    tech_passed = tech_ok_percent >= case.threshold_tech_percent
+
+    # Durchschnittliche Distanz zum Mittelwert, nur über die Bewertungen der aktuellen Runde
+    total_distance = 0
+    total_evaluations = 0
+    criteria_total_distance = 0
+    criteria_total_evaluations = 0
+    tech_total_distance = 0
+    tech_total_evaluations = 0
+
+    for criterion in criteria:
+        for technology_id in [None] + [technology.id for technology in technologies]:
+            cell_rows = current_cells.get((criterion.id, technology_id))
+            if not cell_rows:
+                continue
+            for distance in _cell_distances(cell_rows)[1]:
+                total_distance += distance
+                total_evaluations += 1
+                if technology_id is None:
+                    criteria_total_distance += distance
+                    criteria_total_evaluations += 1
+                else:
+                    tech_total_distance += distance
+                    tech_total_evaluations += 1
+
+    mean_distance_value = float(total_distance / total_evaluations) if total_evaluations > 0 else 0.0
+    criteria_mean_distance_value = float(criteria_total_distance / criteria_total_evaluations) if criteria_total_evaluations > 0 else 0.0
+    tech_mean_distance_value = float(tech_total_distance / tech_total_evaluations) if tech_total_evaluations > 0 else 0.0
+
+    mean_distance_ok = bool(mean_distance_value <= threshold_distance_mean)
+    criteria_mean_distance_ok = bool(criteria_mean_distance_value <= threshold_distance_mean)
+    tech_mean_distance_ok = bool(tech_mean_distance_value <= threshold_distance_mean)
+
+    result = {
+        "criteria_ok_percent": criteria_ok_percent,
+        "criteria_total_count": criteria_total_count,
+        "criteria_ok_count": criteria_ok_count,
+        "criteria_passed": criteria_passed,
+        "tech_ok_percent": tech_ok_percent,
+        "tech_total_count": tech_total_count,
+        "tech_ok_count": tech_ok_count,
+        "tech_passed": tech_passed,
+        "mean_distance_ok": mean_distance_ok,
+        "mean_distance_value": mean_distance_value,
+        "criteria_mean_distance_value": criteria_mean_distance_value,
+        "criteria_mean_distance_ok": criteria_mean_distance_ok,
+        "tech_mean_distance_value": tech_mean_distance_value,
+        "tech_mean_distance_ok": tech_mean_distance_ok,
+        # Gesamtergebnis - Alle drei Kriterien berücksichtigen
+        "passed_analysis": mean_distance_ok and criteria_passed and tech_passed,
+    }
+    return result, {"cells": cell_results, "flagged": flagged}
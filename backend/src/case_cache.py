@@ -0,0 +1,226 @@
+"""
+Read-Through-Cache der Stammdaten eines Cases.
+
+Fast jede Route unter /cases lädt denselben Case samt Kriterien, Technologien,
+Runden und Benutzern, obwohl sich diese Daten nach dem Anlegen kaum noch
+ändern. get_case_metadata() liefert sie als JSON-fähiges Dict (oder None, wenn
+es den Case nicht gibt) und fragt die Datenbank nur bei einem Cache-Miss ab;
+case_exists() prüft nur, ob es den Case gibt.
+
+Backend ist Redis (REDIS_URL), sonst ein LRU-Cache pro Prozess. Routen, die
+einen Case ändern, rufen nach dem Commit invalidate_case() auf; Änderungen an
+Kriterien, Technologien und Benutzern betreffen beliebig viele Cases und rufen
+invalidate_all() auf.
+
+Invalidiert wird über Generationszähler (pro Case und global) statt über das
+Löschen der Einträge: ein Eintrag trägt die Generationen, die vor dem Laden aus
+der Datenbank galten, und ist nur gültig, solange sie sich nicht geändert
+haben. So kann ein Request, der parallel zu einer Änderung noch den alten Stand
+geladen hat, diesen nicht als gültig in den Cache schreiben.
+
+Ohne Redis kennt jeder Worker nur seine eigenen Invalidierungen; Einträge
+laufen dort deshalb nach CASE_CACHE_LOCAL_TTL Sekunden ab, länger sehen andere
+Worker einen veralteten Stand nicht. Die lokalen Generationszähler sind auf
+CASE_CACHE_LOCAL_SIZE Cases begrenzt; darüber hinaus werden alle Cases auf eine
+gemeinsame neue Generation gesetzt (lokal wie invalidate_all()).
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from src.models import db, Case, User
+from src.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_local = OrderedDict()  # case_id -> (Ablaufzeit, Generationen, Daten)
+_local_generations = {}  # case_id -> Generation (fortlaufend aus _local_counter)
+_local_counter = 0
+_local_generation_floor = 0  # Generation aller Cases ohne eigenen Eintrag
+_local_global_generation = 0
+
+
+def init_case_cache(app):
+    app.config.setdefault("CASE_CACHE_ENABLED", True)
+    app.config.setdefault("CASE_CACHE_TTL", 300)  # Sekunden (Redis)
+    app.config.setdefault("CASE_CACHE_LOCAL_SIZE", 1024)
+    app.config.setdefault("CASE_CACHE_LOCAL_TTL", 5)  # Sekunden (ohne Redis)
+    app.config.setdefault("CASE_CACHE_REDIS_PREFIX", "case_metadata:")
+
+
+# ------------------------------
+# Öffentliche API
+# ------------------------------
+
+def get_case_metadata(case_id):
+    """
+    Stammdaten des Cases (siehe _load) oder None, falls er nicht existiert.
+    Das Dict wird zwischen Requests geteilt und darf nicht verändert werden.
+    """
+    if not current_app.config["CASE_CACHE_ENABLED"]:
+        return _load(case_id)
+    data, generations = _lookup(case_id)
+    if data is not None:
+        return data
+    data = _load(case_id)
+    if data is not None and generations is not None:
+        _store(case_id, generations, data)
+    return data
+
+
+def case_exists(case_id):
+    """
+    Existenzprüfung für Routen, die sonst nichts vom Case brauchen: ein
+    Cache-Treffer spart die Abfrage, ein Miss kostet nur ein EXISTS (und füllt
+    den Cache nicht).
+    """
+    if current_app.config["CASE_CACHE_ENABLED"] and _lookup(case_id)[0] is not None:
+        return True
+    return db.session.query(Case.query.filter_by(id=case_id).exists()).scalar()
+
+
+def invalidate_case(case_id):
+    """Verwirft den Eintrag eines Cases (nach dem Commit aufrufen)."""
+    global _local_counter, _local_generation_floor
+    client = get_redis()
+    if client is not None:
+        _bump_redis(client, _key(f"{case_id}:gen"))
+    with _lock:
+        # Fortlaufend statt pro Case hochzählen: eine einmal vergebene Generation
+        # kommt nicht wieder, auch nachdem die Einträge unten verworfen wurden
+        _local_counter += 1
+        _local_generations[case_id] = _local_counter
+        _local.pop(case_id, None)
+        if len(_local_generations) > current_app.config["CASE_CACHE_LOCAL_SIZE"]:
+            _local_generation_floor = _local_counter
+            _local_generations.clear()
+            _local.clear()
+
+
+def invalidate_all():
+    """Verwirft alle Einträge, z. B. nach Änderungen an Kriterien, Technologien oder Benutzern."""
+    global _local_global_generation
+    client = get_redis()
+    if client is not None:
+        _bump_redis(client, _key("gen"))
+    with _lock:
+        _local_global_generation += 1
+        _local.clear()
+
+
+# ------------------------------
+# Interna
+# ------------------------------
+
+def _load(case_id):
+    case = Case.query.options(
+        selectinload(Case.criteria),
+        selectinload(Case.technologies),
+        selectinload(Case.rounds),
+        selectinload(Case.users),
+    ).filter_by(id=case_id).first()
+    if case is None:
+        return None
+
+    users = [{"id": user.id, "username": user.username} for user in case.users]
+    # Der assigned_user gehört zu den Benutzern des Cases, auch ohne Eintrag in case_users
+    if case.assigned_user_id and case.assigned_user_id not in [u["id"] for u in users]:
+        assigned_user = User.query.get(case.assigned_user_id)
+        if assigned_user:
+            users.append({"id": assigned_user.id, "username": assigned_user.username})
+
+    return {
+        "id": case.id,
+        "project_id": case.project_id,
+        "case_type": case.case_type,
+        "show_results": case.show_results,
+        "created_at": case.created_at.isoformat() if case.created_at else None,
+        "name": case.name,
+        "assigned_user_id": case.assigned_user_id,
+        "threshold_distance_mean": case.threshold_distance_mean,
+        "threshold_criteria_percent": case.threshold_criteria_percent,
+        "threshold_tech_percent": case.threshold_tech_percent,
+        "current_round": case.current_round,
+        "criteria": [{"id": c.id, "name": c.name, "rating": c.rating} for c in case.criteria],
+        "technologies": [{"id": t.id, "name": t.name} for t in case.technologies],
+        "rounds": [{
+            "id": r.id,
+            "round_number": r.round_number,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        } for r in case.rounds],
+        "users": users,
+    }
+
+
+def _key(suffix):
+    return current_app.config["CASE_CACHE_REDIS_PREFIX"] + suffix
+
+
+def _lookup(case_id):
+    """
+    (Daten, Generationen) aus dem Cache; Daten None bei einem Miss. Mit den
+    Generationen wird ein anschließend geladener Stand gespeichert (None: nicht speichern).
+    """
+    client = get_redis()
+    if client is None:
+        now = time.monotonic()
+        with _lock:
+            generations = _local_generation(case_id)
+            entry = _local.get(case_id)
+            if entry is not None and entry[0] > now and entry[1] == generations:
+                _local.move_to_end(case_id)
+                return entry[2], generations
+        return None, generations
+
+    try:
+        cached, case_generation, global_generation = client.mget(
+            _key(str(case_id)), _key(f"{case_id}:gen"), _key("gen")
+        )
+    except Exception as e:
+        logger.warning("Case cache lookup in Redis failed: %s", e)
+        return None, None
+    generations = [int(case_generation or 0), int(global_generation or 0)]
+    if cached is not None:
+        entry = json.loads(cached)
+        if entry["generations"] == generations:
+            return entry["data"], generations
+    return None, generations
+
+
+def _store(case_id, generations, data):
+    config = current_app.config
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(_key(str(case_id)), json.dumps({"generations": generations, "data": data}),
+                       ex=config["CASE_CACHE_TTL"])
+        except Exception as e:
+            logger.warning("Case cache update in Redis failed: %s", e)
+        return
+
+    with _lock:
+        # Nur speichern, wenn zwischenzeitlich nicht invalidiert wurde
+        if generations == _local_generation(case_id):
+            _local[case_id] = (time.monotonic() + config["CASE_CACHE_LOCAL_TTL"], generations, data)
+            _local.move_to_end(case_id)
+            while len(_local) > config["CASE_CACHE_LOCAL_SIZE"]:
+                _local.popitem(last=False)
+
+
+def _local_generation(case_id):
+    # Aufruf nur unter _lock
+    return _local_generations.get(case_id, _local_generation_floor), _local_global_generation
+
+
+def _bump_redis(client, key):
+    try:
+        client.incr(key)
+    except Exception as e:
+        # Einträge verfallen spätestens nach CASE_CACHE_TTL
+        logger.warning("Case cache invalidation in Redis failed: %s", e)
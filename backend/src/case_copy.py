@@ -0,0 +1,124 @@
+"""
+Mengenbasiertes Kopieren von Cases und Case-Vorlagen.
+
+Alle Kopien laufen als INSERT ... SELECT direkt in der Datenbank – es werden
+keine Kriterien, Technologien, Benutzer oder Bewertungen in Python geladen.
+Die Funktionen committen nicht; der Aufrufer schließt die Transaktion ab.
+"""
+from src.models import (
+    db, Case, CaseTemplate, Evaluation,
+    case_criteria, case_technologies, case_users,
+    case_template_criteria, case_template_technologies, case_template_users,
+)
+
+_CASE_SETTINGS = [
+    "case_type",
+    "threshold_distance_mean",
+    "threshold_criteria_percent",
+    "threshold_tech_percent",
+]
+
+
+def _copy_links(source, source_key, source_id, target, target_key, target_id, value_column):
+    """Kopiert alle Zuordnungen einer Verknüpfungstabelle mit einem Statement."""
+    db.session.execute(
+        db.insert(target).from_select(
+            [target_key, value_column],
+            db.select(db.literal(target_id), source.c[value_column]).where(
+                source.c[source_key] == source_id
+            ),
+        )
+    )
+
+
+def clone_case(source_case_id, name=None, include_users=True, include_baseline=False):
+    """
+    Legt eine Kopie eines Cases an (Grenzwerte, Kriterien, Technologien und
+    optional Benutzer sowie die Bewertungen aus Runde 1 als Ausgangsbasis).
+    Gibt die ID des neuen Cases zurück oder None, wenn der Case nicht existiert.
+    """
+    if name:
+        name_expr = db.literal(name)
+    else:
+        name_expr = db.func.coalesce(Case.name, "Case " + db.cast(Case.id, db.String)) + " (Kopie)"
+    columns = ["project_id", "show_results", "assigned_user_id", "name", "current_round"] + _CASE_SETTINGS
+    new_case_id = db.session.execute(
+        db.insert(Case).from_select(
+            columns,
+            db.select(
+                Case.project_id,
+                db.literal(False),
+                Case.assigned_user_id if include_users else db.null(),
+                name_expr,
+                db.literal(1),  # Kopien starten immer mit Runde 1
+                *[getattr(Case, column) for column in _CASE_SETTINGS],
+            ).where(Case.id == source_case_id),
+        ).returning(Case.id)
+    ).scalar()
+    if new_case_id is None:
+        return None
+
+    _copy_links(case_criteria, "case_id", source_case_id, case_criteria, "case_id", new_case_id, "criterion_id")
+    _copy_links(case_technologies, "case_id", source_case_id, case_technologies, "case_id", new_case_id, "technology_id")
+    if include_users:
+        _copy_links(case_users, "case_id", source_case_id, case_users, "case_id", new_case_id, "user_id")
+
+    if include_baseline:
+        copied = ["user_id", "criterion_id", "technology_id", "score",
+                  "fuzzy_vector_a", "fuzzy_vector_b", "fuzzy_vector_c"]
+        db.session.execute(
+            db.insert(Evaluation).from_select(
+                ["case_id", "round", "needs_reevaluation"] + copied,
+                db.select(
+                    db.literal(new_case_id), db.literal(1), db.literal(False),
+                    *[getattr(Evaluation, column) for column in copied],
+                ).where(Evaluation.case_id == source_case_id, Evaluation.round == 1),
+            )
+        )
+
+    return new_case_id
+
+
+def create_template_from_case(case_id, name, include_users=True):
+    """Speichert einen Case als Vorlage. Gibt die Vorlagen-ID oder None zurück."""
+    template_id = db.session.execute(
+        db.insert(CaseTemplate).from_select(
+            ["name", "source_case_id"] + _CASE_SETTINGS,
+            db.select(
+                db.literal(name), Case.id, *[getattr(Case, column) for column in _CASE_SETTINGS]
+            ).where(Case.id == case_id),
+        ).returning(CaseTemplate.id)
+    ).scalar()
+    if template_id is None:
+        return None
+
+    _copy_links(case_criteria, "case_id", case_id, case_template_criteria, "template_id", template_id, "criterion_id")
+    _copy_links(case_technologies, "case_id", case_id, case_template_technologies, "template_id", template_id, "technology_id")
+    if include_users:
+        _copy_links(case_users, "case_id", case_id, case_template_users, "template_id", template_id, "user_id")
+    return template_id
+
+
+def create_case_from_template(template_id, name=None, include_users=True, assigned_user_id=None, project_id=1):
+    """Legt einen neuen Case aus einer Vorlage an. Gibt die Case-ID oder None zurück."""
+    new_case_id = db.session.execute(
+        db.insert(Case).from_select(
+            ["project_id", "show_results", "assigned_user_id", "name", "current_round"] + _CASE_SETTINGS,
+            db.select(
+                db.literal(project_id),
+                db.literal(False),
+                db.literal(assigned_user_id, db.Integer),
+                db.literal(name) if name else CaseTemplate.name,
+                db.literal(1),
+                *[getattr(CaseTemplate, column) for column in _CASE_SETTINGS],
+            ).where(CaseTemplate.id == template_id),
+        ).returning(Case.id)
+    ).scalar()
+    if new_case_id is None:
+        return None
+
+    _copy_links(case_template_criteria, "template_id", template_id, case_criteria, "case_id", new_case_id, "criterion_id")
+    _copy_links(case_template_technologies, "template_id", template_id, case_technologies, "case_id", new_case_id, "technology_id")
+    if include_users:
+        _copy_links(case_template_users, "template_id", template_id, case_users, "case_id", new_case_id, "user_id")
+    return new_case_id
@@ -0,0 +1,76 @@
+"""
+Mengenbasiertes Löschen (und Archivieren) von Cases.
+
+db.session.delete(case) lädt über die ORM-Kaskaden jede abhängige Zeile in die
+Session bzw. scheitert an den Foreign Keys von evaluations, round_analysis und
+case_rounds. Hier wird stattdessen pro Tabelle ein DELETE in
+Abhängigkeitsreihenfolge ausgeführt – unabhängig von der Anzahl der Bewertungen.
+"""
+from src.models import (
+    db, Case, CaseArchive, CaseRound, CaseTemplate, Evaluation, ConsensusCell, RoundAnalysis, RoundResultDocument,
+    case_criteria, case_technologies, case_users,
+)
+
+
+def _archive_evaluations(case_id):
+    """Kopiert alle Bewertungen des Cases als ein JSON-Dokument nach case_archives."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        aggregate, build_array = db.func.jsonb_agg, db.func.jsonb_build_array
+        empty = db.cast(db.literal("[]"), CaseArchive.evaluations.type)
+    else:
+        aggregate, build_array = db.func.json_group_array, db.func.json_array
+        empty = db.literal("[]")
+
+    entries = db.select(
+        db.func.coalesce(
+            aggregate(build_array(*[getattr(Evaluation, c) for c in CaseArchive.EVALUATION_COLUMNS])),
+            empty,
+        )
+    ).where(Evaluation.case_id == Case.id).scalar_subquery()
+    count = db.select(db.func.count(Evaluation.id)).where(Evaluation.case_id == Case.id).scalar_subquery()
+
+    db.session.execute(
+        db.insert(CaseArchive).from_select(
+            ["case_id", "name", "case_type", "evaluation_count", "evaluations"],
+            db.select(Case.id, Case.name, Case.case_type, count, entries).where(Case.id == case_id),
+        )
+    )
+
+
+def delete_case(case_id, archive=False):
+    """
+    Löscht einen Case samt Bewertungen, Runden, Analysen und Zuordnungen.
+    Mit archive=True werden die Bewertungen vorher nach case_archives kopiert.
+    Gibt die Anzahl gelöschter Zeilen je Tabelle zurück oder None, falls der
+    Case nicht existiert. Committet nicht.
+    """
+    if not db.session.query(Case.query.filter_by(id=case_id).exists()).scalar():
+        return None
+
+    if archive:
+        _archive_evaluations(case_id)
+
+    deleted = {}
+
+    def _delete(name, statement):
+        deleted[name] = db.session.execute(
+            statement, execution_options={"synchronize_session": False}
+        ).rowcount
+
+    # Reihenfolge: zuerst alle Tabellen mit Foreign Keys auf cases
+    _delete("evaluations", db.delete(Evaluation).where(Evaluation.case_id == case_id))
+    _delete("consensus_cells", db.delete(ConsensusCell).where(ConsensusCell.case_id == case_id))
+    _delete("round_result_documents", db.delete(RoundResultDocument).where(RoundResultDocument.case_id == case_id))
+    _delete("round_analysis", db.delete(RoundAnalysis).where(RoundAnalysis.case_id == case_id))
+    _delete("case_rounds", db.delete(CaseRound).where(CaseRound.case_id == case_id))
+    for table in (case_criteria, case_technologies, case_users):
+        _delete(table.name, table.delete().where(table.c.case_id == case_id))
+    db.session.execute(
+        db.update(CaseTemplate).where(CaseTemplate.source_case_id == case_id).values(source_case_id=None),
+        execution_options={"synchronize_session": False}
+    )
+    _delete("cases", db.delete(Case).where(Case.id == case_id))
+
+    # Bereits geladene Objekte dürfen nicht mehr aus der Identity Map gelesen werden
+    db.session.expire_all()
+    return deleted
@@ -0,0 +1,74 @@
+"""
+Gemeinsamer Katalog für Kriterien und Technologien.
+
+Kriterien und Technologien werden über ihren normalisierten Namen dedupliziert:
+legt ein neuer Case ein bereits bekanntes Kriterium an, wird die vorhandene
+Zeile wiederverwendet. Alle Namen eines Cases werden mit einer Abfrage
+aufgelöst und fehlende Einträge mit einem einzigen INSERT angelegt.
+
+Weil ein Eintrag zu vielen Cases und Vorlagen gehören kann, dürfen ihn die
+Katalog-Routen nur löschen, solange er nirgends verwendet wird, und nur
+umbenennen, solange höchstens ein Case bzw. eine Vorlage ihn verwendet
+(siehe catalog_usage).
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models import (
+    db, normalize_catalog_name, Criterion,
+    case_criteria, case_technologies, case_template_criteria, case_template_technologies,
+)
+
+
+def _insert(model):
+    """Dialektspezifisches INSERT (für ON CONFLICT DO NOTHING)."""
+    dialect = db.session.get_bind().dialect.name
+    return (sqlite.insert if dialect == "sqlite" else postgresql.insert)(model)
+
+
+def resolve_catalog_ids(model, names, project_id=None):
+    """
+    Gibt die IDs der Katalogeinträge (Criterion oder Technology) für die
+    übergebenen Namen zurück – in Eingabereihenfolge, ohne Duplikate und
+    ohne leere Namen. Fehlende Einträge werden angelegt.
+    """
+    wanted = {}
+    for name in names:
+        normalized = normalize_catalog_name(name)
+        if normalized and normalized not in wanted:
+            wanted[normalized] = name.strip()
+    if not wanted:
+        return []
+
+    ids = dict(
+        db.session.query(model.normalized_name, model.id).filter(model.normalized_name.in_(wanted))
+    )
+
+    missing = [normalized for normalized in wanted if normalized not in ids]
+    if missing:
+        stmt = _insert(model).values([
+            {
+                "project_id": project_id,  # Für Abwärtskompatibilität beibehalten
+                "name": wanted[normalized],
+                "normalized_name": normalized
+            } for normalized in missing
+        ]).on_conflict_do_nothing(index_elements=["normalized_name"])
+        ids.update(db.session.execute(stmt.returning(model.normalized_name, model.id)).all())
+
+        # Parallel angelegte Einträge liefert RETURNING nicht zurück
+        if len(ids) < len(wanted):
+            ids.update(db.session.query(model.normalized_name, model.id).filter(
+                model.normalized_name.in_([n for n in missing if n not in ids])
+            ))
+
+    return [ids[normalized] for normalized in wanted]
+
+
+def catalog_usage(model, entry_id):
+    """Anzahl der Cases und Vorlagen, die den Eintrag verwenden (eine Abfrage)."""
+    if model is Criterion:
+        case_table, template_table, column = case_criteria, case_template_criteria, "criterion_id"
+    else:
+        case_table, template_table, column = case_technologies, case_template_technologies, "technology_id"
+    cases = db.select(db.func.count()).select_from(case_table).where(case_table.c[column] == entry_id)
+    templates = db.select(db.func.count()).select_from(template_table).where(template_table.c[column] == entry_id)
+    return db.session.execute(db.select(cases.scalar_subquery(), templates.scalar_subquery())).one()
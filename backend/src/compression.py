@@ -0,0 +1,135 @@
+"""
+Ausgehandelte Response-Komprimierung (gzip / Brotli).
+
+Die JSON-Antworten der Cases-Routen (Evaluations, Übersicht, Exporte) sind sehr
+repetitiv und lassen sich stark komprimieren. Die Komprimierung wird über den
+Accept-Encoding-Header des Clients ausgehandelt, greift erst ab einer
+Mindestgröße und funktioniert auch für gestreamte Antworten.
+
+Konfiguration (siehe config.Config):
+    COMPRESS_ENABLED         - globaler Schalter
+    COMPRESS_MIN_SIZE        - Mindestgröße in Bytes
+    COMPRESS_LEVEL           - gzip-Level (1-9)
+    COMPRESS_BROTLI_QUALITY  - Brotli-Qualität (0-11)
+    COMPRESS_MIMETYPES       - Liste komprimierbarer Mimetypes
+    COMPRESS_BLUEPRINTS      - Overrides pro Blueprint, z. B.
+                               {"cases": {"min_size": 512}, "auth": {"enabled": False}}
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Brotli ist optional, ohne wird nur gzip angeboten
+    brotli = None
+
+_SETTING_KEYS = {
+    "enabled": "COMPRESS_ENABLED",
+    "min_size": "COMPRESS_MIN_SIZE",
+    "level": "COMPRESS_LEVEL",
+    "brotli_quality": "COMPRESS_BROTLI_QUALITY",
+    "mimetypes": "COMPRESS_MIMETYPES",
+}
+
+_DEFAULTS = {
+    "enabled": True,
+    "min_size": 1024,
+    "level": 6,
+    "brotli_quality": 4,
+    "mimetypes": ["application/json", "text/csv", "text/plain", "text/html"],
+}
+
+
+def init_compression(app):
+    """Registriert die Komprimierung als after_request-Hook."""
+    for key, config_key in _SETTING_KEYS.items():
+        app.config.setdefault(config_key, _DEFAULTS[key])
+    app.config.setdefault("COMPRESS_BLUEPRINTS", {})
+    app.after_request(compress_response)
+
+
+def _settings_for(blueprint):
+    """Globale Einstellungen, überschrieben durch die des Blueprints."""
+    config = current_app.config
+    settings = {key: config[config_key] for key, config_key in _SETTING_KEYS.items()}
+    settings.update(config["COMPRESS_BLUEPRINTS"].get(blueprint, {}))
+    return settings
+
+
+def _negotiate_encoding():
+    """Wählt das beste vom Client akzeptierte Encoding (Brotli vor gzip)."""
+    accepted = request.accept_encodings
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress(data, encoding, settings):
+    if encoding == "br":
+        return brotli.compress(data, quality=settings["brotli_quality"])
+    compressor = zlib.compressobj(settings["level"], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding, settings):
+    """Komprimiert eine gestreamte Antwort Chunk für Chunk."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings["brotli_quality"])
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(settings["level"], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, flush = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            compressed = compress(chunk)
+            if compressed:
+                yield compressed
+        yield flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    """after_request-Hook: komprimiert die Antwort, falls sinnvoll."""
+    settings = _settings_for(request.blueprint)
+    if not settings["enabled"]:
+        return response
+
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in settings["mimetypes"]
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # Größe unbekannt – gestreamte Antworten werden immer komprimiert
+        response.response = _compress_stream(response.response, encoding, settings)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < settings["min_size"]:
+            return response
+        response.set_data(_compress(data, encoding, settings))
+
+    response.headers["Content-Encoding"] = encoding
+    # Komprimierte und unkomprimierte Repräsentation brauchen verschiedene ETags
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
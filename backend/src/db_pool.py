@@ -0,0 +1,179 @@
+"""
+Konfiguration und Metriken des SQLAlchemy-Connection-Pools.
+
+init_db_pool() baut SQLALCHEMY_ENGINE_OPTIONS aus den DB_*-Werten der
+Konfiguration und muss vor db.init_app() aufgerufen werden. Explizit gesetzte
+SQLALCHEMY_ENGINE_OPTIONS haben Vorrang.
+
+Der Pool zählt pro Prozess Checkouts, Timeouts, neue und verworfene
+Verbindungen sowie die Wartezeit auf eine Verbindung (GET /internal/pool).
+
+Mit DB_PGBOUNCER=True (PgBouncer im Transaction-Mode) poolt PgBouncer: die App
+öffnet pro Checkout eine Verbindung (NullPool) und setzt keine
+Session-Parameter, da aufeinanderfolgende Transaktionen auf verschiedenen
+Server-Verbindungen laufen können.
+"""
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Obergrenzen der Wartezeit-Buckets in Sekunden
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """Zähler des Connection-Pools eines Prozesses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checked_out = 0
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)  # letzter Bucket: +Inf
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            index = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+            self.wait_buckets[index] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def count(self, name, delta=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sum(self.wait_buckets)
+            return {
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait": {
+                    "count": waits,
+                    "total_seconds": round(self.wait_total, 6),
+                    "mean_seconds": round(self.wait_total / waits, 6) if waits else 0.0,
+                    "max_seconds": round(self.wait_max, 6),
+                    "buckets": {
+                        **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)},
+                        "+Inf": self.wait_buckets[-1],
+                    },
+                },
+            }
+
+
+pool_stats = PoolStats()
+
+# Ein geforkter Worker startet mit eigenen Zählern (und eigenem Lock)
+os.register_at_fork(after_in_child=pool_stats.__init__)
+
+
+class _InstrumentedPool:
+    """Misst die Zeit bis zur Ausgabe einer Verbindung (inkl. Warten auf einen freien Slot)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    pass
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.count("checkouts")
+    pool_stats.count("checked_out")
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats.count("checked_out", -1)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.count("connects")
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.count("invalidations")
+
+
+for _pool_class in (InstrumentedQueuePool, InstrumentedNullPool):
+    event.listen(_pool_class, "checkout", _on_checkout)
+    event.listen(_pool_class, "checkin", _on_checkin)
+    event.listen(_pool_class, "connect", _on_connect)
+    event.listen(_pool_class, "invalidate", _on_invalidate)
+
+
+def engine_options(config):
+    """Engine-Optionen für PostgreSQL aus den DB_*-Konfigurationswerten."""
+    connect_args = {"connect_timeout": config["DB_CONNECT_TIMEOUT"]}
+    if config["DB_PGBOUNCER"]:
+        # PgBouncer lehnt den Startparameter "options" ab; Pre-Ping ist bei
+        # frischen Verbindungen überflüssig
+        return {"poolclass": InstrumentedNullPool, "connect_args": connect_args}
+
+    if config["DB_STATEMENT_TIMEOUT"]:
+        connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "connect_args": connect_args,
+    }
+
+
+def init_db_pool(app):
+    """Setzt die Engine-Optionen (vor db.init_app aufrufen)."""
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        return
+    options = engine_options(app.config)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def pool_status(engine):
+    """Aktueller Zustand des Pools einer Engine plus die Zähler dieses Prozesses."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # overflow() ist negativ, solange pool_size noch nicht ausgeschöpft ist
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": current_app.config["SQLALCHEMY_ENGINE_OPTIONS"].get("max_overflow"),
+            "timeout": pool.timeout(),
+        })
+    status["stats"] = pool_stats.snapshot()
+    return status
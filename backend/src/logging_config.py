@@ -0,0 +1,208 @@
+"""
+Strukturiertes Logging für das Backend.
+
+Module loggen über logging.getLogger(__name__) mit %-Platzhaltern statt
+f-Strings – die Nachricht wird nur formatiert, wenn der Level aktiv ist und
+der Eintrag nicht weggesampelt wird:
+
+    logger.debug("Found %d active cases for user %s", len(cases), user_id)
+
+init_logging(app) richtet den Root-Logger nach der Konfiguration ein:
+
+    LOG_LEVEL         Standard-Level (INFO)
+    LOG_LEVELS        Level pro Logger, z. B. "src.routes.cases=DEBUG,sqlalchemy.engine=INFO"
+    LOG_FORMAT        text oder json (ein JSON-Objekt pro Zeile für die Log-Pipeline)
+    LOG_SAMPLE_RATES  Anteil der DEBUG/INFO-Einträge pro Logger, die ausgegeben werden,
+                      z. B. "src.routes.cases=0.01"; WARNING und höher immer
+
+Geschrieben wird nicht im Request-Thread: der QueueHandler legt die Einträge
+in eine Queue, ein QueueListener-Thread gibt sie auf stderr aus. Im
+Request-Kontext werden Methode, Pfad und Endpoint mitgeloggt, zusätzliche
+Felder über extra={...}.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+
+FORMATS = ("text", "json")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request)s] %(message)s"
+
+# Attribute jedes LogRecords; alles andere kam über extra={...} und wird mitgeloggt
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request", "method", "path", "endpoint"}
+
+_handler = None
+_start_lock = threading.Lock()  # Start des Listeners nach einem Fork
+
+
+def _reset_start_lock():
+    # Ein beim Fork von einem anderen Thread gehaltener Lock bliebe im Kind gesperrt
+    global _start_lock
+    _start_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_start_lock)
+
+
+def parse_mapping(value, convert):
+    """ "a=1,b=2" -> {"a": convert("1"), "b": convert("2")}; Dicts werden übernommen."""
+    if isinstance(value, dict):
+        return {key: convert(item) for key, item in value.items()}
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        key, _, item = item.partition("=")
+        mapping[key.strip()] = convert(item.strip())
+    return mapping
+
+
+def _level(value):
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {value!r}")
+    return level
+
+
+def _logger_setting(settings, name):
+    """Eintrag für den Logger oder seinen nächsten Eltern-Logger ("src.routes" gilt für "src.routes.cases")."""
+    while name:
+        if name in settings:
+            return settings[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+class RequestContextFilter(logging.Filter):
+    """Hängt Methode, Pfad und Endpoint des laufenden Requests an (im Request-Thread)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method, record.path, record.endpoint = request.method, request.path, request.endpoint
+            record.request = f"{request.method} {request.path}"
+        else:
+            record.method = record.path = record.endpoint = None
+            record.request = "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Lässt von DEBUG/INFO-Einträgen nur den konfigurierten Anteil pro Logger durch."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = _logger_setting(self.rates, record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("method", "path", "endpoint"):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _AsyncHandler(QueueHandler):
+    """
+    QueueHandler mit eigenem Listener-Thread. Fork-sicher: nach dem Fork eines
+    gunicorn-Workers startet der erste Eintrag im Worker einen neuen Listener.
+    """
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self.listener = None
+        self._pid = None
+
+    def prepare(self, record):
+        # Nachricht und Traceback im aufrufenden Thread auflösen (die Argumente
+        # könnten sich sonst noch ändern), die Formatierung macht der Listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            # Nur ein Thread startet den Listener; sonst liefe ein zweiter auf
+            # einer verwaisten Queue weiter, die stop() beim Beenden nicht leert
+            with _start_lock:
+                if self._pid != os.getpid():
+                    self.start()
+        super().enqueue(record)
+
+    def start(self):
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def stop(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        self._pid = None
+
+
+def init_logging(app):
+    """Konfiguriert den Root-Logger; wiederholte Aufrufe ersetzen die vorherige Konfiguration."""
+    global _handler
+
+    app.config.setdefault("LOG_LEVEL", "INFO")
+    app.config.setdefault("LOG_LEVELS", {})
+    app.config.setdefault("LOG_FORMAT", "text")
+    app.config.setdefault("LOG_SAMPLE_RATES", {})
+    log_format = app.config["LOG_FORMAT"]
+    if log_format not in FORMATS:
+        raise ValueError(f"LOG_FORMAT must be one of {', '.join(FORMATS)}, got {log_format!r}")
+    levels = parse_mapping(app.config["LOG_LEVELS"], _level)
+    rates = parse_mapping(app.config["LOG_SAMPLE_RATES"], float)
+
+    target = logging.StreamHandler(sys.stderr)
+    target.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    if _handler is not None:
+        _handler.stop()
+        root.removeHandler(_handler)
+    _handler = _AsyncHandler(target)
+    _handler.addFilter(SamplingFilter(rates))
+    _handler.addFilter(RequestContextFilter())
+    root.addHandler(_handler)
+    root.setLevel(_level(app.config["LOG_LEVEL"]))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+@atexit.register
+def _flush():
+    # Ausstehende Einträge beim Beenden noch schreiben
+    if _handler is not None:
+        _handler.stop()
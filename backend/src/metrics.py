@@ -0,0 +1,134 @@
+"""
+Request-Metriken im Prometheus-Format (GET /metrics).
+
+Pro Endpoint (Flask-URL-Regel) werden erfasst:
+    - Latenz und Anzahl der Requests (nach Statuscode)
+    - Anzahl der SQL-Statements und die gesamte DB-Zeit pro Request
+      (über die Cursor-Events von SQLAlchemy)
+    - Größe der Antwort in Bytes (nach der Komprimierung)
+
+Unter gunicorn mit mehreren Workern werden die Werte aller Prozesse über
+PROMETHEUS_MULTIPROC_DIR zusammengeführt (siehe gunicorn.conf.py).
+
+Mit METRICS_SERVER_TIMING (Standard: nur bei explizit gesetztem DEBUG)
+bekommt jede Antwort einen Server-Timing-Header, z. B. `db;dur=12.4;desc="37 queries", app;dur=48.0` –
+damit sind N+1-Abfragen direkt in den DevTools des Browsers sichtbar.
+"""
+import os
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency", ["method", "endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Requests by status code", ["method", "endpoint", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size", ["method", "endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements per request", ["method", "endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Total SQL execution time per request", ["method", "endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+def init_metrics(app):
+    """
+    Registriert die Request-Hooks und GET /metrics. Vor init_compression()
+    aufrufen, damit die gemessene Antwortgröße die komprimierte ist.
+    """
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_SERVER_TIMING", False)
+    app.config.setdefault("METRICS_AUTH_TOKEN", None)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
+
+
+# ------------------------------
+# SQL-Statements pro Request
+# ------------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    # Statements außerhalb eines Requests (CLI, Hintergrund-Threads) werden nicht gezählt
+    if has_request_context() and "metrics_start" in g:
+        g.db_statements += 1
+        g.db_time += elapsed
+
+
+# ------------------------------
+# Request-Hooks
+# ------------------------------
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.db_statements = 0
+    g.db_time = 0.0
+
+
+def _endpoint_label():
+    # URL-Regel statt Pfad, damit IDs keine neuen Zeitreihen erzeugen
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+def _record_request(response):
+    if "metrics_start" not in g or request.endpoint == "metrics":
+        return response
+    elapsed = time.perf_counter() - g.metrics_start
+    labels = (request.method, _endpoint_label())
+
+    REQUEST_LATENCY.labels(*labels).observe(elapsed)
+    REQUEST_COUNT.labels(*labels, str(response.status_code)).inc()
+    DB_STATEMENTS.labels(*labels).observe(g.db_statements)
+    DB_TIME.labels(*labels).observe(g.db_time)
+    # Bei gestreamten Antworten ist die Größe vorab nicht bekannt
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(*labels).observe(response.content_length)
+
+    if current_app.config["METRICS_SERVER_TIMING"]:
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={g.db_time * 1000:.1f};desc="{g.db_statements} queries", app;dur={elapsed * 1000:.1f}'
+        )
+    return response
+
+
+# ------------------------------
+# Endpoint
+# ------------------------------
+
+def metrics_view():
+    token = current_app.config["METRICS_AUTH_TOKEN"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Werte aller Worker-Prozesse zusammenführen
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -1,8 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 db = SQLAlchemy()
 
+def normalize_catalog_name(name):
+    """Normalisierter Name für den Kriterien-/Technologie-Katalog (Whitespace, Groß-/Kleinschreibung)."""
+    return " ".join(name.split()).lower() if name else None
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -22,6 +29,17 @@ class User(db.Model):
     def __repr__(self):
         return f"<User {self.username}>"
 
+# Suchindizes für GET /auth/users/search (nur PostgreSQL): Trigramm-Indizes für
+# Teilstring-Suchen auf username/email und ein GIN-Index für Custom Fields
+event.listen(User.__table__, 'before_create', DDL(
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+).execute_if(dialect='postgresql'))
+event.listen(User.__table__, 'after_create', DDL(
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops);"
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops);"
+    "CREATE INDEX IF NOT EXISTS ix_users_custom_fields ON users USING gin ((custom_fields::jsonb) jsonb_path_ops)"
+).execute_if(dialect='postgresql'))
+
 class Project(db.Model):
     __tablename__ = 'projects'
     id = db.Column(db.Integer, primary_key=True)
@@ -43,6 +61,8 @@ class Criterion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, nullable=True)  # Behalten für Abwärtskompatibilität, aber nicht mehr als ForeignKey
     name = db.Column(db.String(255))
+    # Eindeutiger Katalogschlüssel – gleichnamige Kriterien werden von allen Cases geteilt
+    normalized_name = db.Column(db.String(255), unique=True, index=True)
     rating = db.Column(db.Integer)  # Likert-Skala 1-5
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -51,6 +71,11 @@ class Criterion(db.Model):
     cases = db.relationship('Case', secondary='case_criteria', back_populates='criteria')
     evaluations = db.relationship('Evaluation', back_populates='criterion')
 
+    @validates('name')
+    def _set_normalized_name(self, key, name):
+        self.normalized_name = normalize_catalog_name(name)
+        return name
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -66,6 +91,13 @@ class Technology(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, nullable=True)  # Behalten für Abwärtskompatibilität, aber nicht mehr als ForeignKey
     name = db.Column(db.String(100), nullable=False)
+    # Eindeutiger Katalogschlüssel – gleichnamige Technologien werden von allen Cases geteilt
+    normalized_name = db.Column(db.String(100), unique=True, index=True)
+
+    @validates('name')
+    def _set_normalized_name(self, key, name):
+        self.normalized_name = normalize_catalog_name(name)
+        return name
 
 class Case(db.Model):
     __tablename__ = 'cases'
@@ -74,7 +106,7 @@ class Case(db.Model):
     case_type = db.Column(db.String(10), nullable=False)  # 'internal' oder 'external'
     show_results = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
-    assigned_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    assigned_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     name = db.Column(db.String(100), nullable=True)  # Name des Cases
     # Grenzwerte für die Rundenanalyse
     threshold_distance_mean = db.Column(db.Float, default=0.166667)  # Standardwert 1/6
@@ -110,11 +142,48 @@ case_technologies = db.Table('case_technologies',
 # Neue Tabelle für die direkte Zuordnung von Benutzern zu Cases
 case_users = db.Table('case_users',
     db.Column('case_id', db.Integer, db.ForeignKey('cases.id'), primary_key=True),
-    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
+    # Der Primärschlüssel (case_id, user_id) deckt Abfragen nach Benutzer nicht ab
+    db.Index('ix_case_users_user_id', 'user_id')
+)
+
+class CaseTemplate(db.Model):
+    """Vorlage für wiederkehrende Delphi-Studien (Kriterien, Technologien, Benutzer, Grenzwerte)."""
+    __tablename__ = 'case_templates'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    case_type = db.Column(db.String(10), nullable=False)  # 'internal' oder 'external'
+    threshold_distance_mean = db.Column(db.Float, default=0.166667)
+    threshold_criteria_percent = db.Column(db.Float, default=75.0)
+    threshold_tech_percent = db.Column(db.Float, default=75.0)
+    # Case, aus dem die Vorlage erstellt wurde (nur zur Information)
+    source_case_id = db.Column(db.Integer, db.ForeignKey('cases.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    criteria = db.relationship('Criterion', secondary='case_template_criteria')
+    technologies = db.relationship('Technology', secondary='case_template_technologies')
+    users = db.relationship('User', secondary='case_template_users')
+
+case_template_criteria = db.Table('case_template_criteria',
+    db.Column('template_id', db.Integer, db.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('criterion_id', db.Integer, db.ForeignKey('criteria.id'), primary_key=True)
+)
+
+case_template_technologies = db.Table('case_template_technologies',
+    db.Column('template_id', db.Integer, db.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('technology_id', db.Integer, db.ForeignKey('technologies.id'), primary_key=True)
+)
+
+case_template_users = db.Table('case_template_users',
+    db.Column('template_id', db.Integer, db.ForeignKey('case_templates.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
 )
 
 class CaseRound(db.Model):
     __tablename__ = 'case_rounds'
+    __table_args__ = (
+        db.UniqueConstraint('case_id', 'round_number', name='uq_case_rounds_case_round'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
     round_number = db.Column(db.Integer, nullable=False)
@@ -126,8 +195,32 @@ class CaseRound(db.Model):
 
 class Evaluation(db.Model):
     __tablename__ = 'evaluations'
-    id = db.Column(db.Integer, primary_key=True)
-    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    __table_args__ = (
+        # Analyse und Ergebnisansichten: alle Bewertungen einer Zelle einer Runde
+        db.Index('ix_evaluations_case_round_cell', 'case_id', 'round', 'criterion_id', 'technology_id'),
+        # Eine Bewertung pro Benutzer und Zelle und Runde; deckt zugleich (case_id, user_id, round) ab.
+        # technology_id ist bei reinen Kriterienbewertungen NULL, daher NULLS NOT DISTINCT (PostgreSQL 15+)
+        db.UniqueConstraint(
+            'case_id', 'user_id', 'round', 'criterion_id', 'technology_id',
+            name='uq_evaluations_user_cell', postgresql_nulls_not_distinct=True
+        ),
+        # Offene Neubewertungen sind nur ein kleiner Teil der Tabelle
+        db.Index(
+            'ix_evaluations_needs_reevaluation', 'case_id', 'round', 'user_id',
+            postgresql_where=db.text('needs_reevaluation'),
+            sqlite_where=db.text('needs_reevaluation')
+        ),
+        # Hash-Partitionierung nach Case (nur PostgreSQL, Partitionen siehe unten).
+        # Alle Abfragen sind auf einen Case beschränkt und treffen so genau eine Partition
+        {'postgresql_partition_by': 'HASH (case_id)'},
+    )
+    # Anzahl der Hash-Partitionen; eine Änderung erfordert eine Migration
+    PARTITIONS = 16
+
+    # Der Partitionsschlüssel muss Teil des Primärschlüssels sein (id, case_id);
+    # für das ORM bleibt id allein der Identitätsschlüssel
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), primary_key=True, autoincrement=False)
     round = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     criterion_id = db.Column(db.Integer, db.ForeignKey('criteria.id'), nullable=False)
@@ -144,9 +237,20 @@ class Evaluation(db.Model):
     # Beziehung zum Kriterium
     criterion = db.relationship("Criterion", back_populates="evaluations")
 
+    __mapper_args__ = {'primary_key': [id]}
+
+event.listen(Evaluation.__table__, 'after_create', DDL(";".join(
+    f"CREATE TABLE evaluations_p{i:02d} PARTITION OF evaluations "
+    f"FOR VALUES WITH (MODULUS {Evaluation.PARTITIONS}, REMAINDER {i})"
+    for i in range(Evaluation.PARTITIONS)
+)).execute_if(dialect='postgresql'))
+
 class RoundAnalysis(db.Model):
     """Analyseergebnis einer Runde."""
     __tablename__ = 'round_analysis'
+    __table_args__ = (
+        db.UniqueConstraint('case_id', 'round_number', name='uq_round_analysis_case_round'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
@@ -178,9 +282,90 @@ class RoundAnalysis(db.Model):
     # Gesamtergebnis
     passed_analysis = db.Column(db.Boolean, nullable=False)
 
+    # Telemetrie des Analyselaufs (src/analysis.py); NULL bei älteren Analysen
+    wall_time_ms = db.Column(db.Float, nullable=True)
+    db_time_ms = db.Column(db.Float, nullable=True)
+    cell_count = db.Column(db.Integer, nullable=True)
+    evaluation_count = db.Column(db.Integer, nullable=True)
+    peak_memory_kb = db.Column(db.Integer, nullable=True)  # NULL, wenn nicht gemessen
+    engine_version = db.Column(db.String(20), nullable=True)
+
     def __repr__(self):
         return f"<RoundAnalysis Case {self.case_id} Round {self.round_number}>"
 
+class ConsensusCell(db.Model):
+    """
+    Ergebnis einer Zelle (Kriterium bzw. Kriterium × Technologie) in einer
+    analysierten Runde: Mittelwert der Fuzzy-Vektoren, mittlere Distanz dazu,
+    Anzahl der Bewertungen und ob die Zelle im grünen Bereich liegt.
+    """
+    __tablename__ = 'consensus_cells'
+    __table_args__ = (
+        db.Index('ix_consensus_cells_case_round', 'case_id', 'round_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('round_analysis.id'), nullable=False)
+    criterion_id = db.Column(db.Integer, db.ForeignKey('criteria.id'), nullable=False)
+    technology_id = db.Column(db.Integer, db.ForeignKey('technologies.id'), nullable=True)  # NULL: Kriterium allein
+    mean_a = db.Column(db.Float, nullable=False)
+    mean_b = db.Column(db.Float, nullable=False)
+    mean_c = db.Column(db.Float, nullable=False)
+    mean_distance = db.Column(db.Float, nullable=False)
+    expert_count = db.Column(db.Integer, nullable=False)
+    ok = db.Column(db.Boolean, nullable=False)
+
+class RoundResultDocument(db.Model):
+    """
+    Vollständiges Ergebnis einer analysierten Runde als gzip-komprimiertes JSON
+    (src/round_results.py). Wird einmal bei der Analyse geschrieben und nie geändert.
+    """
+    __tablename__ = 'round_result_documents'
+    __table_args__ = (
+        db.UniqueConstraint('case_id', 'round_number', name='uq_round_result_documents_case_round'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('cases.id'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('round_analysis.id'), nullable=False, unique=True)
+    format_version = db.Column(db.Integer, nullable=False)  # Aufbau des Dokuments
+    engine_version = db.Column(db.String(20), nullable=True)  # Analyseverfahren (src/analysis.py)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    etag = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # Bytes unkomprimiert
+    content = db.Column(db.LargeBinary, nullable=False)  # gzip
+
+# Bereits komprimiert: PostgreSQL soll nicht erneut (vergeblich) per TOAST komprimieren
+event.listen(RoundResultDocument.__table__, 'after_create', DDL(
+    "ALTER TABLE round_result_documents ALTER COLUMN content SET STORAGE EXTERNAL"
+).execute_if(dialect='postgresql'))
+
+class CaseArchive(db.Model):
+    """Archivierte Bewertungen eines gelöschten Cases (ein Datensatz pro Case)."""
+    __tablename__ = 'case_archives'
+
+    # Spaltenreihenfolge der Einträge in `evaluations`
+    EVALUATION_COLUMNS = [
+        'user_id', 'round', 'criterion_id', 'technology_id', 'score',
+        'fuzzy_vector_a', 'fuzzy_vector_b', 'fuzzy_vector_c', 'needs_reevaluation', 'created_at'
+    ]
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, nullable=False, index=True)  # Kein ForeignKey – der Case ist gelöscht
+    name = db.Column(db.String(100), nullable=True)
+    case_type = db.Column(db.String(10), nullable=True)
+    archived_at = db.Column(db.DateTime, server_default=db.func.now())
+    evaluation_count = db.Column(db.Integer, nullable=False, default=0)
+    # Liste von Arrays (siehe EVALUATION_COLUMNS); in PostgreSQL per TOAST/lz4 komprimiert
+    evaluations = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'), nullable=False)
+
+event.listen(CaseArchive.__table__, 'after_create', DDL(
+    "ALTER TABLE case_archives ALTER COLUMN evaluations SET COMPRESSION lz4"
+).execute_if(dialect='postgresql'))
+
 # Neue Tabelle für die Token-Blacklist (persistente Speicherung)
 class TokenBlacklist(db.Model):
     __tablename__ = 'token_blacklist'
@@ -190,10 +375,13 @@ class TokenBlacklist(db.Model):
     jti = db.Column(db.String(36), unique=True, nullable=False)  # JWT Identifier
     token_type = db.Column(db.String(10), nullable=False)  # "access" oder "refresh"
     created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
+    # Ablaufzeitpunkt des Tokens (exp-Claim, UTC) – danach kann der Eintrag gelöscht werden
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
 
-    def __init__(self, jti, token_type):
+    def __init__(self, jti, token_type, expires_at=None):
         self.jti = jti
         self.token_type = token_type
+        self.expires_at = expires_at
 
     def __repr__(self):
         return f"<TokenBlacklist {self.jti}>"
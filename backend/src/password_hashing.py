@@ -0,0 +1,51 @@
+"""
+Passwort-Hashing für Massenoperationen.
+
+generate_password_hash ist absichtlich langsam. Für Bulk-Importe werden die
+Hashes daher in einem Prozess-Pool parallel berechnet, statt den Request-Thread
+für jeden Benutzer zu blockieren.
+"""
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+_pool = None
+_pool_pid = None
+_pool_workers = 1
+
+# Kleine Batches lohnen den Umweg über den Pool nicht
+_MIN_PARALLEL_BATCH = 8
+
+
+def _get_pool():
+    global _pool, _pool_pid, _pool_workers
+    if _pool is None or _pool_pid != os.getpid():
+        _pool_workers = current_app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1
+        # Kein fork: der Worker hat weitere Threads (gthread, Logging, Pool), deren
+        # Locks im Kind gesperrt bleiben könnten
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            max_workers=_pool_workers, mp_context=multiprocessing.get_context(start_method)
+        )
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def hash_passwords(passwords):
+    """Gibt die Hashes der übergebenen Passwörter in derselben Reihenfolge zurück."""
+    passwords = list(passwords)
+    if len(passwords) < _MIN_PARALLEL_BATCH:
+        return [generate_password_hash(password) for password in passwords]
+    pool = _get_pool()
+    chunksize = max(len(passwords) // (_pool_workers * 4), 1)
+    return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,224 @@
+"""
+Profiling einzelner Requests mit cProfile.
+
+Ein Request wird profiliert, wenn
+    - ein Master den Header `X-Profile: 1` mitschickt (PROFILE_HEADER_ENABLED) oder
+    - er in die Stichprobe fällt (PROFILE_SAMPLE_RATE, z. B. 0.001 = jeder tausendste).
+
+Das Profil umfasst den ganzen Request inkl. der übrigen Hooks (Metriken,
+Komprimierung) und wird als .prof-Datei (pstats, z. B. `python -m pstats` oder
+snakeviz) mit einer .json-Zusammenfassung in PROFILE_DIR abgelegt. Die
+Zusammenfassung teilt die Zeit auf Datenbank-Treiber, ORM, SQLAlchemy Core,
+NumPy, JSON-Serialisierung und den Rest auf. Das Verzeichnis ist ein
+Ringpuffer: es bleiben die neuesten PROFILE_MAX_FILES Profile (über alle
+Worker). Abruf über GET /admin/profiles und /admin/profiles/<id>; bei
+Header-Profilen steht die ID im Antwort-Header X-Profile-Id.
+
+cProfile erfasst nur den Thread, in dem es läuft, und pro Prozess ist nur ein
+Profiler gleichzeitig aktiv – parallele Requests im selben Worker werden in der
+Zeit nicht profiliert (Antwort-Header `X-Profile-Id: busy`).
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"^[\w.-]+$")
+# Endpoints, die nie per Stichprobe profiliert werden
+EXCLUDED_ENDPOINTS = {"metrics", "admin.admin_get_profiles", "admin.admin_download_profile", "static"}
+
+# Zuordnung der Funktionen (Datei bzw. eingebaute Methode) zu Komponenten; der erste Treffer zählt
+COMPONENTS = (
+    ("database", re.compile(r"psycopg2|sqlite3|cursor")),
+    ("orm", re.compile(r"sqlalchemy[/\\]orm")),
+    ("sqlalchemy", re.compile(r"sqlalchemy")),
+    ("numpy", re.compile(r"numpy")),
+    ("serialization", re.compile(r"[/\\]json[/\\]|flask[/\\]json|'_json\.|encode_basestring")),
+)
+
+_active = threading.Lock()  # cProfile: ein Profiler pro Prozess
+
+
+def init_profiling(app):
+    """
+    Registriert die Hooks (nur wenn Header oder Stichprobe aktiv sind). Vor
+    init_metrics() aufrufen, damit das Profil deren Hooks mit erfasst.
+    """
+    app.config.setdefault("PROFILE_HEADER_ENABLED", True)
+    app.config.setdefault("PROFILE_SAMPLE_RATE", 0.0)
+    app.config.setdefault("PROFILE_DIR", "/tmp/profiles")
+    app.config.setdefault("PROFILE_MAX_FILES", 50)
+    if not app.config["PROFILE_HEADER_ENABLED"] and not app.config["PROFILE_SAMPLE_RATE"]:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_stop_profiler)
+
+
+def _requested_by_master():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return False
+    return bool(identity) and identity.get("role") == "master"
+
+
+def _trigger():
+    config = current_app.config
+    if config["PROFILE_HEADER_ENABLED"] and request.headers.get("X-Profile") == "1" and _requested_by_master():
+        return "header"
+    rate = config["PROFILE_SAMPLE_RATE"]
+    if rate and request.endpoint not in EXCLUDED_ENDPOINTS and random.random() < rate:
+        return "sample"
+    return None
+
+
+def _start_profile():
+    trigger = _trigger()
+    if trigger is None:
+        return
+    if not _active.acquire(blocking=False):
+        g.profile_busy = trigger == "header"
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Ein anderes Werkzeug (z. B. ein Debugger) belegt den Profiler
+        _active.release()
+        g.profile_busy = trigger == "header"
+        return
+    g.profile = (profiler, trigger, time.perf_counter())
+
+
+def _stop_profiler(exc=None):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile[0].disable()
+        _active.release()
+    return profile
+
+
+def _finish_profile(response):
+    if g.pop("profile_busy", False):
+        response.headers["X-Profile-Id"] = "busy"
+    profile = _stop_profiler()
+    if profile is None:
+        return response
+    profiler, trigger, start = profile
+    duration_ms = (time.perf_counter() - start) * 1000
+    try:
+        profile_id = _save(profiler, trigger, duration_ms, response.status_code)
+    except OSError:
+        logger.exception("Could not store profile")
+        return response
+    logger.info("Stored profile %s (%s, %.1f ms)", profile_id, trigger, duration_ms)
+    if trigger == "header":
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _component(filename, function):
+    location = f"{filename} {function}"
+    for name, pattern in COMPONENTS:
+        if pattern.search(location):
+            return name
+    return "other"
+
+
+def _summary(stats):
+    """Eigene Zeit (tottime) pro Komponente und die teuersten Funktionen."""
+    components = dict.fromkeys([name for name, _ in COMPONENTS] + ["other"], 0.0)
+    for (filename, _, function), (_, calls, tottime, _, _) in stats.stats.items():
+        components[_component(filename, function)] += tottime * 1000
+    top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:15]
+    return {
+        "components_ms": {name: round(value, 3) for name, value in components.items()},
+        "top_functions": [{
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        } for (filename, line, function), (_, calls, tottime, cumtime, _) in top],
+    }
+
+
+def _save(profiler, trigger, duration_ms, status):
+    directory = current_app.config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    # Sortierbar nach Zeit, eindeutig über Worker hinweg
+    profile_id = f"{time.time_ns() // 1000}-{os.getpid()}-{request.endpoint or 'unknown'}"
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+
+    identity = None
+    if trigger == "header":
+        identity = get_jwt_identity()
+    metadata = {
+        "id": profile_id,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "trigger": trigger,
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": status,
+        "duration_ms": round(duration_ms, 3),
+        "user_id": identity.get("user_id") if identity else None,
+        "pid": os.getpid(),
+        **_summary(stats),
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+        json.dump(metadata, f)
+    _prune(directory, current_app.config["PROFILE_MAX_FILES"])
+    return profile_id
+
+
+def _profile_ids(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith(".prof"))
+
+
+def _prune(directory, max_files):
+    """Löscht die ältesten Profile über max_files hinaus (andere Worker können gleichzeitig löschen)."""
+    for profile_id in _profile_ids(directory)[:-max_files or None]:
+        for suffix in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Zusammenfassungen aller gespeicherten Profile, neueste zuerst."""
+    directory = current_app.config["PROFILE_DIR"]
+    profiles = []
+    for profile_id in reversed(_profile_ids(directory)):
+        try:
+            with open(os.path.join(directory, f"{profile_id}.json")) as f:
+                profiles.append(json.load(f))
+        except (FileNotFoundError, ValueError):
+            continue  # Gerade gelöscht oder noch nicht fertig geschrieben
+    return profiles
+
+
+def profile_path(profile_id):
+    """Pfad der .prof-Datei oder None, wenn es das Profil nicht gibt."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(current_app.config["PROFILE_DIR"], f"{profile_id}.prof")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,120 @@
+"""
+Query-Budgets: maximale Anzahl SQL-Statements pro Endpoint.
+
+Das Budget wird an der View deklariert (direkt unter @route)
+
+    @cases_bp.route('/<int:case_id>', methods=['GET'])
+    @query_budget(8)
+    def get_case(case_id): ...
+
+oder über QUERY_BUDGETS in der Konfiguration ({"cases.get_case": 8}), das
+Vorrang vor dem Decorator hat. QUERY_BUDGET_DEFAULT gilt für Endpoints ohne
+eigenes Budget (None = nicht geprüft).
+
+QUERY_BUDGET_MODE steuert die Prüfung:
+    off   – keine Erfassung (Standard, kein Overhead)
+    warn  – Überschreitungen werden mit den Statements geloggt (WARNING)
+    raise – der Request schlägt mit QueryBudgetExceeded fehl (für Tests,
+            siehe benchmarks/query_budgets.py)
+
+Die Statements werden nach SQL und Aufrufstelle im Backend-Code gruppiert
+ausgegeben – ein N+1-Muster erscheint als dasselbe SELECT aus derselben Zeile
+mit hoher Anzahl.
+"""
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("off", "warn", "raise")
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Ein Request hat mehr SQL-Statements ausgeführt, als sein Budget erlaubt."""
+
+
+def query_budget(max_statements):
+    """Deklariert die maximale Anzahl SQL-Statements einer View."""
+    def decorator(view):
+        view.query_budget = max_statements
+        return view
+    return decorator
+
+
+def init_query_budget(app):
+    app.config.setdefault("QUERY_BUDGET_MODE", "off")
+    app.config.setdefault("QUERY_BUDGETS", {})
+    app.config.setdefault("QUERY_BUDGET_DEFAULT", None)
+    mode = app.config["QUERY_BUDGET_MODE"]
+    if mode not in MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == "off":
+        return
+    # Listener erst hier registrieren, damit der Normalbetrieb nichts davon merkt
+    if not event.contains(Engine, "before_cursor_execute", _record_statement):
+        event.listen(Engine, "before_cursor_execute", _record_statement)
+    app.before_request(_start_request)
+    app.after_request(_check_budget)
+
+
+def _start_request():
+    g.query_budget_log = []
+
+
+def _origin():
+    """Die innersten Aufrufstellen im Backend-Code (ohne Bibliotheken und dieses Modul)."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(BACKEND_DIR)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return " <- ".join(
+        f"{os.path.relpath(frame.filename, BACKEND_DIR)}:{frame.lineno} in {frame.name}"
+        for frame in reversed(frames[-3:])
+    ) or "<unknown>"
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "query_budget_log" in g:
+        g.query_budget_log.append((re.sub(r"\s+", " ", statement).strip(), _origin()))
+
+
+def _budget():
+    budgets = current_app.config["QUERY_BUDGETS"]
+    if request.endpoint in budgets:
+        return budgets[request.endpoint]
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "query_budget", current_app.config["QUERY_BUDGET_DEFAULT"])
+
+
+def _report(budget):
+    log = g.query_budget_log
+    lines = [f"{request.method} {request.path} ({request.endpoint}) executed {len(log)} SQL statements, budget {budget}:"]
+    for (statement, origin), count in Counter(log).most_common():
+        if len(statement) > 200:
+            statement = statement[:200] + " ..."
+        lines.append(f"  {count:>4}x {statement}")
+        lines.append(f"        at {origin}")
+    return "\n".join(lines)
+
+
+def _check_budget(response):
+    if "query_budget_log" not in g:
+        return response
+    budget = _budget()
+    if budget is None or len(g.query_budget_log) <= budget:
+        return response
+    message = _report(budget)
+    if current_app.config["QUERY_BUDGET_MODE"] == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning("%s", message)
+    return response
@@ -0,0 +1,276 @@
+"""
+Rangfolge der Technologien eines Cases.
+
+Grundlage ist die Konsensmatrix der zuletzt analysierten Runde: pro Experte
+und Zelle zählt seine letzte Bewertung bis zu dieser Runde (Neubewertungen
+ersetzen ältere Werte), pro Zelle der Mittelwert dieser Fuzzy-Vektoren
+(a, b, c). Die Kriterienbewertungen (technology_id = NULL) sind die Gewichte;
+ohne Bewertungen wird Criterion.rating (Likert 1-5) als Dreieckszahl
+verwendet, ohne beides ein mittleres Gewicht.
+
+Berechnet werden beide Verfahren, sortiert wird nach dem angefragten:
+
+    topsis        Fuzzy-TOPSIS nach Chen (2000): Matrix pro Kriterium auf das
+                  größte c normiert, gewichtet, Vertex-Distanz zur idealen
+                  (1, 1, 1) und anti-idealen Lösung (0, 0, 0), Score ist der
+                  Closeness-Koeffizient d- / (d* + d-)
+    weighted_sum  Gewichtete Summe der normierten Dreieckszahlen, per
+                  Schwerpunkt defuzzifiziert und durch die Summe der Gewichte geteilt
+
+Alle Schritte laufen vektorisiert in NumPy über Arrays der Form
+(Technologien, Kriterien, 3). Das Ergebnis wird pro RoundAnalysis-ID,
+RANKING_VERSION und Datenstand zwischengespeichert (Redis bzw. LRU pro
+Prozess). Die Eingaben können sich nach der Analyse noch ändern (erneut
+gespeicherte Bewertungen, geänderte Kriterien, Technologien oder Ratings);
+der Datenstand ist deshalb ein Fingerprint aus den Stammdaten und einer
+Aggregat-Abfrage über die Bewertungen (siehe _data_version). Namen kommen beim
+Abruf aus dem Stammdaten-Cache (src/case_cache.py) dazu.
+
+Wie src/analysis.py wird das Modul wegen NumPy erst in der Route importiert.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+from src.case_cache import get_case_metadata
+from src.models import db, Evaluation
+from src.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Version des Verfahrens; bei Änderungen an der Berechnung erhöhen (neuer Cache-Schlüssel)
+RANKING_VERSION = "1"
+METHODS = ("topsis", "weighted_sum")
+
+# Gewicht ohne Bewertungen und ohne Rating (entspricht Rating 3)
+DEFAULT_WEIGHT = (0.25, 0.5, 0.75)
+
+_lock = threading.Lock()
+_local = OrderedDict()  # Cache-Schlüssel -> Ergebnis
+
+
+def rating_weight(rating):
+    """Likert-Rating 1-5 als Dreieckszahl in [0, 1]; None ohne Rating."""
+    if rating is None:
+        return None
+    b = (min(max(rating, 1), 5) - 1) / 4
+    return (max(b - 0.25, 0.0), b, min(b + 0.25, 1.0))
+
+
+def rank_case(case_id, analysis, method):
+    """
+    Rangfolge für die Analyse (Zeile mit id, round_number, passed_analysis)
+    des Cases, sortiert nach method (siehe METHODS).
+    """
+    case = get_case_metadata(case_id)
+    key = (f"{current_app.config.get('RANKING_CACHE_REDIS_PREFIX', 'ranking:')}{case_id}:{analysis.id}:"
+           f"{RANKING_VERSION}:{_data_version(case, analysis.round_number)}")
+    result = _cached(key)
+    if result is None:
+        result = _compute(case, analysis.round_number)
+        _store(key, result)
+
+    criterion_names = {criterion["id"]: criterion["name"] for criterion in case["criteria"]}
+    technology_names = {technology["id"]: technology["name"] for technology in case["technologies"]}
+    technologies = sorted(result["technologies"], key=lambda entry: entry[method], reverse=True)
+    return {
+        "case_id": case_id,
+        "analysis_id": analysis.id,
+        "round_number": analysis.round_number,
+        "final": analysis.passed_analysis,
+        "method": method,
+        "ranking_version": RANKING_VERSION,
+        "missing_cells": result["missing_cells"],
+        "criteria": [{**entry, "name": criterion_names.get(entry["id"])} for entry in result["criteria"]],
+        "ranking": [{
+            "rank": rank,
+            **entry,
+            "name": technology_names.get(entry["technology_id"]),
+            "score": entry[method],
+        } for rank, entry in enumerate(technologies, start=1)],
+    }
+
+
+# ------------------------------
+# Berechnung
+# ------------------------------
+
+def _positions(ids, values):
+    """Position jedes Werts in ids (sortiert) bzw. -1, wenn er nicht vorkommt."""
+    if not len(ids):
+        return np.full(len(values), -1)
+    positions = np.searchsorted(ids, values)
+    positions = np.minimum(positions, len(ids) - 1)
+    return np.where(ids[positions] == values, positions, -1)
+
+
+def consensus_matrix(rows, criterion_ids, technology_ids):
+    """
+    Mittelwert der letzten Bewertung jedes Experten pro Zelle. rows sind
+    (user_id, criterion_id, technology_id, a, b, c), nach Runde aufsteigend.
+    Gibt die Mittelwerte (Kriterien, 1 + Technologien, 3) – Spalte 0 sind die
+    Kriterienbewertungen – und die Anzahl der Bewertungen pro Zelle zurück.
+    """
+    criteria_count, columns = len(criterion_ids), len(technology_ids) + 1
+    sums = np.zeros((criteria_count * columns, 3))
+    counts = np.zeros(criteria_count * columns)
+    if rows:
+        data = np.array(rows, dtype=float)  # NULL -> NaN
+        criterion_pos = _positions(np.array(criterion_ids), data[:, 1].astype(int))
+        # Spalte 0: Kriterienbewertung (technology_id NULL), sonst Position der Technologie + 1
+        technology_pos = _positions(np.array(technology_ids), np.nan_to_num(data[:, 2]).astype(int))
+        technology_pos = np.where(np.isnan(data[:, 2]), 0, np.where(technology_pos >= 0, technology_pos + 1, -1))
+        valid = (criterion_pos >= 0) & (technology_pos >= 0) & ~np.isnan(data[:, 3:]).any(axis=1)
+        data, cell = data[valid], (criterion_pos * columns + technology_pos)[valid]
+
+        # Letzte Bewertung pro (Experte, Zelle): erstes Vorkommen in umgekehrter Reihenfolge
+        _, user_pos = np.unique(data[:, 0], return_inverse=True)
+        keys = user_pos.reshape(-1) * (criteria_count * columns) + cell
+        _, latest = np.unique(keys[::-1], return_index=True)
+        latest = len(keys) - 1 - latest
+
+        np.add.at(sums, cell[latest], data[latest, 3:])
+        counts = np.bincount(cell[latest], minlength=criteria_count * columns).astype(float)
+
+    means = np.divide(sums, counts[:, None], out=np.full_like(sums, np.nan), where=counts[:, None] > 0)
+    return means.reshape(criteria_count, columns, 3), counts.reshape(criteria_count, columns)
+
+
+def _vertex_distance(x, y):
+    # Wie calculate_fuzzy_distance in src/analysis.py, über die letzte Achse
+    return np.sqrt(((x - y) ** 2).sum(axis=-1) / 3)
+
+
+def score_technologies(matrix, weights):
+    """
+    Beide Verfahren für die Matrix (Technologien, Kriterien, 3) und die
+    Gewichte (Kriterien, 3); fehlende Zellen (NaN) zählen als (0, 0, 0).
+    """
+    matrix = np.nan_to_num(matrix, nan=0.0)
+    # Benefit-Kriterien: pro Kriterium auf das größte c normieren
+    c_max = matrix[:, :, 2].max(axis=0)
+    normalized = np.divide(matrix, c_max[None, :, None], out=np.zeros_like(matrix), where=c_max[None, :, None] > 0)
+    weighted = normalized * weights[None, :, :]
+
+    to_ideal = _vertex_distance(weighted, 1.0).sum(axis=1)
+    to_anti_ideal = _vertex_distance(weighted, 0.0).sum(axis=1)
+    total = to_ideal + to_anti_ideal
+    closeness = np.divide(to_anti_ideal, total, out=np.zeros_like(total), where=total > 0)
+
+    weight_sum = weights.mean(axis=1).sum()
+    weighted_sum = weighted.sum(axis=1).mean(axis=1) / weight_sum if weight_sum > 0 else np.zeros(len(matrix))
+    return {
+        "topsis": closeness,
+        "weighted_sum": weighted_sum,
+        "distance_to_ideal": to_ideal,
+        "distance_to_anti_ideal": to_anti_ideal,
+    }
+
+
+def _evaluations(case, round_number):
+    return (Evaluation.case_id == case["id"], Evaluation.round <= round_number)
+
+
+def _data_version(case, round_number):
+    """
+    Fingerprint der Eingaben von _compute(): Kriterien (mit Rating) und
+    Technologien des Cases sowie Anzahl, höchste ID und Summen der
+    Fuzzy-Vektoren der Bewertungen bis zur Runde (eine Abfrage). Erneut
+    gespeicherte Bewertungen bekommen neue IDs.
+    """
+    evaluations = db.session.query(
+        db.func.count(Evaluation.id), db.func.max(Evaluation.id),
+        db.func.sum(Evaluation.fuzzy_vector_a), db.func.sum(Evaluation.fuzzy_vector_b),
+        db.func.sum(Evaluation.fuzzy_vector_c)
+    ).filter(*_evaluations(case, round_number)).one()
+    fingerprint = json.dumps([
+        sorted((criterion["id"], criterion["rating"]) for criterion in case["criteria"]),
+        sorted(technology["id"] for technology in case["technologies"]),
+        evaluations[0], evaluations[1], [round(total or 0.0, 9) for total in evaluations[2:]],
+    ])
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+def _compute(case, round_number):
+    criteria = sorted(case["criteria"], key=lambda criterion: criterion["id"])
+    criterion_ids = [criterion["id"] for criterion in criteria]
+    technology_ids = sorted(technology["id"] for technology in case["technologies"])
+
+    rows = db.session.query(
+        Evaluation.user_id, Evaluation.criterion_id, Evaluation.technology_id,
+        Evaluation.fuzzy_vector_a, Evaluation.fuzzy_vector_b, Evaluation.fuzzy_vector_c
+    ).filter(*_evaluations(case, round_number)).order_by(Evaluation.round, Evaluation.id).all()
+    means, counts = consensus_matrix(rows, criterion_ids, technology_ids)
+
+    # Gewichte: Kriterienbewertungen, sonst Rating, sonst DEFAULT_WEIGHT
+    weights = means[:, 0, :].copy()
+    sources = []
+    for i, criterion in enumerate(criteria):
+        if counts[i, 0]:
+            sources.append("evaluations")
+            continue
+        fallback = rating_weight(criterion["rating"])
+        sources.append("default" if fallback is None else "rating")
+        weights[i] = fallback or DEFAULT_WEIGHT
+
+    scores = score_technologies(means[:, 1:, :].transpose(1, 0, 2), weights)
+    crisp = weights.mean(axis=1)
+    crisp = crisp / crisp.sum() if crisp.sum() > 0 else crisp
+
+    return {
+        "missing_cells": int((counts[:, 1:] == 0).sum()),
+        "criteria": [{
+            "id": criterion_id,
+            "weight": {"a": float(weights[i, 0]), "b": float(weights[i, 1]), "c": float(weights[i, 2])},
+            "weight_normalized": float(crisp[i]),
+            "weight_source": sources[i],
+        } for i, criterion_id in enumerate(criterion_ids)],
+        "technologies": [{
+            "technology_id": technology_id,
+            "topsis": float(scores["topsis"][i]),
+            "weighted_sum": float(scores["weighted_sum"][i]),
+            "distance_to_ideal": float(scores["distance_to_ideal"][i]),
+            "distance_to_anti_ideal": float(scores["distance_to_anti_ideal"][i]),
+        } for i, technology_id in enumerate(technology_ids)],
+    }
+
+
+# ------------------------------
+# Cache (Schlüssel enthält den Datenstand, keine Invalidierung nötig)
+# ------------------------------
+
+def _cached(key):
+    client = get_redis()
+    if client is not None:
+        try:
+            cached = client.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning("Ranking cache lookup in Redis failed: %s", e)
+        return None
+    with _lock:
+        result = _local.get(key)
+        if result is not None:
+            _local.move_to_end(key)
+        return result
+
+
+def _store(key, result):
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(key, json.dumps(result), ex=current_app.config.get("RANKING_CACHE_TTL", 86400))
+        except Exception as e:
+            logger.warning("Ranking cache update in Redis failed: %s", e)
+        return
+    with _lock:
+        _local[key] = result
+        _local.move_to_end(key)
+        while len(_local) > current_app.config.get("RANKING_CACHE_LOCAL_SIZE", 256):
+            _local.popitem(last=False)
@@ -0,0 +1,27 @@
+"""
+Gemeinsamer Redis-Client für Caches und Pub/Sub.
+
+Redis ist optional: Ist REDIS_URL nicht gesetzt, liefert get_redis() None und
+die Aufrufer fallen auf ihre In-Process-Varianten zurück.
+"""
+import os
+
+from flask import current_app
+
+_client = None
+_client_pid = None
+
+
+def get_redis():
+    """Gibt den Redis-Client des aktuellen Prozesses zurück (oder None)."""
+    global _client, _client_pid
+    url = current_app.config.get("REDIS_URL")
+    if not url:
+        return None
+    # Nach einem Fork darf die Verbindung des Elternprozesses nicht weiterverwendet werden
+    if _client is None or _client_pid != os.getpid():
+        import redis
+
+        _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _client_pid = os.getpid()
+    return _client
@@ -0,0 +1,113 @@
+"""
+Unveränderliche Ergebnisdokumente analysierter Runden.
+
+analyze_round schreibt pro Runde ein vollständiges Ergebnis als JSON-Dokument
+(round_result_documents): Grenzwerte, die Werte aus RoundAnalysis, pro Zelle
+Mittelwert, mittlere Distanz, Anzahl der Bewertungen und ok sowie die zur
+Neubewertung markierten Bewertungen. Das Ergebnis einer Runde ändert sich
+nach der Analyse nicht mehr; das Dokument wird deshalb einmal gzip-komprimiert
+gespeichert und von GET /cases/<id>/rounds/<n>/result unverändert ausgeliefert
+(bzw. nur für Clients ohne gzip entpackt). Der ETag ist der SHA-256 des
+unkomprimierten Dokuments.
+
+FORMAT_VERSION beschreibt den Aufbau des Dokuments und wird bei Änderungen
+erhöht; engine_version das Analyseverfahren (src/analysis.py).
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime
+
+from flask import current_app, request
+
+from src.models import db, RoundResultDocument
+
+FORMAT_VERSION = 1
+
+# Ergebniswerte aus analyze_case_round() (ohne Telemetrie)
+SUMMARY_FIELDS = (
+    "criteria_ok_percent", "criteria_total_count", "criteria_ok_count", "criteria_passed",
+    "tech_ok_percent", "tech_total_count", "tech_ok_count", "tech_passed",
+    "mean_distance_ok", "mean_distance_value",
+    "criteria_mean_distance_value", "criteria_mean_distance_ok",
+    "tech_mean_distance_value", "tech_mean_distance_ok",
+    "passed_analysis",
+)
+
+
+def build_result_document(case, round_number, analysis_id, result, details):
+    """
+    Spalten der Zeile in round_result_documents (als Dict, auch für Bulk-Inserts)
+    aus dem Rückgabewert von analyze_case_round().
+    """
+    document = {
+        "format_version": FORMAT_VERSION,
+        "engine_version": result.get("engine_version"),
+        "case_id": case.id,
+        "round_number": round_number,
+        "analysis_id": analysis_id,
+        "analyzed_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "thresholds": {
+            "distance_mean": case.threshold_distance_mean,
+            "criteria_percent": case.threshold_criteria_percent,
+            "tech_percent": case.threshold_tech_percent,
+        },
+        "summary": {key: result[key] for key in SUMMARY_FIELDS},
+        "criteria": [{"id": criterion.id, "name": criterion.name} for criterion in case.criteria],
+        "technologies": [{"id": technology.id, "name": technology.name} for technology in case.technologies],
+        "cells": details["cells"],
+        "flagged": details["flagged"],
+    }
+    data = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    return {
+        "case_id": case.id,
+        "round_number": round_number,
+        "analysis_id": analysis_id,
+        "format_version": FORMAT_VERSION,
+        "engine_version": document["engine_version"],
+        "etag": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        # mtime=0: gleiche Bytes für gleichen Inhalt
+        "content": gzip.compress(data, compresslevel=9, mtime=0),
+    }
+
+
+def result_document_response(case_id, round_number):
+    """
+    Antwort mit dem Dokument der Runde oder None, falls es keins gibt. Mit
+    passendem If-None-Match wird nur der ETag gelesen (304 ohne Inhalt).
+    """
+    filters = {"case_id": case_id, "round_number": round_number}
+    accepts_gzip = request.accept_encodings["gzip"] > 0
+
+    if request.if_none_match:
+        etag = db.session.query(RoundResultDocument.etag).filter_by(**filters).scalar()
+        if etag is None:
+            return None
+        if request.if_none_match.contains(_representation_etag(etag, accepts_gzip)):
+            response = current_app.response_class(status=304)
+            _set_caching_headers(response, etag, accepts_gzip)
+            return response
+
+    document = RoundResultDocument.query.filter_by(**filters).first()
+    if document is None:
+        return None
+    if accepts_gzip:
+        response = current_app.response_class(document.content, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = current_app.response_class(gzip.decompress(document.content), mimetype="application/json")
+    _set_caching_headers(response, document.etag, accepts_gzip)
+    return response
+
+
+def _representation_etag(etag, gzipped):
+    # Wie in src/compression.py: eigener ETag für die komprimierte Repräsentation
+    return f"{etag}-gzip" if gzipped else etag
+
+
+def _set_caching_headers(response, etag, gzipped):
+    response.set_etag(_representation_etag(etag, gzipped))
+    response.vary.add("Accept-Encoding")
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get("ROUND_RESULT_MAX_AGE", 3600)
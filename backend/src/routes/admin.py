@@ -1,7 +1,17 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash
-from src.models import db, User, Case
+from src.models import db, User, Case, CaseArchive, RoundAnalysis
+from src.password_hashing import hash_passwords
+from src.case_cache import invalidate_all, invalidate_case
+from src.case_deletion import delete_case
+from src.query_budget import query_budget
+from src.profiling import list_profiles, profile_path
 # (Importiere ggf. weitere Models, wie CaseRound etc., falls benötigt)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -11,6 +21,7 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 # ------------------------------
 
 @admin_bp.route('/create-user', methods=['POST'])
+@query_budget(5)
 @jwt_required()
 def admin_create_user():
     current_user = get_jwt_identity()
@@ -63,7 +74,153 @@ def admin_create_user():
         }
     }), 201
 
+def _parse_bulk_users():
+    """
+    Liest die Benutzerzeilen eines Bulk-Imports.
+    JSON: {"users": [{"username", "password", "role", "customFields"}]} oder direkt eine Liste.
+    CSV (Body oder Datei-Upload "file"): Spalten username,password,role,customFields,
+    mehrere Custom Fields durch ";" getrennt.
+    """
+    if request.is_json:
+        data = request.get_json()
+        return data.get("users", []) if isinstance(data, dict) else data
+
+    if "file" in request.files:
+        text = request.files["file"].read().decode("utf-8-sig")
+    else:
+        text = request.get_data(as_text=True)
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        custom_fields = row.get("customFields") or ""
+        rows.append({
+            "username": (row.get("username") or "").strip(),
+            "password": row.get("password") or "",
+            "role": (row.get("role") or "").strip() or "user",
+            "customFields": [f.strip() for f in custom_fields.split(";") if f.strip()]
+        })
+    return rows
+
+# Die E-Mail wird auch als Username gespeichert; es gilt die kürzere der beiden Spalten
+_MAX_USERNAME_LENGTH = min(User.username.type.length, User.email.type.length)
+
+@admin_bp.route('/users/bulk', methods=['POST'])
+@query_budget(4)
+@jwt_required()
+def admin_bulk_create_users():
+    """
+    Legt viele Benutzer in einem Request an (z. B. ein komplettes Expertenpanel).
+    Doppelte E-Mails werden mit einer einzigen IN-Abfrage erkannt, die Passwörter
+    parallel gehasht und alle neuen Benutzer mit einem Statement eingefügt.
+    Gibt für jede Zeile ein eigenes Ergebnis zurück.
+    """
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    try:
+        rows = _parse_bulk_users()
+    except (ValueError, csv.Error) as e:
+        return jsonify({"error": f"Ungültige Eingabedaten: {str(e)}"}), 400
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Keine Benutzer angegeben"}), 400
+
+    max_rows = current_app.config.get("BULK_USER_MAX_ROWS", 1000)
+    if len(rows) > max_rows:
+        return jsonify({"error": f"Maximal {max_rows} Benutzer pro Request"}), 413
+
+    results = [None] * len(rows)
+    valid = []  # (Zeilenindex, E-Mail, Passwort, Rolle, Custom Fields)
+    seen = set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = {"row": index, "status": "error", "error": "Ungültige Zeile"}
+            continue
+        email = row.get("username") or ""
+        password = row.get("password")
+        role = row.get("role", "user")
+
+        if not isinstance(email, str) or (password is not None and not isinstance(password, str)):
+            results[index] = {"row": index, "status": "error", "error": "Email und Passwort müssen Text sein"}
+            continue
+        email = email.strip()
+        if not email or not password:
+            error = "Email und Passwort sind erforderlich"
+        elif len(email) > _MAX_USERNAME_LENGTH:
+            error = f"E-Mail länger als {_MAX_USERNAME_LENGTH} Zeichen"
+        elif not "@" in email or not "." in email:
+            error = "Ungültige E-Mail-Adresse"
+        elif role not in ["user", "master"]:
+            error = "Ungültige Rolle"
+        elif email in seen:
+            error = "E-Mail mehrfach in der Anfrage"
+        else:
+            error = None
+
+        if error:
+            results[index] = {"row": index, "username": email, "status": "error", "error": error}
+            continue
+        seen.add(email)
+        valid.append((index, email, password, role, row.get("customFields", [])))
+
+    # Bereits vergebene E-Mails mit einer einzigen Abfrage ermitteln
+    emails = [email for _, email, _, _, _ in valid]
+    taken = set()
+    if emails:
+        for username, email in db.session.query(User.username, User.email).filter(
+            (User.username.in_(emails)) | (User.email.in_(emails))
+        ):
+            taken.update((username, email))
+
+    to_create = []
+    for index, email, password, role, custom_fields in valid:
+        if email in taken:
+            results[index] = {"row": index, "username": email, "status": "error", "error": "E-Mail bereits vergeben"}
+        else:
+            to_create.append((index, email, password, role, custom_fields))
+
+    if to_create:
+        password_hashes = hash_passwords(password for _, _, password, _, _ in to_create)
+        try:
+            inserted = db.session.execute(
+                db.insert(User).returning(User.id, User.username),
+                [{
+                    "username": email,  # Email als Username
+                    "email": email,     # Email als Email
+                    "password_hash": password_hash,
+                    "role": role,
+                    "custom_fields": custom_fields
+                } for (_, email, _, role, custom_fields), password_hash in zip(to_create, password_hashes)]
+            ).all()
+            db.session.commit()
+        except IntegrityError:
+            # Parallel angelegte Benutzer – der gesamte Batch wird verworfen
+            db.session.rollback()
+            return jsonify({"error": "E-Mail bereits vergeben, bitte erneut versuchen"}), 409
+
+        ids = {username: user_id for user_id, username in inserted}
+        for index, email, _, role, custom_fields in to_create:
+            results[index] = {
+                "row": index,
+                "status": "created",
+                "user": {
+                    "id": ids.get(email),
+                    "username": email,
+                    "role": role,
+                    "customFields": custom_fields or []
+                }
+            }
+
+    created = sum(1 for r in results if r["status"] == "created")
+    return jsonify({
+        "message": f"{created} von {len(rows)} Benutzern angelegt",
+        "created": created,
+        "failed": len(rows) - created,
+        "results": results
+    }), 201 if created else 200
+
 @admin_bp.route('/edit-user', methods=['PUT'])
+@query_budget(5)
 @jwt_required()
 def admin_edit_user():
     current_user = get_jwt_identity()
@@ -109,6 +266,8 @@ def admin_edit_user():
         user.password_hash = generate_password_hash(new_password)
     
     db.session.commit()
+    # Benutzernamen stehen in den Stammdaten beliebig vieler Cases
+    invalidate_all()
     return jsonify({
         "message": "User updated successfully",
         "user": {
@@ -120,6 +279,7 @@ def admin_edit_user():
     }), 200
 
 @admin_bp.route('/delete-user/<int:user_id>', methods=['DELETE'])
+@query_budget(6)
 @jwt_required()
 def admin_delete_user(user_id):
     current_user = get_jwt_identity()
@@ -132,6 +292,7 @@ def admin_delete_user(user_id):
 
     db.session.delete(user)
     db.session.commit()
+    invalidate_all()
     return jsonify({"message": "User deleted successfully"}), 200
 
 # ------------------------------
@@ -142,6 +303,7 @@ def admin_delete_user(user_id):
 # Für weitere Admin-Funktionen ergänzen wir nun Edit, Statusänderung und Löschen.
 
 @admin_bp.route('/edit-case/<int:case_id>', methods=['PUT'])
+@query_budget(4)
 @jwt_required()
 def admin_edit_case(case_id):
     current_user = get_jwt_identity()
@@ -160,9 +322,11 @@ def admin_edit_case(case_id):
         case.show_results = data["show_results"]
 
     db.session.commit()
+    invalidate_case(case_id)
     return jsonify({"message": "Case updated successfully"}), 200
 
 @admin_bp.route('/case-status/<int:case_id>', methods=['PUT'])
+@query_budget(4)
 @jwt_required()
 def admin_update_case_status(case_id):
     current_user = get_jwt_identity()
@@ -183,19 +347,200 @@ def admin_update_case_status(case_id):
     # und "closed" als abgeschlossenen Fall (nicht editierbar)
     case.show_results = True if status == "open" else False
     db.session.commit()
+    invalidate_case(case_id)
     return jsonify({"message": "Case status updated successfully"}), 200
 
 @admin_bp.route('/delete-case/<int:case_id>', methods=['DELETE'])
+@query_budget(14)
 @jwt_required()
 def admin_delete_case(case_id):
     current_user = get_jwt_identity()
     if current_user["role"] != "master":
         return jsonify({"error": "Access forbidden"}), 403
 
-    case = Case.query.get(case_id)
-    if not case:
-        return jsonify({"error": "Case not found"}), 404
+    # Mit ?archive=true werden die Bewertungen vor dem Löschen archiviert
+    archive = request.args.get("archive", "false").lower() in ["true", "1", "yes"]
 
-    db.session.delete(case)
-    db.session.commit()
-    return jsonify({"message": "Case deleted successfully"}), 200
+    try:
+        deleted = delete_case(case_id, archive=archive)
+        if deleted is None:
+            return jsonify({"error": "Case not found"}), 404
+        db.session.commit()
+        invalidate_case(case_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Deleting case failed: {str(e)}"}), 500
+
+    return jsonify({
+        "message": "Case archived and deleted successfully" if archive else "Case deleted successfully",
+        "deleted": deleted
+    }), 200
+
+@admin_bp.route('/case-archives', methods=['GET'])
+@query_budget(3)
+@jwt_required()
+def admin_get_case_archives():
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    # Ohne die (großen) Bewertungsdaten
+    archives = db.session.query(
+        CaseArchive.id, CaseArchive.case_id, CaseArchive.name, CaseArchive.case_type,
+        CaseArchive.archived_at, CaseArchive.evaluation_count
+    ).order_by(CaseArchive.archived_at.desc()).all()
+    return jsonify([{
+        "id": a.id,
+        "case_id": a.case_id,
+        "name": a.name,
+        "case_type": a.case_type,
+        "archived_at": a.archived_at.isoformat() if a.archived_at else None,
+        "evaluation_count": a.evaluation_count
+    } for a in archives]), 200
+
+@admin_bp.route('/case-archives/<int:archive_id>', methods=['GET'])
+@query_budget(3)
+@jwt_required()
+def admin_get_case_archive(archive_id):
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    archive = CaseArchive.query.get(archive_id)
+    if not archive:
+        return jsonify({"error": "Archive not found"}), 404
+    return jsonify({
+        "id": archive.id,
+        "case_id": archive.case_id,
+        "name": archive.name,
+        "case_type": archive.case_type,
+        "archived_at": archive.archived_at.isoformat() if archive.archived_at else None,
+        "evaluation_count": archive.evaluation_count,
+        "columns": CaseArchive.EVALUATION_COLUMNS,
+        "evaluations": archive.evaluations
+    }), 200
+
+# ------------------------------
+# Telemetrie der Rundenanalysen
+# ------------------------------
+
+# Größenklassen nach Anzahl verarbeiteter Bewertungen (Untergrenzen)
+TELEMETRY_SIZE_CLASSES = (0, 1000, 10000, 100000)
+
+def _telemetry_summary(row):
+    return {
+        "analyses": row.analyses,
+        "avg_wall_time_ms": row.avg_wall_time_ms,
+        "max_wall_time_ms": row.max_wall_time_ms,
+        "avg_db_time_ms": row.avg_db_time_ms,
+        "avg_evaluation_count": row.avg_evaluation_count,
+        "max_evaluation_count": row.max_evaluation_count,
+        "avg_cell_count": row.avg_cell_count,
+        "max_peak_memory_kb": row.max_peak_memory_kb
+    }
+
+def _telemetry_run(analysis, case_name):
+    return {
+        "analysis_id": analysis.id,
+        "case_id": analysis.case_id,
+        "case_name": case_name,
+        "round_number": analysis.round_number,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "wall_time_ms": analysis.wall_time_ms,
+        "db_time_ms": analysis.db_time_ms,
+        "cell_count": analysis.cell_count,
+        "evaluation_count": analysis.evaluation_count,
+        "peak_memory_kb": analysis.peak_memory_kb,
+        "engine_version": analysis.engine_version
+    }
+
+@admin_bp.route('/analysis-telemetry', methods=['GET'])
+@query_budget(5)
+@jwt_required()
+def admin_analysis_telemetry():
+    """
+    Bericht über die Kosten der Rundenanalysen: Kennzahlen pro Engine-Version
+    und pro Größenklasse, die langsamsten Läufe und die Läufe mit der höchsten
+    Zeit pro Bewertung (auffällige Cases). Optional ?since=<ISO-Datum>&limit=10.
+    """
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    try:
+        since = datetime.fromisoformat(request.args["since"]) if "since" in request.args else None
+        limit = max(1, min(int(request.args.get("limit", 10)), 100))
+    except ValueError:
+        return jsonify({"error": "Invalid since or limit"}), 400
+
+    filters = [RoundAnalysis.wall_time_ms.isnot(None)]
+    if since:
+        filters.append(RoundAnalysis.created_at >= since)
+    size_class = db.case(
+        *[(RoundAnalysis.evaluation_count >= lower, lower) for lower in reversed(TELEMETRY_SIZE_CLASSES[1:])],
+        else_=0
+    ).label("size_class")
+    aggregates = (
+        func.count(RoundAnalysis.id).label("analyses"),
+        func.avg(RoundAnalysis.wall_time_ms).label("avg_wall_time_ms"),
+        func.max(RoundAnalysis.wall_time_ms).label("max_wall_time_ms"),
+        func.avg(RoundAnalysis.db_time_ms).label("avg_db_time_ms"),
+        func.avg(RoundAnalysis.evaluation_count).label("avg_evaluation_count"),
+        func.max(RoundAnalysis.evaluation_count).label("max_evaluation_count"),
+        func.avg(RoundAnalysis.cell_count).label("avg_cell_count"),
+        func.max(RoundAnalysis.peak_memory_kb).label("max_peak_memory_kb"),
+    )
+
+    by_version = db.session.query(RoundAnalysis.engine_version, *aggregates).filter(*filters) \
+        .group_by(RoundAnalysis.engine_version).order_by(RoundAnalysis.engine_version).all()
+    by_size = db.session.query(size_class, *aggregates).filter(*filters) \
+        .group_by(size_class).order_by(size_class).all()
+
+    runs = db.session.query(RoundAnalysis, Case.name).join(Case, Case.id == RoundAnalysis.case_id).filter(*filters)
+    slowest = runs.order_by(RoundAnalysis.wall_time_ms.desc()).limit(limit).all()
+    # Zeit pro Bewertung: hoch bei Cases, die für ihre Größe ungewöhnlich teuer sind
+    cost = RoundAnalysis.wall_time_ms / func.nullif(RoundAnalysis.evaluation_count, 0)
+    costliest = runs.filter(RoundAnalysis.evaluation_count > 0).order_by(cost.desc()).limit(limit).all()
+
+    return jsonify({
+        "by_engine_version": [
+            {"engine_version": row.engine_version, **_telemetry_summary(row)} for row in by_version
+        ],
+        "by_size": [
+            {"min_evaluations": row.size_class, **_telemetry_summary(row)} for row in by_size
+        ],
+        "slowest": [_telemetry_run(analysis, name) for analysis, name in slowest],
+        "highest_cost_per_evaluation": [
+            {**_telemetry_run(analysis, name),
+             "ms_per_1000_evaluations": analysis.wall_time_ms / analysis.evaluation_count * 1000}
+            for analysis, name in costliest
+        ]
+    }), 200
+
+# ------------------------------
+# Request-Profile (siehe src/profiling.py)
+# ------------------------------
+
+@admin_bp.route('/profiles', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def admin_get_profiles():
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+    return jsonify(list_profiles()), 200
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def admin_download_profile(profile_id):
+    """Die .prof-Datei zum Auswerten mit pstats oder snakeviz."""
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    path = profile_path(profile_id)
+    if not path:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=f"{profile_id}.prof")
@@ -10,13 +10,17 @@ from flask_jwt_extended import (
     set_refresh_cookies,
     unset_jwt_cookies,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from src.models import db, User, TokenBlacklist
+from src.token_revocation import revocation_cache
+from src.query_budget import query_budget
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
 # ✅ Benutzer-Registrierung (Register-Endpoint)
 @auth_bp.route('/register', methods=['POST'])
+@query_budget(5)
 def register():
     data = request.get_json()
     email = data.get("username")  # Email wird als Username verwendet
@@ -65,6 +69,7 @@ def register():
 
 # ✅ Login-Endpoint – setzt Access- und Refresh-Token als HttpOnly-Cookies
 @auth_bp.route('/login', methods=['POST'])
+@query_budget(3)
 def login():
     data = request.get_json()
     email = data.get('username')  # Email wird als Username verwendet
@@ -91,6 +96,7 @@ def login():
 
 # ✅ Token-Refresh über das HttpOnly Refresh-Cookie
 @auth_bp.route('/refresh', methods=['POST'])
+@query_budget(2)
 @jwt_required(refresh=True)
 def refresh():
     identity = get_jwt_identity()
@@ -101,13 +107,18 @@ def refresh():
 
 # ✅ Logout-Endpoint (löscht beide Cookies und setzt den Token auf Blacklist)
 @auth_bp.route('/logout', methods=['POST'])
+@query_budget(3)
 @jwt_required()
 def logout():
     try:
         jti = get_jwt()["jti"]
         token_type = get_jwt()["type"]
-        db.session.add(TokenBlacklist(jti=jti, token_type=token_type))
+        # Nach Ablauf des Tokens ist der Blacklist-Eintrag überflüssig (siehe prune_expired_tokens)
+        expires_at = datetime.utcfromtimestamp(get_jwt()["exp"])
+        db.session.add(TokenBlacklist(jti=jti, token_type=token_type, expires_at=expires_at))
         db.session.commit()
+        # Lokalen Cache aktualisieren und die anderen Worker informieren
+        revocation_cache.revoke(jti, expires_at)
 
         response = jsonify({"message": "Successfully logged out"})
         # Entferne die gesetzten JWT-Cookies
@@ -118,6 +129,7 @@ def logout():
 
 # ✅ Geschützte Route (Nur eingeloggte Nutzer, Token wird nun aus Cookies gelesen)
 @auth_bp.route('/protected', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def protected():
     current_user = get_jwt_identity()
@@ -125,6 +137,7 @@ def protected():
 
 # ✅ Nur für Master zugänglich
 @auth_bp.route('/master-only', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def master_only():
     current_user = get_jwt_identity()
@@ -134,6 +147,7 @@ def master_only():
 
 # ✅ Endpoint, um alle registrierten Nutzer abzurufen (nur für Master)
 @auth_bp.route('/users', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_users():
     current_user = get_jwt_identity()
@@ -149,8 +163,76 @@ def get_users():
         } for user in users]
     }), 200
 
+def _like_escape(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# ✅ Suche nach Nutzern für Benutzer-Auswahllisten (nur für Master)
+@auth_bp.route('/users/search', methods=['GET'])
+@query_budget(3)
+@jwt_required()
+def search_users():
+    """
+    Durchsucht Nutzer nach username/email (Trigramm- bzw. Präfix-Index).
+    Parameter: q, role, field (mehrfach, exakter Custom-Field-Eintrag),
+    limit (max. 100), offset, include=customFields.
+    Liefert nur die für Auswahllisten nötigen Spalten.
+    """
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    q = request.args.get('q', '').strip().lower()
+    role = request.args.get('role')
+    custom_fields = [f for f in request.args.getlist('field') if f]
+    include_custom_fields = 'customFields' in request.args.get('include', '').split(',')
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit und offset müssen Zahlen sein"}), 400
+
+    columns = [User.id, User.username, User.role]
+    if include_custom_fields:
+        columns.append(User.custom_fields)
+    query = db.session.query(*columns)
+
+    if q:
+        # Ab 3 Zeichen Teilstring-Suche (Trigramm-Index), darunter Präfix-Suche
+        pattern = _like_escape(q)
+        pattern = f"%{pattern}%" if len(q) >= 3 else f"{pattern}%"
+        query = query.filter(
+            db.func.lower(User.username).like(pattern, escape="\\")
+            | db.func.lower(User.email).like(pattern, escape="\\")
+        )
+    if role:
+        query = query.filter(User.role == role)
+    for field in custom_fields:
+        if db.engine.dialect.name == 'postgresql':
+            query = query.filter(db.cast(User.custom_fields, JSONB).contains([field]))
+        else:
+            query = query.filter(db.cast(User.custom_fields, db.Text).contains(f'"{field}"'))
+
+    # Eine Zeile mehr laden, um zu wissen, ob es eine weitere Seite gibt
+    rows = query.order_by(User.username, User.id).offset(offset).limit(limit + 1).all()
+    has_more = len(rows) > limit
+
+    users = []
+    for row in rows[:limit]:
+        user = {"id": row.id, "username": row.username, "role": row.role}
+        if include_custom_fields:
+            user["customFields"] = row.custom_fields or []
+        users.append(user)
+
+    return jsonify({
+        "users": users,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_more else None
+    }), 200
+
 # ✅ Endpoint, um Details eines einzelnen Nutzers abzurufen (nur für Master)
 @auth_bp.route('/user/<int:user_id>', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_user(user_id):
     current_user = get_jwt_identity()
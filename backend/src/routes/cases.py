@@ -1,26 +1,23 @@
+import logging
+
 from flask import Blueprint, request, jsonify
-from src.models import db, Case, CaseRound, User, Criterion, Technology, Evaluation, case_users, RoundAnalysis
-import numpy as np
+from src.models import db, Case, CaseRound, User, Criterion, Technology, Evaluation, case_users, case_criteria, case_technologies, RoundAnalysis, RoundResultDocument, ConsensusCell
+from src.catalog import resolve_catalog_ids
+from src.case_cache import case_exists, get_case_metadata, invalidate_case
+from src.case_copy import clone_case
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import func
+from src.query_budget import query_budget
+from src.round_results import build_result_document, result_document_response
 
-cases_bp = Blueprint('cases', __name__)
+logger = logging.getLogger(__name__)
 
-# Hilfsfunktion zur Berechnung der Distanz zwischen zwei Fuzzy-Vektoren
-def calculate_fuzzy_distance(vector1, vector2):
-    """
-    Berechnet die Distanz zwischen zwei Fuzzy-Vektoren nach der Formel:
-    d(A, B) = sqrt((a1-a2)² + (b1-b2)² + (c1-c2)²) / sqrt(3)
-    """
-    a_diff = vector1[0] - vector2[0]
-    b_diff = vector1[1] - vector2[1]
-    c_diff = vector1[2] - vector2[2]
-    
-    # Euklidische Distanz geteilt durch sqrt(3) für Normalisierung
-    distance = np.sqrt(a_diff**2 + b_diff**2 + c_diff**2) / np.sqrt(3)
-    return distance
+cases_bp = Blueprint('cases', __name__)
 
 @cases_bp.route('/', methods=['GET'])
+@query_budget(2)
 def get_all_cases():
     cases = Case.query.all()
     return jsonify([
@@ -34,13 +31,13 @@ def get_all_cases():
     ]), 200
 
 @cases_bp.route('/round1', methods=['GET'])
+@query_budget(2)
 def get_round1_cases():
     """
     Gibt alle Fälle zurück, die noch nicht in Runde 2 sind.
     Das heißt: Es existiert kein zugehöriger CaseRound mit round_number == 2.
     """
-    cases = Case.query.all()
-    round1_cases = [c for c in cases if not any(r.round_number == 2 for r in c.rounds)]
+    round1_cases = Case.query.filter(~Case.rounds.any(CaseRound.round_number == 2)).all()
     return jsonify([
         {
             "id": c.id,
@@ -52,6 +49,7 @@ def get_round1_cases():
     ]), 200
 
 @cases_bp.route('/', methods=['POST'])
+@query_budget(12)
 def create_case():
         
     data = request.get_json()
@@ -69,11 +67,11 @@ def create_case():
     threshold_criteria_percent = data.get('threshold_criteria_percent', 75.0)  # Standardwert 75%
     threshold_tech_percent = data.get('threshold_tech_percent', 75.0)  # Standardwert 75%
 
-    print(f"DEBUG: Received case creation request with data: {data}")
-    print(f"DEBUG: Assigned user ID: {assigned_user_id}")
-    print(f"DEBUG: Selected users: {selected_users}")
-    print(f"DEBUG: Case name: {case_name}")
-    print(f"DEBUG: Thresholds: {threshold_distance_mean}, {threshold_criteria_percent}, {threshold_tech_percent}")
+    logger.debug("Received case creation request with data: %s", data)
+    logger.debug("Assigned user ID: %s", assigned_user_id)
+    logger.debug("Selected users: %s", selected_users)
+    logger.debug("Case name: %s", case_name)
+    logger.debug("Thresholds: %s, %s, %s", threshold_distance_mean, threshold_criteria_percent, threshold_tech_percent)
 
     if not case_type:
         return jsonify({"message": "case_type is required"}), 400
@@ -94,126 +92,88 @@ def create_case():
         db.session.add(new_case)
         db.session.flush()  # Get the case ID before committing
 
-        # Create and associate criteria
-        for name in criteria_names:
-            if name.strip():  # Skip empty names
-                criterion = Criterion(
-                    project_id=project_id,  # Für Abwärtskompatibilität beibehalten
-                    name=name.strip()
-                )
-                db.session.add(criterion)
-                db.session.flush()  # Get the criterion ID
-                new_case.criteria.append(criterion)
-
-        # Create and associate technologies
-        for name in technology_names:
-            if name.strip():  # Skip empty names
-                technology = Technology(
-                    project_id=project_id,  # Für Abwärtskompatibilität beibehalten
-                    name=name.strip()
-                )
-                db.session.add(technology)
-                db.session.flush()  # Get the technology ID
-                new_case.technologies.append(technology)
-
-        # Alle ausgewählten Benutzer direkt dem Case zuweisen
-        for user_id in selected_users:
-            user = User.query.get(user_id)
-            if user:
-                print(f"DEBUG: Adding user {user_id} directly to case {new_case.id}")
-                new_case.users.append(user)
-            else:
-                print(f"DEBUG: User {user_id} not found, skipping")
-
+        # Kriterien und Technologien gegen den gemeinsamen Katalog auflösen
+        # (vorhandene Namen werden wiederverwendet, fehlende mit einem INSERT angelegt)
+        criterion_ids = resolve_catalog_ids(Criterion, criteria_names, project_id)
+        technology_ids = resolve_catalog_ids(Technology, technology_names, project_id)
+
+        # Alle ausgewählten Benutzer mit einer einzigen Abfrage laden
+        requested_user_ids = list(dict.fromkeys(selected_users))
+        existing_user_ids = {
+            user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(requested_user_ids))
+        } if requested_user_ids else set()
+        user_ids = [user_id for user_id in requested_user_ids if user_id in existing_user_ids]
+        for user_id in requested_user_ids:
+            if user_id not in existing_user_ids:
+                logger.debug("User %s not found, skipping", user_id)
+
+        # Zuordnungen gesammelt einfügen (ein Statement pro Tabelle)
+        if criterion_ids:
+            db.session.execute(case_criteria.insert(), [
+                {"case_id": new_case.id, "criterion_id": criterion_id} for criterion_id in criterion_ids
+            ])
+        if technology_ids:
+            db.session.execute(case_technologies.insert(), [
+                {"case_id": new_case.id, "technology_id": technology_id} for technology_id in technology_ids
+            ])
+        if user_ids:
+            db.session.execute(case_users.insert(), [
+                {"case_id": new_case.id, "user_id": user_id} for user_id in user_ids
+            ])
+
+        case_id = new_case.id
         db.session.commit()
-        print(f"DEBUG: Successfully created case with ID {new_case.id}")
-        print(f"DEBUG: Assigned users: {[u.id for u in new_case.users]}")
+        logger.debug("Successfully created case with ID %s", case_id)
+        logger.debug("Assigned users: %s", user_ids)
         
         return jsonify({
             "message": "Case created successfully",
-            "case_id": new_case.id,
+            "case_id": case_id,
             "project_id": project_id,  # Für Abwärtskompatibilität beibehalten
             "assigned_user_id": assigned_user_id,
-            "assigned_users": [u.id for u in new_case.users]
+            "assigned_users": user_ids
         }), 201
 
     except Exception as e:
-        print(f"DEBUG: Error creating case: {str(e)}")
+        logger.exception("Error creating case")
         db.session.rollback()
         return jsonify({"message": f"Error creating case: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>', methods=['GET'])
+@query_budget(8)
 def get_case(case_id):
     """Get a specific case with its criteria, technologies, and rounds."""
     try:
-        case = Case.query.get(case_id)
-        if not case:
+        # Stammdaten aus dem Cache (siehe src/case_cache.py)
+        case = get_case_metadata(case_id)
+        if case is None:
             return jsonify({"message": "Case not found"}), 404
 
-        # Hole alle Kriterien für diesen Case
-        criteria = []
-        for criterion in case.criteria:
-            criteria.append({
-                "id": criterion.id,
-                "name": criterion.name,
-                "rating": criterion.rating
-            })
-
-        # Hole alle Technologien für diesen Case
-        technologies = []
-        for technology in case.technologies:
-            technologies.append({
-                "id": technology.id,
-                "name": technology.name
-            })
-
-        # Hole alle Runden für diesen Case
-        rounds = []
-        for round_obj in case.rounds:
-            rounds.append({
-                "id": round_obj.id,
-                "round_number": round_obj.round_number,
-                "created_at": round_obj.created_at.isoformat() if round_obj.created_at else None
-            })
+        # Benutzer, die Bewertungen für diesen Case abgegeben haben (eine Abfrage für alle)
+        evaluated_user_ids = {
+            user_id for (user_id,) in
+            db.session.query(Evaluation.user_id).filter_by(case_id=case_id).distinct()
+        }
 
-        # Hole alle zugewiesenen Benutzer und deren Bewertungsstatus
-        users = []
-        for user in case.users:
-            # Prüfe, ob der Benutzer Bewertungen für diesen Case abgegeben hat
-            evaluations = Evaluation.query.filter_by(case_id=case_id, user_id=user.id).all()
-            has_evaluated = len(evaluations) > 0
-            
-            users.append({
-                "user_id": user.id,
-                "username": user.username,
-                "has_evaluated": has_evaluated
-            })
-
-        # Füge auch den assigned_user hinzu, falls er nicht bereits in der Liste ist
-        if case.assigned_user_id and case.assigned_user_id not in [u["user_id"] for u in users]:
-            assigned_user = User.query.get(case.assigned_user_id)
-            if assigned_user:
-                evaluations = Evaluation.query.filter_by(case_id=case_id, user_id=assigned_user.id).all()
-                has_evaluated = len(evaluations) > 0
-                
-                users.append({
-                    "user_id": assigned_user.id,
-                    "username": assigned_user.username,
-                    "has_evaluated": has_evaluated
-                })
+        # Zugewiesene Benutzer (inkl. assigned_user) und deren Bewertungsstatus
+        users = [{
+            "user_id": user["id"],
+            "username": user["username"],
+            "has_evaluated": user["id"] in evaluated_user_ids
+        } for user in case["users"]]
 
         response = jsonify({
-            "id": case.id,
-            "project_id": case.project_id,
-            "case_type": case.case_type,
-            "show_results": case.show_results,
-            "created_at": case.created_at.isoformat() if case.created_at else None,
-            "name": case.name if case.name else f"Case {case.id}",  # Fallback, falls kein Name gesetzt ist
-            "criteria": criteria,
-            "technologies": technologies,
-            "rounds": rounds,
+            "id": case["id"],
+            "project_id": case["project_id"],
+            "case_type": case["case_type"],
+            "show_results": case["show_results"],
+            "created_at": case["created_at"],
+            "name": case["name"] if case["name"] else f"Case {case['id']}",  # Fallback, falls kein Name gesetzt ist
+            "criteria": case["criteria"],
+            "technologies": case["technologies"],
+            "rounds": case["rounds"],
             "users": users,
-            "current_round": case.current_round  # Aktuelle Runde hinzufügen
+            "current_round": case["current_round"]  # Aktuelle Runde hinzufügen
         })
         
         response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
@@ -223,9 +183,44 @@ def get_case(case_id):
         
         return response, 200
     except Exception as e:
-        print(f"Error getting case: {str(e)}")
+        logger.exception("Error getting case")
         return jsonify({"message": f"Error getting case: {str(e)}"}), 500
 
+@cases_bp.route('/<int:case_id>/clone', methods=['POST'])
+@query_budget(8)
+def clone_case_route(case_id):
+    """
+    Kopiert einen Case serverseitig in einer Transaktion (INSERT ... SELECT):
+    Grenzwerte, Kriterien, Technologien und optional Benutzer sowie die
+    Bewertungen aus Runde 1 als Ausgangsbasis.
+    """
+    data = request.get_json(silent=True) or {}
+    include_users = data.get('include_users', True)
+    include_baseline = data.get('include_baseline', False)
+
+    if include_baseline and not include_users:
+        return jsonify({"message": "include_baseline requires include_users"}), 400
+
+    try:
+        new_case_id = clone_case(
+            case_id,
+            name=data.get('name'),
+            include_users=include_users,
+            include_baseline=include_baseline
+        )
+        if new_case_id is None:
+            return jsonify({"message": "Case not found"}), 404
+        db.session.commit()
+        return jsonify({
+            "message": "Case cloned successfully",
+            "case_id": new_case_id,
+            "source_case_id": case_id
+        }), 201
+    except Exception as e:
+        logger.exception("Error cloning case")
+        db.session.rollback()
+        return jsonify({"message": f"Error cloning case: {str(e)}"}), 500
+
 @cases_bp.route('/<int:case_id>', methods=['OPTIONS'])
 def handle_options_case(case_id):
     response = jsonify({})
@@ -236,11 +231,11 @@ def handle_options_case(case_id):
     return response, 200
 
 @cases_bp.route('/<int:case_id>/evaluations', methods=['GET'])
+@query_budget(3)
 def get_case_evaluations(case_id):
     """Get all evaluations for a specific case."""
     try:
-        case = Case.query.get(case_id)
-        if not case:
+        if not case_exists(case_id):
             return jsonify({"message": "Case not found"}), 404
 
         # Prüfen, ob ein bestimmter Benutzer und eine bestimmte Runde angefordert wurden
@@ -304,15 +299,15 @@ def get_case_evaluations(case_id):
             "techMatrixEvaluations": tech_matrix_evaluations
         }), 200
     except Exception as e:
-        print(f"Error in get_case_evaluations: {str(e)}")
+        logger.exception("Error in get_case_evaluations")
         return jsonify({"message": f"Error fetching evaluations: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/evaluations', methods=['POST'])
+@query_budget(5)
 def save_case_evaluations(case_id):
     """Save evaluations for a case."""
     try:
-        case = Case.query.get(case_id)
-        if not case:
+        if not case_exists(case_id):
             return jsonify({"message": "Case not found"}), 404
 
         data = request.get_json()
@@ -321,8 +316,17 @@ def save_case_evaluations(case_id):
             return jsonify({"message": "No evaluations provided"}), 400
 
         evaluations = data['evaluations']
+
+        # Doppelte Zellen vor dem Löschen ablehnen, sonst ginge der gespeicherte Stand verloren
+        cells = {
+            (e.get('user_id'), e.get('round'), e.get('criterion_id'), e.get('technology_id'))
+            for e in evaluations
+        }
+        if len(cells) != len(evaluations):
+            return jsonify({"message": "Duplicate evaluation for the same user, round and cell"}), 400
         
         # Lösche bestehende Evaluationen für diesen Benutzer und diese Runde
+        # (gleiche Transaktion wie das INSERT: bei einem Fehler bleibt der alte Stand erhalten)
         if evaluations and len(evaluations) > 0:
             user_id = evaluations[0].get('user_id')
             round_num = evaluations[0].get('round')
@@ -333,27 +337,25 @@ def save_case_evaluations(case_id):
                     user_id=user_id,
                     round=round_num
                 ).delete()
-                db.session.commit()
         
-        # Speichere neue Evaluationen
+        # Speichere neue Evaluationen (ein INSERT für alle Zeilen)
+        rows = []
         for eval_data in evaluations:
-            new_eval = Evaluation(
-                user_id=eval_data.get('user_id'),
-                criterion_id=eval_data.get('criterion_id'),
-                technology_id=eval_data.get('technology_id'),
-                score=eval_data.get('score'),
-                case_id=case_id,
-                round=eval_data.get('round')
-            )
-            
-            # Speichere den Fuzzy-Vektor, wenn vorhanden
-            fuzzy_vector = eval_data.get('fuzzy_vector')
-            if fuzzy_vector:
-                new_eval.fuzzy_vector_a = fuzzy_vector.get('a', 0.0)
-                new_eval.fuzzy_vector_b = fuzzy_vector.get('b', 0.0)
-                new_eval.fuzzy_vector_c = fuzzy_vector.get('c', 0.0)
-            
-            db.session.add(new_eval)
+            # Fuzzy-Vektor, wenn vorhanden (sonst 0.0 wie der Spalten-Default)
+            fuzzy_vector = eval_data.get('fuzzy_vector') or {}
+            rows.append({
+                "user_id": eval_data.get('user_id'),
+                "criterion_id": eval_data.get('criterion_id'),
+                "technology_id": eval_data.get('technology_id'),
+                "score": eval_data.get('score'),
+                "case_id": case_id,
+                "round": eval_data.get('round'),
+                "fuzzy_vector_a": fuzzy_vector.get('a', 0.0),
+                "fuzzy_vector_b": fuzzy_vector.get('b', 0.0),
+                "fuzzy_vector_c": fuzzy_vector.get('c', 0.0)
+            })
+        if rows:
+            db.session.execute(Evaluation.__table__.insert(), rows)
         
         db.session.commit()
         response = jsonify({"message": "Evaluations saved successfully"})
@@ -364,9 +366,12 @@ def save_case_evaluations(case_id):
         response.headers.add('Access-Control-Allow-Credentials', 'true')
         return response, 201
     
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Duplicate evaluation for the same user, round and cell"}), 409
     except Exception as e:
         db.session.rollback()
-        print(f"Error saving evaluations: {str(e)}")
+        logger.exception("Error saving evaluations")
         return jsonify({"message": f"Error saving evaluations: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/evaluations', methods=['OPTIONS'])
@@ -379,6 +384,7 @@ def handle_options_evaluations(case_id):
     return response, 200
 
 @cases_bp.route('/<int:case_id>', methods=['PUT'])
+@query_budget(3)
 def update_case(case_id):
     data = request.get_json()
     case = Case.query.get(case_id)
@@ -389,9 +395,11 @@ def update_case(case_id):
     if 'show_results' in data:
         case.show_results = data['show_results']
     db.session.commit()
+    invalidate_case(case_id)
     return jsonify({"message": "Case updated"}), 200
 
 @cases_bp.route('/<int:case_id>/add_round', methods=['POST'])
+@query_budget(3)
 def add_case_round(case_id):
     data = request.get_json()
     round_number = data.get('round_number')
@@ -399,7 +407,12 @@ def add_case_round(case_id):
         return jsonify({"message": "round_number is required"}), 400
     new_round = CaseRound(case_id=case_id, round_number=round_number)
     db.session.add(new_round)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": f"Round {round_number} already exists"}), 409
+    invalidate_case(case_id)
     return jsonify({"message": "New round added", "id": new_round.id}), 201
 
 @cases_bp.route('/<int:case_id>/evaluate', methods=['POST'])
@@ -452,9 +465,9 @@ def evaluate_tech_criteria(case_id):
     round_id = data.get('round_id')
     tech_criteria_matrix = data.get('tech_criteria_matrix', {})  # Format: {tech_id: {criterion_id: score}}
 
-    print(f"DEBUG: Received tech matrix evaluation for case {case_id}")
-    print(f"DEBUG: user_id={user_id}, round_id={round_id}")
-    print(f"DEBUG: tech_criteria_matrix={tech_criteria_matrix}")
+    logger.debug("Received tech matrix evaluation for case %s", case_id)
+    logger.debug("user_id=%s, round_id=%s", user_id, round_id)
+    logger.debug("tech_criteria_matrix=%s", tech_criteria_matrix)
 
     if not user_id or not round_id or not tech_criteria_matrix:
         return jsonify({"message": "user_id, round_id and tech_criteria_matrix are required"}), 400
@@ -479,7 +492,7 @@ def evaluate_tech_criteria(case_id):
 
                 if existing_eval:
                     existing_eval.score = score
-                    print(f"DEBUG: Updated tech evaluation - tech:{tech_id}, criterion:{criterion_id}, score:{score}")
+                    logger.debug("Updated tech evaluation - tech:%s, criterion:%s, score:%s", tech_id, criterion_id, score)
                 else:
                     new_eval = Evaluation(
                         case_round_id=round_id,
@@ -489,14 +502,14 @@ def evaluate_tech_criteria(case_id):
                         score=score
                     )
                     db.session.add(new_eval)
-                    print(f"DEBUG: Created tech evaluation - tech:{tech_id}, criterion:{criterion_id}, score:{score}")
+                    logger.debug("Created tech evaluation - tech:%s, criterion:%s, score:%s", tech_id, criterion_id, score)
 
         db.session.commit()
-        print("DEBUG: Successfully saved all tech matrix evaluations")
+        logger.debug("Successfully saved all tech matrix evaluations")
         return jsonify({"message": "Technology-criteria evaluations saved successfully"}), 200
 
     except Exception as e:
-        print(f"Error saving evaluations: {str(e)}")
+        logger.exception("Error saving evaluations")
         db.session.rollback()
         return jsonify({"message": f"Error saving evaluations: {str(e)}"}), 500
 
@@ -506,13 +519,13 @@ def save_case_ratings(case_id):
     Save ratings for a case's criteria
     """
     try:
-        print(f"DEBUG: Received ratings request for case {case_id}")
+        logger.debug("Received ratings request for case %s", case_id)
         data = request.json
         ratings = data.get('ratings', {})
         user_id = data.get('user_id')
         round_id = data.get('round_id')
 
-        print(f"DEBUG: Saving ratings with data: user_id={user_id}, round_id={round_id}, ratings={ratings}")
+        logger.debug("Saving ratings with data: user_id=%s, round_id=%s, ratings=%s", user_id, round_id, ratings)
 
         if not user_id or not round_id:
             return jsonify({"message": "user_id and round_id are required"}), 400
@@ -530,7 +543,7 @@ def save_case_ratings(case_id):
 
             if existing_eval:
                 existing_eval.score = score
-                print(f"DEBUG: Updated existing evaluation for criterion {criterion_id}: {score}")
+                logger.debug("Updated existing evaluation for criterion %s: %s", criterion_id, score)
             else:
                 new_eval = Evaluation(
                     case_round_id=round_id,
@@ -540,14 +553,14 @@ def save_case_ratings(case_id):
                     score=score
                 )
                 db.session.add(new_eval)
-                print(f"DEBUG: Created new evaluation for criterion {criterion_id}: {score}")
+                logger.debug("Created new evaluation for criterion %s: %s", criterion_id, score)
 
         db.session.commit()
-        print("DEBUG: Successfully saved all ratings")
+        logger.debug("Successfully saved all ratings")
         return jsonify({"message": "Ratings saved successfully"}), 200
 
     except Exception as e:
-        print(f"Error saving ratings: {str(e)}")
+        logger.exception("Error saving ratings")
         db.session.rollback()
         return jsonify({"message": f"Error saving ratings: {str(e)}"}), 500
 
@@ -557,9 +570,8 @@ def get_round_evaluations(case_id, round_id):
     Get all evaluations for a specific round of a case
     """
     try:
-        print(f"DEBUG: Fetching evaluations for case {case_id}, round {round_id}")
-        case = Case.query.get(case_id)
-        if not case:
+        logger.debug("Fetching evaluations for case %s, round %s", case_id, round_id)
+        if not case_exists(case_id):
             return jsonify({"message": "Case not found"}), 404
 
         # Get the case round
@@ -580,15 +592,39 @@ def get_round_evaluations(case_id, round_id):
             'score': e.score
         } for e in evaluations]
 
-        print(f"DEBUG: Found {len(eval_data)} evaluations for case {case_id}, round {round_id}")
-        print(f"DEBUG: Evaluations data: {eval_data}")
+        logger.debug("Found %s evaluations for case %s, round %s", len(eval_data), case_id, round_id)
+        logger.debug("Evaluations data: %s", eval_data)
         return jsonify(eval_data), 200
 
     except Exception as e:
-        print(f"Error fetching evaluations: {str(e)}")
+        logger.exception("Error fetching evaluations")
         return jsonify({"message": f"Error fetching evaluations: {str(e)}"}), 500
 
+def _cases_for_user(user_id):
+    """Cases eines Benutzers (über case_users oder assigned_user_id) und die IDs der direkt zugewiesenen."""
+    direct_case_ids = {
+        case_id for (case_id,) in
+        db.session.query(case_users.c.case_id).filter(case_users.c.user_id == user_id)
+    }
+    cases = Case.query.filter(
+        db.or_(Case.assigned_user_id == user_id, Case.id.in_(direct_case_ids))
+    ).all()
+    return cases, direct_case_ids
+
+def _latest_analysis_passed(case_ids):
+    """{case_id: passed_analysis} der jeweils letzten Rundenanalyse (eine Abfrage für alle Cases)."""
+    latest = db.session.query(
+        RoundAnalysis.case_id,
+        func.max(RoundAnalysis.round_number).label('round_number')
+    ).filter(RoundAnalysis.case_id.in_(case_ids)).group_by(RoundAnalysis.case_id).subquery()
+    rows = db.session.query(RoundAnalysis.case_id, RoundAnalysis.passed_analysis).join(
+        latest,
+        and_(RoundAnalysis.case_id == latest.c.case_id, RoundAnalysis.round_number == latest.c.round_number)
+    )
+    return {case_id: passed for case_id, passed in rows}
+
 @cases_bp.route('/assigned/<int:user_id>', methods=['GET'])
+@query_budget(6)
 def get_assigned_cases(user_id):
     """
     Gibt alle Cases zurück, die dem Benutzer zugewiesen sind.
@@ -599,34 +635,23 @@ def get_assigned_cases(user_id):
     if not user_obj:
         return jsonify({"message": "User not found"}), 404
 
-    print(f"DEBUG: User-ID {user_id} wird geprüft. Rolle: {user_obj.role}")
+    logger.debug("User-ID %s wird geprüft. Rolle: %s", user_id, user_obj.role)
 
     # Benutzer sehen nur Cases, denen sie explizit zugewiesen wurden
-    cases = Case.query.filter(
-        db.or_(
-            Case.assigned_user_id == user_id,
-            Case.id.in_(
-                db.session.query(case_users.c.case_id).filter(case_users.c.user_id == user_id)
-            )
-        )
-    ).all()
+    cases, direct_case_ids = _cases_for_user(user_id)
+    latest_passed = _latest_analysis_passed([case.id for case in cases])
 
     # Filtere Cases, die bereits abgeschlossen sind (letzte Rundenanalyse bestanden)
-    active_cases = []
-    for case in cases:
-        # Letzte Rundenanalyse für diesen Case abrufen
-        latest_analysis = RoundAnalysis.query.filter_by(case_id=case.id).order_by(RoundAnalysis.round_number.desc()).first()
-        
-        # Case ist aktiv, wenn keine Analyse vorhanden ist oder die letzte Analyse nicht bestanden wurde
-        if not latest_analysis or not latest_analysis.passed_analysis:
-            active_cases.append(case)
+    # Case ist aktiv, wenn keine Analyse vorhanden ist oder die letzte Analyse nicht bestanden wurde
+    active_cases = [case for case in cases if not latest_passed.get(case.id)]
 
-    print(f"DEBUG: Found {len(active_cases)} active cases for user {user_id}")
-    for case in active_cases:
-        print(f"DEBUG: Active Case {case.id} - Assigned User: {case.assigned_user_id}")
-        # Prüfen, ob der Benutzer direkt dem Case zugewiesen ist
-        is_directly_assigned = user_id in [u.id for u in case.users]
-        print(f"DEBUG: User {user_id} is directly assigned to case {case.id}: {is_directly_assigned}")
+    logger.debug("Found %s active cases for user %s", len(active_cases), user_id)
+    if logger.isEnabledFor(logging.DEBUG):  # Schleife nur für die Debug-Ausgabe
+        for case in active_cases:
+            logger.debug("Active Case %s - Assigned User: %s", case.id, case.assigned_user_id)
+            # Prüfen, ob der Benutzer direkt dem Case zugewiesen ist
+            is_directly_assigned = case.id in direct_case_ids
+            logger.debug("User %s is directly assigned to case %s: %s", user_id, case.id, is_directly_assigned)
 
     return jsonify([
         {
@@ -636,13 +661,14 @@ def get_assigned_cases(user_id):
             "show_results": c.show_results,
             "created_at": c.created_at.isoformat() if c.created_at else None,
             "assigned_user_id": c.assigned_user_id,
-            "is_directly_assigned": user_id in [u.id for u in c.users],
+            "is_directly_assigned": c.id in direct_case_ids,
             "name": c.name if c.name else f"Case {c.id}",  # Name des Cases hinzufügen
             "current_round": c.current_round  # Aktuelle Runde hinzufügen
         } for c in active_cases
     ]), 200
 
 @cases_bp.route('/history/<int:user_id>', methods=['GET'])
+@query_budget(6)
 def get_case_history(user_id):
     """
     Gibt alle abgeschlossenen Cases zurück, d.h. jene, bei denen die letzte Rundenanalyse bestanden wurde
@@ -654,34 +680,22 @@ def get_case_history(user_id):
     if not user_obj:
         return jsonify({"message": "User not found"}), 404
 
-    print(f"DEBUG: User-ID {user_id} wird geprüft. Rolle: {user_obj.role}")
+    logger.debug("User-ID %s wird geprüft. Rolle: %s", user_id, user_obj.role)
 
     # Benutzer sehen nur Cases, denen sie explizit zugewiesen wurden
-    cases = Case.query.filter(
-        db.or_(
-            Case.assigned_user_id == user_id,
-            Case.id.in_(
-                db.session.query(case_users.c.case_id).filter(case_users.c.user_id == user_id)
-            )
-        )
-    ).all()
+    cases, direct_case_ids = _cases_for_user(user_id)
+    latest_passed = _latest_analysis_passed([case.id for case in cases])
 
     # Ein Case gilt als abgeschlossen, wenn die letzte Rundenanalyse bestanden wurde
-    completed_cases = []
-    for case in cases:
-        # Letzte Rundenanalyse für diesen Case abrufen
-        latest_analysis = RoundAnalysis.query.filter_by(case_id=case.id).order_by(RoundAnalysis.round_number.desc()).first()
-        
-        # Case ist abgeschlossen, wenn die letzte Analyse bestanden wurde
-        if latest_analysis and latest_analysis.passed_analysis:
-            completed_cases.append(case)
+    completed_cases = [case for case in cases if latest_passed.get(case.id)]
     
-    print(f"DEBUG: Found {len(completed_cases)} completed cases for user {user_id}")
-    for case in completed_cases:
-        print(f"DEBUG: Completed Case {case.id} - Assigned User: {case.assigned_user_id}")
-        # Prüfen, ob der Benutzer direkt dem Case zugewiesen ist
-        is_directly_assigned = user_id in [u.id for u in case.users]
-        print(f"DEBUG: User {user_id} is directly assigned to case {case.id}: {is_directly_assigned}")
+    logger.debug("Found %s completed cases for user %s", len(completed_cases), user_id)
+    if logger.isEnabledFor(logging.DEBUG):  # Schleife nur für die Debug-Ausgabe
+        for case in completed_cases:
+            logger.debug("Completed Case %s - Assigned User: %s", case.id, case.assigned_user_id)
+            # Prüfen, ob der Benutzer direkt dem Case zugewiesen ist
+            is_directly_assigned = case.id in direct_case_ids
+            logger.debug("User %s is directly assigned to case %s: %s", user_id, case.id, is_directly_assigned)
     
     return jsonify([
         {
@@ -691,13 +705,14 @@ def get_case_history(user_id):
             "show_results": c.show_results,
             "created_at": c.created_at.isoformat() if c.created_at else None,
             "assigned_user_id": c.assigned_user_id,
-            "is_directly_assigned": user_id in [u.id for u in c.users],
+            "is_directly_assigned": c.id in direct_case_ids,
             "name": c.name if c.name else f"Case {c.id}",  # Name des Cases hinzufügen
             "current_round": c.current_round  # Aktuelle Runde hinzufügen
         } for c in completed_cases
     ]), 200
 
 @cases_bp.route('/admin/overview', methods=['GET'])
+@query_budget(7)
 def get_cases_overview():
     """
     Gibt eine detaillierte Übersicht über alle Cases zurück, einschließlich Informationen darüber,
@@ -705,46 +720,52 @@ def get_cases_overview():
     Diese Route ist nur für Master-Benutzer zugänglich.
     """
     try:
-        # Alle Cases abrufen
-        cases = Case.query.all()
+        # Alle Cases mit Benutzern, Kriterien und Technologien abrufen (je eine Abfrage)
+        cases = Case.query.options(
+            selectinload(Case.users),
+            selectinload(Case.criteria),
+            selectinload(Case.technologies)
+        ).all()
+        
+        # Anzahl der Bewertungen pro Case und Benutzer in der jeweils aktuellen Runde
+        # (Kriterien- und Technologie-Matrix-Bewertungen separat)
+        evaluation_counts = {
+            (row.case_id, row.user_id): (row.total - row.tech_matrix, row.tech_matrix)
+            for row in db.session.query(
+                Evaluation.case_id,
+                Evaluation.user_id,
+                func.count(Evaluation.id).label('total'),
+                func.count(Evaluation.technology_id).label('tech_matrix')
+            ).join(
+                Case, and_(Case.id == Evaluation.case_id, Case.current_round == Evaluation.round)
+            ).group_by(Evaluation.case_id, Evaluation.user_id)
+        }
         
         # Ergebnis-Array vorbereiten
         result = []
         
         for case in cases:
-            # Alle diesem Case zugewiesenen Benutzer
-            assigned_users = case.users
-            assigned_user_ids = [u.id for u in assigned_users]
+            # Anzahl der Kriterien und Technologien für diesen Case
+            criteria_count = len(case.criteria)
+            tech_count = len(case.technologies)
+            
+            # Gesamtzahl der möglichen Bewertungen (Kriterien + Kriterien*Technologien)
+            total_possible_evaluations = criteria_count + (criteria_count * tech_count)
             
             # Informationen über die Bewertungen für diesen Case sammeln
             user_evaluation_status = []
             
-            for user in assigned_users:
-                # Alle Bewertungen dieses Benutzers für diesen Case direkt abrufen
-                evaluations = Evaluation.query.filter_by(
-                    case_id=case.id,
-                    user_id=user.id,
-                    round=case.current_round  # Nach aktueller Runde filtern
-                ).all()
+            for user in case.users:
+                criteria_completed, tech_matrix_completed = evaluation_counts.get((case.id, user.id), (0, 0))
+                evaluations_completed = criteria_completed + tech_matrix_completed
                 
                 # Debug-Ausgabe
-                print(f"DEBUG: Case {case.id}, User {user.id}, Current Round {case.current_round}, Evaluations count: {len(evaluations)}")
-                
-                # Anzahl der Kriterien und Technologien für diesen Case
-                criteria_count = len(case.criteria)
-                tech_count = len(case.technologies)
-                
-                # Gesamtzahl der möglichen Bewertungen (Kriterien + Kriterien*Technologien)
-                total_possible_evaluations = criteria_count + (criteria_count * tech_count)
-                
-                # Zähle Kriterien- und Technologie-Matrix-Bewertungen separat
-                criteria_evaluations = [e for e in evaluations if e.technology_id is None]
-                tech_matrix_evaluations = [e for e in evaluations if e.technology_id is not None]
+                logger.debug("Case %s, User %s, Current Round %s, Evaluations count: %s", case.id, user.id, case.current_round, evaluations_completed)
                 
                 # Bewertungsstatus bestimmen
-                if len(evaluations) == 0:
+                if evaluations_completed == 0:
                     status = "not_started"
-                elif len(evaluations) < total_possible_evaluations:
+                elif evaluations_completed < total_possible_evaluations:
                     status = "in_progress"
                 else:
                     status = "completed"
@@ -753,11 +774,11 @@ def get_cases_overview():
                     "user_id": user.id,
                     "username": user.username,
                     "status": status,
-                    "evaluations_completed": len(evaluations),
+                    "evaluations_completed": evaluations_completed,
                     "total_evaluations": total_possible_evaluations,
-                    "criteria_completed": len(criteria_evaluations),
+                    "criteria_completed": criteria_completed,
                     "criteria_total": criteria_count,
-                    "tech_matrix_completed": len(tech_matrix_evaluations),
+                    "tech_matrix_completed": tech_matrix_completed,
                     "tech_matrix_total": criteria_count * tech_count
                 })
             
@@ -767,8 +788,8 @@ def get_cases_overview():
                 "name": case.name if case.name else f"Case {case.id}",
                 "case_type": case.case_type,
                 "created_at": case.created_at.isoformat() if case.created_at else None,
-                "criteria_count": len(case.criteria),
-                "technologies_count": len(case.technologies),
+                "criteria_count": criteria_count,
+                "technologies_count": tech_count,
                 "current_round": case.current_round,  # Aktuelle Runde hinzufügen
                 "assigned_users": user_evaluation_status
             }
@@ -777,10 +798,11 @@ def get_cases_overview():
         
         return jsonify(result), 200
     except Exception as e:
-        print(f"Error in get_cases_overview: {str(e)}")
+        logger.exception("Error in get_cases_overview")
         return jsonify({"message": f"Error fetching cases overview: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/analyze-round', methods=['POST'])
+@query_budget(12)
 def analyze_round(case_id):
     """
     Analysiert die Bewertungen einer Runde für einen Case und entscheidet, ob eine weitere Runde erforderlich ist.
@@ -789,6 +811,9 @@ def analyze_round(case_id):
     Andernfalls wird eine neue Runde erstellt und die Bewertungen, die nicht im grünen Bereich sind,
     werden für die Neubewertung markiert.
     """
+    # Lazy: die Analyse braucht NumPy, das beim Start nicht geladen werden soll (Kaltstart)
+    from src.analysis import IncompleteRoundError, analyze_case_round
+
     try:
         # Case abrufen
         case = Case.query.get(case_id)
@@ -797,288 +822,34 @@ def analyze_round(case_id):
         
         # Aktuelle Runde bestimmen
         current_round = case.current_round
+
+        # Jede Runde wird genau einmal analysiert (uq_round_analysis_case_round)
+        if db.session.query(RoundAnalysis.query.filter_by(case_id=case_id, round_number=current_round).exists()).scalar():
+            return jsonify({"message": f"Round {current_round} has already been analyzed"}), 409
         
-        # Grenzwert für die Distanz zum Mittelwert aus dem Case abrufen
-        threshold_distance_mean = case.threshold_distance_mean
-        
-        # Alle Benutzer für diesen Case abrufen
-        users = case.users
-        
-        # Alle Kriterien und Technologien für diesen Case abrufen
-        criteria = case.criteria
-        technologies = case.technologies
-        
-        # Prüfen, ob alle erforderlichen Bewertungen für die aktuelle Runde vorliegen
-        # In Runde 1 müssen alle Bewertungen vorliegen
-        # In höheren Runden müssen nur die Bewertungen vorliegen, die neu bewertet werden müssen
-        if current_round == 1:
-            # In Runde 1 müssen alle Bewertungen vorliegen
-            total_expected_evaluations = len(users) * (len(criteria) + len(criteria) * len(technologies))
-            actual_evaluations = Evaluation.query.filter_by(case_id=case_id, round=current_round).count()
-            
-            if actual_evaluations < total_expected_evaluations:
-                return jsonify({
-                    "message": "Cannot analyze round: Not all users have completed their evaluations",
-                    "completed_evaluations": actual_evaluations,
-                    "total_expected_evaluations": total_expected_evaluations
-                }), 400
-        else:
-            # In höheren Runden müssen nur die Bewertungen vorliegen, die neu bewertet werden müssen
-            # Wir prüfen, ob für jede Bewertung, die neu bewertet werden muss, eine Bewertung in der aktuellen Runde vorliegt
-            
-            # Alle Bewertungen aus der vorherigen Runde, die neu bewertet werden müssen
-            previous_round = current_round - 1
-            needs_reevaluation = Evaluation.query.filter_by(
-                case_id=case_id, 
-                round=previous_round, 
-                needs_reevaluation=True
-            ).all()
-            
-            # Für jede Bewertung, die neu bewertet werden muss, prüfen, ob eine Bewertung in der aktuellen Runde vorliegt
-            missing_evaluations = []
-            
-            for eval_to_redo in needs_reevaluation:
-                # Prüfen, ob eine Bewertung in der aktuellen Runde vorliegt
-                current_eval = Evaluation.query.filter_by(
-                    case_id=case_id,
-                    user_id=eval_to_redo.user_id,
-                    criterion_id=eval_to_redo.criterion_id,
-                    technology_id=eval_to_redo.technology_id,
-                    round=current_round
-                ).first()
-                
-                if not current_eval:
-                    missing_evaluations.append({
-                        "user_id": eval_to_redo.user_id,
-                        "criterion_id": eval_to_redo.criterion_id,
-                        "technology_id": eval_to_redo.technology_id
-                    })
-            
-            if missing_evaluations:
-                return jsonify({
-                    "message": "Cannot analyze round: Not all users have completed their evaluations",
-                    "missing_evaluations": missing_evaluations,
-                    "total_missing": len(missing_evaluations)
-                }), 400
-        
-        # Statistiken initialisieren
-        criteria_ok_count = 0
-        criteria_total_count = len(criteria) * len(users)
-        tech_ok_count = 0
-        tech_total_count = len(criteria) * len(technologies) * len(users)
-        
-        # Für jeden Benutzer die Bewertungen analysieren
-        for user in users:
-            # Kriterien-Bewertungen analysieren
-            for criterion in criteria:
-                # Bewertungen aller Benutzer für dieses Kriterium abrufen (aktuelle Runde)
-                all_criterion_evals = Evaluation.query.filter_by(
-                    case_id=case_id,
-                    criterion_id=criterion.id,
-                    technology_id=None,
-                    round=current_round
-                ).all()
-                
-                # Wenn wir in einer höheren Runde sind, auch die Bewertungen aus der vorherigen Runde berücksichtigen,
-                # die nicht neu bewertet werden mussten
-                if current_round > 1:
-                    previous_criterion_evals = Evaluation.query.filter_by(
-                        case_id=case_id,
-                        criterion_id=criterion.id,
-                        technology_id=None,
-                        round=current_round-1,
-                        needs_reevaluation=False
-                    ).all()
-                    
-                    # Diese Bewertungen zur Liste der aktuellen Bewertungen hinzufügen
-                    all_criterion_evals.extend(previous_criterion_evals)
-                
-                if len(all_criterion_evals) > 0:
-                    # Mittelwert der Fuzzy-Vektoren berechnen
-                    mean_vector_a = float(np.mean([eval.fuzzy_vector_a for eval in all_criterion_evals]))
-                    mean_vector_b = float(np.mean([eval.fuzzy_vector_b for eval in all_criterion_evals]))
-                    mean_vector_c = float(np.mean([eval.fuzzy_vector_c for eval in all_criterion_evals]))
-                    mean_vector = (mean_vector_a, mean_vector_b, mean_vector_c)
-                    
-                    # Gesamtdistanz für dieses Kriterium berechnen
-                    criterion_total_distance = 0
-                    for evaluation in all_criterion_evals:
-                        user_vector = (float(evaluation.fuzzy_vector_a), float(evaluation.fuzzy_vector_b), float(evaluation.fuzzy_vector_c))
-                        distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                        criterion_total_distance += distance
-                    
-                    # Durchschnittliche Distanz für dieses Kriterium berechnen
-                    criterion_mean_distance = criterion_total_distance / len(all_criterion_evals)
-                    
-                    # Prüfen, ob die durchschnittliche Distanz im grünen Bereich ist
-                    if criterion_mean_distance <= threshold_distance_mean:
-                        criteria_ok_count += 1
-                    
-                    # Für jeden Benutzer prüfen, ob seine Bewertung neu bewertet werden muss
-                    for user_eval in all_criterion_evals:
-                        if user_eval.round == current_round:  # Nur Bewertungen der aktuellen Runde markieren
-                            user_vector = (float(user_eval.fuzzy_vector_a), float(user_eval.fuzzy_vector_b), float(user_eval.fuzzy_vector_c))
-                            distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                            
-                            # Bewertung für die nächste Runde markieren
-                            user_eval.needs_reevaluation = distance > threshold_distance_mean
-            
-            # Technologie-Matrix-Bewertungen analysieren
-            for technology in technologies:
-                for criterion in criteria:
-                    # Bewertungen aller Benutzer für diese Technologie-Kriterium-Kombination abrufen (aktuelle Runde)
-                    all_tech_evals = Evaluation.query.filter_by(
-                        case_id=case_id,
-                        criterion_id=criterion.id,
-                        technology_id=technology.id,
-                        round=current_round
-                    ).all()
-                    
-                    # Wenn wir in einer höheren Runde sind, auch die Bewertungen aus der vorherigen Runde berücksichtigen,
-                    # die nicht neu bewertet werden mussten
-                    if current_round > 1:
-                        previous_tech_evals = Evaluation.query.filter_by(
-                            case_id=case_id,
-                            criterion_id=criterion.id,
-                            technology_id=technology.id,
-                            round=current_round-1,
-                            needs_reevaluation=False
-                        ).all()
-                        
-                        # Diese Bewertungen zur Liste der aktuellen Bewertungen hinzufügen
-                        all_tech_evals.extend(previous_tech_evals)
-                    
-                    if len(all_tech_evals) > 0:
-                        # Mittelwert der Fuzzy-Vektoren berechnen
-                        mean_vector_a = float(np.mean([eval.fuzzy_vector_a for eval in all_tech_evals]))
-                        mean_vector_b = float(np.mean([eval.fuzzy_vector_b for eval in all_tech_evals]))
-                        mean_vector_c = float(np.mean([eval.fuzzy_vector_c for eval in all_tech_evals]))
-                        mean_vector = (mean_vector_a, mean_vector_b, mean_vector_c)
-                        
-                        # Gesamtdistanz für diese Technologie-Kriterium-Kombination berechnen
-                        tech_criterion_total_distance = 0
-                        for evaluation in all_tech_evals:
-                            user_vector = (float(evaluation.fuzzy_vector_a), float(evaluation.fuzzy_vector_b), float(evaluation.fuzzy_vector_c))
-                            distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                            tech_criterion_total_distance += distance
-                        
-                        # Durchschnittliche Distanz für diese Technologie-Kriterium-Kombination berechnen
-                        tech_criterion_mean_distance = tech_criterion_total_distance / len(all_tech_evals)
-                        
-                        # Prüfen, ob die durchschnittliche Distanz im grünen Bereich ist
-                        if tech_criterion_mean_distance <= threshold_distance_mean:
-                            tech_ok_count += 1
-                        
-                        # Für jeden Benutzer prüfen, ob seine Bewertung neu bewertet werden muss
-                        for user_eval in all_tech_evals:
-                            if user_eval.round == current_round:  # Nur Bewertungen der aktuellen Runde markieren
-                                user_vector = (float(user_eval.fuzzy_vector_a), float(user_eval.fuzzy_vector_b), float(user_eval.fuzzy_vector_c))
-                                distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                                
-                                # Bewertung für die nächste Runde markieren
-                                user_eval.needs_reevaluation = distance > threshold_distance_mean
-        
-        # Prozentsätze berechnen
-        criteria_ok_percent = (criteria_ok_count / criteria_total_count * 100) if criteria_total_count > 0 else 0
-        tech_ok_percent = (tech_ok_count / tech_total_count * 100) if tech_total_count > 0 else 0
-        
-        # Prüfen, ob alle Werte im grünen Bereich sind
-        criteria_passed = criteria_ok_percent >= case.threshold_criteria_percent
-        tech_passed = tech_ok_percent >= case.threshold_tech_percent
-        
-        # Tatsächliche durchschnittliche Distanz zum Mittelwert berechnen
-        # Wir verwenden die berechneten Distanzen aus den Fuzzy-Vektoren
-        
-        # Alle Bewertungen für die aktuelle Runde sammeln
-        all_current_evaluations = Evaluation.query.filter_by(case_id=case_id, round=current_round).all()
-        
-        # Distanz zum Mittelwert für jede Bewertung berechnen
-        total_distance = 0
-        total_evaluations = 0
-        
-        # Separate Werte für Kriterien und Technologie-Matrix
-        criteria_total_distance = 0
-        criteria_total_evaluations = 0
-        tech_total_distance = 0
-        tech_total_evaluations = 0
-        
-        # Für jede Kriterium-Technologie-Kombination die Distanz zum Mittelwert berechnen
-        for criterion in criteria:
-            # Kriterien-Bewertungen
-            criterion_evals = [e for e in all_current_evaluations if e.criterion_id == criterion.id and e.technology_id is None]
-            
-            if criterion_evals:
-                # Mittelwert der Fuzzy-Vektoren berechnen
-                mean_vector_a = float(np.mean([eval.fuzzy_vector_a for eval in criterion_evals]))
-                mean_vector_b = float(np.mean([eval.fuzzy_vector_b for eval in criterion_evals]))
-                mean_vector_c = float(np.mean([eval.fuzzy_vector_c for eval in criterion_evals]))
-                mean_vector = (mean_vector_a, mean_vector_b, mean_vector_c)
-                
-                # Distanz jeder Bewertung zum Mittelwert berechnen
-                for evaluation in criterion_evals:
-                    user_vector = (float(evaluation.fuzzy_vector_a), float(evaluation.fuzzy_vector_b), float(evaluation.fuzzy_vector_c))
-                    distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                    total_distance += distance
-                    total_evaluations += 1
-                    criteria_total_distance += distance
-                    criteria_total_evaluations += 1
-            
-            # Technologie-Kriterium-Bewertungen
-            for technology in technologies:
-                tech_criterion_evals = [e for e in all_current_evaluations if e.criterion_id == criterion.id and e.technology_id == technology.id]
-                
-                if tech_criterion_evals:
-                    # Mittelwert der Fuzzy-Vektoren berechnen
-                    mean_vector_a = float(np.mean([eval.fuzzy_vector_a for eval in tech_criterion_evals]))
-                    mean_vector_b = float(np.mean([eval.fuzzy_vector_b for eval in tech_criterion_evals]))
-                    mean_vector_c = float(np.mean([eval.fuzzy_vector_c for eval in tech_criterion_evals]))
-                    mean_vector = (mean_vector_a, mean_vector_b, mean_vector_c)
-                    
-                    # Distanz jeder Bewertung zum Mittelwert berechnen
-                    for evaluation in tech_criterion_evals:
-                        user_vector = (float(evaluation.fuzzy_vector_a), float(evaluation.fuzzy_vector_b), float(evaluation.fuzzy_vector_c))
-                        distance = float(calculate_fuzzy_distance(user_vector, mean_vector))
-                        total_distance += distance
-                        total_evaluations += 1
-                        tech_total_distance += distance
-                        tech_total_evaluations += 1
-        
-        # Durchschnittliche Distanz berechnen
-        mean_distance_value = float(total_distance / total_evaluations) if total_evaluations > 0 else 0.0
-        
-        # Separate durchschnittliche Distanzen für Kriterien und Technologie-Matrix berechnen
-        criteria_mean_distance_value = float(criteria_total_distance / criteria_total_evaluations) if criteria_total_evaluations > 0 else 0.0
-        tech_mean_distance_value = float(tech_total_distance / tech_total_evaluations) if tech_total_evaluations > 0 else 0.0
-        
-        # Prüfen, ob die durchschnittlichen Distanzen im grünen Bereich sind
-        mean_distance_ok = bool(mean_distance_value <= case.threshold_distance_mean)
-        criteria_mean_distance_ok = bool(criteria_mean_distance_value <= case.threshold_distance_mean)
-        tech_mean_distance_ok = bool(tech_mean_distance_value <= case.threshold_distance_mean)
-        
-        # Gesamtergebnis - Alle drei Kriterien berücksichtigen
-        passed_analysis = mean_distance_ok and criteria_passed and tech_passed
+        # Distanzen berechnen und Bewertungen für die Neubewertung markieren (siehe src/analysis.py)
+        try:
+            result, details = analyze_case_round(case)
+        except IncompleteRoundError as e:
+            return jsonify(e.details), 400
+        passed_analysis = result["passed_analysis"]
         
         # Analyseergebnis speichern
-        analysis = RoundAnalysis(
-            case_id=case_id,
-            round_number=current_round,
-            criteria_ok_percent=criteria_ok_percent,
-            criteria_total_count=criteria_total_count,
-            criteria_ok_count=criteria_ok_count,
-            criteria_passed=criteria_passed,
-            tech_ok_percent=tech_ok_percent,
-            tech_total_count=tech_total_count,
-            tech_ok_count=tech_ok_count,
-            tech_passed=tech_passed,
-            mean_distance_ok=mean_distance_ok,
-            mean_distance_value=mean_distance_value,
-            criteria_mean_distance_value=criteria_mean_distance_value,
-            criteria_mean_distance_ok=criteria_mean_distance_ok,
-            tech_mean_distance_value=tech_mean_distance_value,
-            tech_mean_distance_ok=tech_mean_distance_ok,
-            passed_analysis=passed_analysis
-        )
+        analysis = RoundAnalysis(case_id=case_id, round_number=current_round, **result)
         db.session.add(analysis)
+        db.session.flush()
+
+        # Vollständiges Ergebnis als unveränderliches Dokument (siehe src/round_results.py)
+        db.session.add(RoundResultDocument(
+            **build_result_document(case, current_round, analysis.id, result, details)
+        ))
+        # Ergebnis jeder Zelle (ein INSERT für alle Zellen; render_nulls, sonst
+        # teilt der ORM-Bulk-Insert die Zeilen ohne technology_id ab)
+        if details["cells"]:
+            db.session.execute(db.insert(ConsensusCell).execution_options(render_nulls=True), [
+                {"case_id": case_id, "round_number": current_round, "analysis_id": analysis.id, **cell}
+                for cell in details["cells"]
+            ])
         
         # Wenn die Analyse nicht bestanden wurde, eine neue Runde erstellen
         if not passed_analysis:
@@ -1095,39 +866,48 @@ def analyze_round(case_id):
             db.session.add(new_round)
         
         db.session.commit()
+        # Neue Runde und current_round: Stammdaten im Cache verwerfen
+        if not passed_analysis:
+            invalidate_case(case_id)
         
         # Ergebnis zurückgeben
         return jsonify({
             "case_id": case_id,
             "round_number": current_round,
-            "criteria_ok_percent": criteria_ok_percent,
-            "criteria_passed": criteria_passed,
-            "tech_ok_percent": tech_ok_percent,
-            "tech_passed": tech_passed,
-            "mean_distance_ok": mean_distance_ok,
-            "mean_distance_value": mean_distance_value,
-            "criteria_mean_distance_value": criteria_mean_distance_value,
-            "criteria_mean_distance_ok": criteria_mean_distance_ok,
-            "tech_mean_distance_value": tech_mean_distance_value,
-            "tech_mean_distance_ok": tech_mean_distance_ok,
+            "criteria_ok_percent": result["criteria_ok_percent"],
+            "criteria_passed": result["criteria_passed"],
+            "tech_ok_percent": result["tech_ok_percent"],
+            "tech_passed": result["tech_passed"],
+            "mean_distance_ok": result["mean_distance_ok"],
+            "mean_distance_value": result["mean_distance_value"],
+            "criteria_mean_distance_value": result["criteria_mean_distance_value"],
+            "criteria_mean_distance_ok": result["criteria_mean_distance_ok"],
+            "tech_mean_distance_value": result["tech_mean_distance_value"],
+            "tech_mean_distance_ok": result["tech_mean_distance_ok"],
             "passed_analysis": passed_analysis,
             "next_round": None if passed_analysis else case.current_round
         }), 200
     
+    except IntegrityError:
+        # Parallele Analyse derselben Runde
+        db.session.rollback()
+        return jsonify({"message": "Round has already been analyzed"}), 409
     except Exception as e:
-        print(f"Error in analyze_round: {str(e)}")
+        logger.exception("Error in analyze_round")
         db.session.rollback()
         return jsonify({"message": f"Error analyzing round: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/round-analysis', methods=['GET'])
+@query_budget(3)
 def get_round_analysis(case_id):
     """
     Gibt die Analyseergebnisse für alle Runden eines Cases zurück.
+    Mit ?include=telemetry zusätzlich Laufzeit, DB-Zeit, Umfang und Speicher jedes Analyselaufs.
     """
+    include_telemetry = "telemetry" in request.args.get("include", "").split(",")
     try:
         # Case abrufen
-        case = Case.query.get(case_id)
-        if not case:
+        if not case_exists(case_id):
             return jsonify({"message": "Case not found"}), 404
         
         # Alle Analysen für diesen Case abrufen
@@ -1157,26 +937,174 @@ def get_round_analysis(case_id):
                 "tech_mean_distance_ok": analysis.tech_mean_distance_ok,
                 "passed_analysis": analysis.passed_analysis
             })
+            if include_telemetry:
+                result[-1]["telemetry"] = {
+                    "wall_time_ms": analysis.wall_time_ms,
+                    "db_time_ms": analysis.db_time_ms,
+                    "cell_count": analysis.cell_count,
+                    "evaluation_count": analysis.evaluation_count,
+                    "peak_memory_kb": analysis.peak_memory_kb,
+                    "engine_version": analysis.engine_version
+                }
         
         return jsonify(result), 200
     
     except Exception as e:
-        print(f"Error in get_round_analysis: {str(e)}")
+        logger.exception("Error in get_round_analysis")
         return jsonify({"message": f"Error fetching round analysis: {str(e)}"}), 500
 
+@cases_bp.route('/<int:case_id>/rounds/<int:round_number>/result', methods=['GET'])
+@query_budget(2)
+def get_round_result(case_id, round_number):
+    """
+    Gibt das gespeicherte Ergebnisdokument einer analysierten Runde zurück
+    (gzip-komprimiert, sofern der Client es akzeptiert, mit ETag).
+    """
+    response = result_document_response(case_id, round_number)
+    if response is None:
+        return jsonify({"message": "Round result not found"}), 404
+    return response
+
+@cases_bp.route('/<int:case_id>/consensus', methods=['GET'])
+@query_budget(2)
+def get_consensus(case_id):
+    """
+    Gibt das Ergebnis jeder Zelle einer analysierten Runde zurück (?round=n,
+    ohne Angabe die zuletzt analysierte Runde): Mittelwert, mittlere Distanz,
+    Anzahl der Bewertungen und ob die Zelle im grünen Bereich liegt.
+    """
+    round_number = request.args.get('round', type=int)
+    query = ConsensusCell.query.filter_by(case_id=case_id)
+    if round_number is None:
+        query = query.filter(ConsensusCell.round_number == db.session.query(
+            func.max(ConsensusCell.round_number)
+        ).filter(ConsensusCell.case_id == case_id).scalar_subquery())
+    else:
+        query = query.filter_by(round_number=round_number)
+    cells = query.order_by(ConsensusCell.id).all()
+
+    if not cells:
+        if not case_exists(case_id):
+            return jsonify({"message": "Case not found"}), 404
+        return jsonify({"message": "No analyzed round found"}), 404
+
+    return jsonify({
+        "case_id": case_id,
+        "round_number": cells[0].round_number,
+        "analysis_id": cells[0].analysis_id,
+        "cells": [{
+            "criterion_id": cell.criterion_id,
+            "technology_id": cell.technology_id,
+            "mean_a": cell.mean_a,
+            "mean_b": cell.mean_b,
+            "mean_c": cell.mean_c,
+            "mean_distance": cell.mean_distance,
+            "expert_count": cell.expert_count,
+            "ok": cell.ok
+        } for cell in cells]
+    }), 200
+
+@cases_bp.route('/<int:case_id>/convergence', methods=['GET'])
+@query_budget(3)
+def get_convergence(case_id):
+    """
+    Verlauf der Uneinigkeit über die Runden: pro analysierter Runde die
+    mittleren Distanzen, die Anteile im grünen Bereich und die Anzahl der
+    Zellen außerhalb, pro Zelle die mittlere Distanz jeder Runde (in der
+    Reihenfolge von "rounds", None ohne Ergebnis). Gelesen wird nur aus
+    round_analysis und consensus_cells, nicht aus den Bewertungen.
+    """
+    analyses = RoundAnalysis.query.filter_by(case_id=case_id).order_by(RoundAnalysis.round_number).all()
+    if not analyses and not case_exists(case_id):
+        return jsonify({"message": "Case not found"}), 404
+
+    cells = db.session.query(
+        ConsensusCell.round_number, ConsensusCell.criterion_id, ConsensusCell.technology_id,
+        ConsensusCell.mean_distance, ConsensusCell.ok
+    ).filter_by(case_id=case_id).order_by(
+        ConsensusCell.criterion_id, ConsensusCell.technology_id, ConsensusCell.round_number
+    ).all()
+
+    position = {analysis.round_number: i for i, analysis in enumerate(analyses)}
+    cell_counts = [0] * len(analyses)
+    flagged_counts = [0] * len(analyses)
+    trajectories = {}
+    for cell in cells:
+        i = position.get(cell.round_number)
+        if i is None:
+            continue
+        cell_counts[i] += 1
+        if not cell.ok:
+            flagged_counts[i] += 1
+        trajectory = trajectories.get((cell.criterion_id, cell.technology_id))
+        if trajectory is None:
+            trajectory = trajectories[(cell.criterion_id, cell.technology_id)] = {
+                "criterion_id": cell.criterion_id,
+                "technology_id": cell.technology_id,
+                "mean_distance": [None] * len(analyses),
+                "ok": [None] * len(analyses)
+            }
+        trajectory["mean_distance"][i] = cell.mean_distance
+        trajectory["ok"][i] = cell.ok
+
+    return jsonify({
+        "case_id": case_id,
+        "rounds": [{
+            "round_number": analysis.round_number,
+            "analysis_id": analysis.id,
+            "mean_distance_value": analysis.mean_distance_value,
+            "criteria_mean_distance_value": analysis.criteria_mean_distance_value,
+            "tech_mean_distance_value": analysis.tech_mean_distance_value,
+            "criteria_ok_percent": analysis.criteria_ok_percent,
+            "tech_ok_percent": analysis.tech_ok_percent,
+            "passed_analysis": analysis.passed_analysis,
+            # None für Runden, die vor consensus_cells analysiert wurden
+            "cell_count": cell_counts[i] or None,
+            "flagged_cells": flagged_counts[i] if cell_counts[i] else None
+        } for i, analysis in enumerate(analyses)],
+        "cells": list(trajectories.values())
+    }), 200
+
+@cases_bp.route('/<int:case_id>/ranking', methods=['GET'])
+@query_budget(8)
+def get_ranking(case_id):
+    """
+    Rangfolge der Technologien nach der zuletzt analysierten Runde
+    (?method=topsis oder weighted_sum, siehe src/ranking.py).
+    """
+    # Lazy: das Ranking braucht NumPy (Kaltstart, wie analyze_round)
+    from src.ranking import METHODS, rank_case
+
+    method = request.args.get('method', 'topsis')
+    if method not in METHODS:
+        return jsonify({"message": f"method must be one of {', '.join(METHODS)}"}), 400
+    try:
+        analysis = db.session.query(
+            RoundAnalysis.id, RoundAnalysis.round_number, RoundAnalysis.passed_analysis
+        ).filter_by(case_id=case_id).order_by(RoundAnalysis.round_number.desc()).first()
+        if analysis is None:
+            if not case_exists(case_id):
+                return jsonify({"message": "Case not found"}), 404
+            return jsonify({"message": "No analyzed round found"}), 404
+        return jsonify(rank_case(case_id, analysis, method)), 200
+    except Exception as e:
+        logger.exception("Error in get_ranking")
+        return jsonify({"message": f"Error ranking technologies: {str(e)}"}), 500
+
 @cases_bp.route('/<int:case_id>/reevaluations/<int:user_id>', methods=['GET'])
+@query_budget(7)
 def get_user_reevaluations(case_id, user_id):
     """
     Gibt alle Bewertungen zurück, die ein Benutzer in der nächsten Runde neu bewerten muss.
     """
     try:
         # Case abrufen
-        case = Case.query.get(case_id)
-        if not case:
+        case = get_case_metadata(case_id)
+        if case is None:
             return jsonify({"message": "Case not found"}), 404
         
         # Aktuelle Runde bestimmen
-        current_round = case.current_round
+        current_round = case["current_round"]
         
         # Bewertungen aus der vorherigen Runde abrufen, die neu bewertet werden müssen
         previous_round = current_round - 1
@@ -1207,10 +1135,11 @@ def get_user_reevaluations(case_id, user_id):
         return jsonify(result), 200
     
     except Exception as e:
-        print(f"Error in get_user_reevaluations: {str(e)}")
+        logger.exception("Error in get_user_reevaluations")
         return jsonify({"message": f"Error fetching reevaluations: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/update-thresholds', methods=['PUT'])
+@query_budget(4)
 def update_thresholds(case_id):
     """
     Aktualisiert die Grenzwerte für die Rundenanalyse eines Cases.
@@ -1234,6 +1163,7 @@ def update_thresholds(case_id):
             case.threshold_tech_percent = data['threshold_tech_percent']
         
         db.session.commit()
+        invalidate_case(case_id)
         
         return jsonify({
             "id": case.id,
@@ -1243,23 +1173,24 @@ def update_thresholds(case_id):
         }), 200
     
     except Exception as e:
-        print(f"Error in update_thresholds: {str(e)}")
+        logger.exception("Error in update_thresholds")
         db.session.rollback()
         return jsonify({"message": f"Error updating thresholds: {str(e)}"}), 500
 
 @cases_bp.route('/<int:case_id>/reevaluations/<int:user_id>', methods=['GET'])
+@query_budget(7)
 def get_reevaluations(case_id, user_id):
     """
     Gibt die Bewertungen zurück, die in der aktuellen Runde neu bewertet werden müssen.
     """
     try:
         # Case abrufen
-        case = Case.query.get(case_id)
-        if not case:
+        case = get_case_metadata(case_id)
+        if case is None:
             return jsonify({"message": "Case not found"}), 404
         
         # Aktuelle Runde bestimmen
-        current_round = case.current_round
+        current_round = case["current_round"]
         
         # Wenn wir in Runde 1 sind, gibt es keine Neubewertungen
         if current_round <= 1:
@@ -1293,5 +1224,5 @@ def get_reevaluations(case_id, user_id):
         
         return jsonify(result), 200
     except Exception as e:
-        print(f"Error in get_reevaluations: {str(e)}")
+        logger.exception("Error in get_reevaluations")
         return jsonify({"message": f"Error fetching reevaluations: {str(e)}"}), 500
@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Criterion, Project
+from sqlalchemy.exc import IntegrityError
+from src.models import db, Criterion, Project, normalize_catalog_name
+from src.case_cache import invalidate_all
+from src.catalog import catalog_usage
+from src.query_budget import query_budget
 
 criteria_bp = Blueprint('criteria', __name__)
 
 @criteria_bp.route('/', methods=['GET'])
+@query_budget(2)
 def get_all_criteria():
     project_id = request.args.get('project_id')
     if project_id:
@@ -17,6 +22,7 @@ def get_all_criteria():
     } for c in criteria]), 200
 
 @criteria_bp.route('/create', methods=['POST'])
+@query_budget(5)
 def create_criterion():
     data = request.get_json()
     
@@ -26,6 +32,16 @@ def create_criterion():
     project = Project.query.get(data['project_id'])
     if not project:
         return jsonify({"message": "Project not found"}), 404
+
+    # Gleichnamige Einträge aus dem gemeinsamen Katalog wiederverwenden
+    existing = Criterion.query.filter_by(normalized_name=normalize_catalog_name(data['name'])).first()
+    if existing:
+        return jsonify({
+            "message": "Criterion already exists",
+            "id": existing.id,
+            "project_id": existing.project_id,
+            "name": existing.name
+        }), 200
         
     new_criterion = Criterion(
         project_id=data['project_id'],
@@ -42,16 +58,27 @@ def create_criterion():
     }), 201
 
 @criteria_bp.route('/<int:criterion_id>', methods=['PUT'])
+@query_budget(4)
 def update_criterion(criterion_id):
     criterion = Criterion.query.get(criterion_id)
     if not criterion:
         return jsonify({"message": "Criterion not found"}), 404
         
     data = request.get_json()
-    if 'name' in data:
+    if 'name' in data and data['name'] != criterion.name:
+        # Gemeinsamer Katalogeintrag: eine Umbenennung würde alle Cases und Vorlagen
+        # (und nicht die gespeicherten Rundenergebnisse) betreffen
+        if sum(catalog_usage(Criterion, criterion_id)) > 1:
+            return jsonify({"message": "Criterion is used by several cases or templates and cannot be renamed"}), 409
         criterion.name = data['name']
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Criterion with this name already exists"}), 409
+    # Die Namen stehen in den Stammdaten aller Cases, die das Kriterium verwenden
+    invalidate_all()
     return jsonify({
         "message": "Criterion updated",
         "id": criterion.id,
@@ -60,11 +87,20 @@ def update_criterion(criterion_id):
     }), 200
 
 @criteria_bp.route('/<int:criterion_id>', methods=['DELETE'])
+@query_budget(6)
 def delete_criterion(criterion_id):
     criterion = Criterion.query.get(criterion_id)
     if not criterion:
         return jsonify({"message": "Criterion not found"}), 404
         
-    db.session.delete(criterion)
-    db.session.commit()
+    if any(catalog_usage(Criterion, criterion_id)):
+        return jsonify({"message": "Criterion is used by cases or templates and cannot be deleted"}), 409
+
+    # Ohne ORM-Kaskade: verbleibende Verweise (Bewertungen, Konsens-Zellen) lässt die Datenbank scheitern
+    try:
+        Criterion.query.filter_by(id=criterion_id).delete(synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Criterion is still referenced and cannot be deleted"}), 409
     return jsonify({"message": "Criterion deleted"}), 200
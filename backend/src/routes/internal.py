@@ -0,0 +1,28 @@
+import os
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models import db
+from src.db_pool import pool_status
+
+internal_bp = Blueprint('internal', __name__)
+
+# ------------------------------
+# Betriebsdaten (nur Master)
+# ------------------------------
+
+@internal_bp.route('/pool', methods=['GET'])
+@jwt_required()
+def get_pool_status():
+    """
+    Zustand des Connection-Pools dieses Worker-Prozesses: ausgegebene und freie
+    Verbindungen, Overflow sowie Zähler und Wartezeiten seit dem Start.
+    Jeder Worker hat einen eigenen Pool – die Werte gelten nur für den
+    antwortenden Prozess (siehe "pid").
+    """
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    status = pool_status(db.engine)
+    status["pid"] = os.getpid()
+    return jsonify(status), 200
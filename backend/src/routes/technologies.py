@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Technology, Project
+from sqlalchemy.exc import IntegrityError
+from src.models import db, Technology, Project, normalize_catalog_name
+from src.case_cache import invalidate_all
+from src.catalog import catalog_usage
+from src.query_budget import query_budget
 
 technologies_bp = Blueprint('technologies', __name__)
 
 @technologies_bp.route('/', methods=['GET'])
+@query_budget(2)
 def get_all_technologies():
     project_id = request.args.get('project_id')
     if project_id:
@@ -17,6 +22,7 @@ def get_all_technologies():
     } for t in technologies]), 200
 
 @technologies_bp.route('/create', methods=['POST'])
+@query_budget(5)
 def create_technology():
     data = request.get_json()
     
@@ -26,6 +32,16 @@ def create_technology():
     project = Project.query.get(data['project_id'])
     if not project:
         return jsonify({"message": "Project not found"}), 404
+
+    # Gleichnamige Einträge aus dem gemeinsamen Katalog wiederverwenden
+    existing = Technology.query.filter_by(normalized_name=normalize_catalog_name(data['name'])).first()
+    if existing:
+        return jsonify({
+            "message": "Technology already exists",
+            "id": existing.id,
+            "project_id": existing.project_id,
+            "name": existing.name
+        }), 200
         
     new_technology = Technology(
         project_id=data['project_id'],
@@ -42,16 +58,27 @@ def create_technology():
     }), 201
 
 @technologies_bp.route('/<int:technology_id>', methods=['PUT'])
+@query_budget(4)
 def update_technology(technology_id):
     technology = Technology.query.get(technology_id)
     if not technology:
         return jsonify({"message": "Technology not found"}), 404
         
     data = request.get_json()
-    if 'name' in data:
+    if 'name' in data and data['name'] != technology.name:
+        # Gemeinsamer Katalogeintrag: eine Umbenennung würde alle Cases und Vorlagen
+        # (und nicht die gespeicherten Rundenergebnisse) betreffen
+        if sum(catalog_usage(Technology, technology_id)) > 1:
+            return jsonify({"message": "Technology is used by several cases or templates and cannot be renamed"}), 409
         technology.name = data['name']
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Technology with this name already exists"}), 409
+    # Die Namen stehen in den Stammdaten aller Cases, die die Technologie verwenden
+    invalidate_all()
     return jsonify({
         "message": "Technology updated",
         "id": technology.id,
@@ -60,11 +87,20 @@ def update_technology(technology_id):
     }), 200
 
 @technologies_bp.route('/<int:technology_id>', methods=['DELETE'])
+@query_budget(4)
 def delete_technology(technology_id):
     technology = Technology.query.get(technology_id)
     if not technology:
         return jsonify({"message": "Technology not found"}), 404
         
-    db.session.delete(technology)
-    db.session.commit()
+    if any(catalog_usage(Technology, technology_id)):
+        return jsonify({"message": "Technology is used by cases or templates and cannot be deleted"}), 409
+
+    # Ohne ORM-Kaskade: verbleibende Verweise (Bewertungen, Konsens-Zellen) lässt die Datenbank scheitern
+    try:
+        Technology.query.filter_by(id=technology_id).delete(synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Technology is still referenced and cannot be deleted"}), 409
     return jsonify({"message": "Technology deleted"}), 200
@@ -0,0 +1,144 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from src.models import db, User, CaseTemplate, case_template_criteria, case_template_technologies, case_template_users
+from src.case_copy import create_template_from_case, create_case_from_template
+from src.query_budget import query_budget
+
+templates_bp = Blueprint('templates', __name__)
+
+def _link_count(table, template_ids):
+    """Anzahl der Zuordnungen je Vorlage (eine Abfrage für alle Vorlagen)."""
+    return dict(
+        db.session.query(table.c.template_id, db.func.count())
+        .filter(table.c.template_id.in_(template_ids))
+        .group_by(table.c.template_id)
+    )
+
+@templates_bp.route('/', methods=['GET'])
+@query_budget(6)
+@jwt_required()
+def get_templates():
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    templates = CaseTemplate.query.order_by(CaseTemplate.name).all()
+    template_ids = [t.id for t in templates]
+    criteria_counts = _link_count(case_template_criteria, template_ids)
+    technology_counts = _link_count(case_template_technologies, template_ids)
+    user_counts = _link_count(case_template_users, template_ids)
+
+    return jsonify([{
+        "id": t.id,
+        "name": t.name,
+        "case_type": t.case_type,
+        "source_case_id": t.source_case_id,
+        "created_at": t.created_at.isoformat() if t.created_at else None,
+        "criteria_count": criteria_counts.get(t.id, 0),
+        "technologies_count": technology_counts.get(t.id, 0),
+        "users_count": user_counts.get(t.id, 0)
+    } for t in templates]), 200
+
+@templates_bp.route('/', methods=['POST'])
+@query_budget(6)
+@jwt_required()
+def create_template():
+    """Speichert einen bestehenden Case als Vorlage ({"case_id", "name", "include_users"})."""
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON-Objekt erwartet"}), 400
+    case_id = data.get('case_id')
+    name = data.get('name')
+    if not case_id or not name:
+        return jsonify({"error": "case_id und name sind erforderlich"}), 400
+
+    template_id = create_template_from_case(case_id, name, include_users=data.get('include_users', True))
+    if template_id is None:
+        return jsonify({"error": "Case not found"}), 404
+    db.session.commit()
+    return jsonify({"message": "Template created", "id": template_id}), 201
+
+@templates_bp.route('/<int:template_id>', methods=['GET'])
+@query_budget(6)
+@jwt_required()
+def get_template(template_id):
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    template = CaseTemplate.query.get(template_id)
+    if not template:
+        return jsonify({"error": "Template not found"}), 404
+
+    return jsonify({
+        "id": template.id,
+        "name": template.name,
+        "case_type": template.case_type,
+        "source_case_id": template.source_case_id,
+        "created_at": template.created_at.isoformat() if template.created_at else None,
+        "threshold_distance_mean": template.threshold_distance_mean,
+        "threshold_criteria_percent": template.threshold_criteria_percent,
+        "threshold_tech_percent": template.threshold_tech_percent,
+        "criteria": [{"id": c.id, "name": c.name} for c in template.criteria],
+        "technologies": [{"id": t.id, "name": t.name} for t in template.technologies],
+        "users": [{"id": u.id, "username": u.username} for u in template.users]
+    }), 200
+
+@templates_bp.route('/<int:template_id>', methods=['DELETE'])
+@query_budget(6)
+@jwt_required()
+def delete_template(template_id):
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    # Zuordnungen zuerst löschen (SQLite setzt ON DELETE CASCADE nicht standardmäßig um)
+    for table in (case_template_criteria, case_template_technologies, case_template_users):
+        db.session.execute(table.delete().where(table.c.template_id == template_id))
+    deleted = CaseTemplate.query.filter_by(id=template_id).delete()
+    if not deleted:
+        db.session.rollback()
+        return jsonify({"error": "Template not found"}), 404
+    db.session.commit()
+    return jsonify({"message": "Template deleted"}), 200
+
+@templates_bp.route('/<int:template_id>/cases', methods=['POST'])
+@query_budget(6)
+@jwt_required()
+def create_case_from_template_route(template_id):
+    """Legt einen neuen Case aus einer Vorlage an ({"name", "include_users", "assigned_user_id"})."""
+    current_user = get_jwt_identity()
+    if current_user["role"] != "master":
+        return jsonify({"error": "Access forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON-Objekt erwartet"}), 400
+
+    assigned_user_id = data.get('assigned_user_id')
+    if assigned_user_id is not None and not db.session.query(
+        User.query.filter_by(id=assigned_user_id).exists()
+    ).scalar():
+        return jsonify({"error": "assigned_user_id: Benutzer nicht gefunden"}), 400
+
+    try:
+        case_id = create_case_from_template(
+            template_id,
+            name=data.get('name'),
+            include_users=data.get('include_users', True),
+            assigned_user_id=assigned_user_id,
+            project_id=data.get('project_id', 1)  # Default-Wert 1 für Abwärtskompatibilität
+        )
+        if case_id is None:
+            return jsonify({"error": "Template not found"}), 404
+        db.session.commit()
+    except IntegrityError:
+        # z. B. unbekannte project_id
+        db.session.rollback()
+        return jsonify({"error": "Ungültige Referenz im Request"}), 400
+    return jsonify({"message": "Case created successfully", "case_id": case_id}), 201
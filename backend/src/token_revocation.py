@@ -0,0 +1,323 @@
+"""
+Cache für widerrufene JWTs (Token-Blacklist).
+
+Der token_in_blocklist_loader läuft bei jedem authentifizierten Request. Statt
+jedes Mal die Tabelle token_blacklist abzufragen, hält jeder Prozess einen
+Bloom-Filter aller widerrufenen JTIs:
+
+    - JTI nicht im Bloom-Filter  -> sicher nicht widerrufen (kein DB-Zugriff)
+    - JTI im LRU-Cache           -> sicher widerrufen
+    - sonst (Bloom-Treffer)      -> Redis bzw. Datenbank entscheiden
+
+Beim Logout wird der JTI lokal eingetragen und per Redis Pub/Sub an alle
+anderen Worker verteilt. Zusätzlich gleicht jeder Prozess in einem festen
+Intervall neue Blacklist-Einträge aus der Datenbank ab, damit auch ohne Redis
+(oder bei verlorenen Nachrichten) alle Worker konsistent sind. IDs werden nicht
+in Commit-Reihenfolge sichtbar; der Abgleich liest deshalb zusätzlich alle
+Einträge der letzten TOKEN_REVOCATION_SYNC_OVERLAP Sekunden erneut, und
+spätestens nach TOKEN_REVOCATION_FULL_RELOAD_INTERVAL wird der Bloom-Filter
+komplett neu aufgebaut.
+
+Einträge abgelaufener Tokens werden ignoriert und periodisch (bzw. über
+`flask prune-token-blacklist`) in Batches gelöscht.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from src.models import db, TokenBlacklist
+from src.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Einfacher Bloom-Filter mit Double Hashing über blake2b."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationCache:
+    """Prozesslokaler Revocation-Cache, initialisiert über init_app()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._bloom = None
+        self._revoked = OrderedDict()  # LRU bestätigter JTIs
+        self._last_id = 0
+        self._last_created = None  # jüngstes created_at (Uhr der Datenbank)
+        self._last_sync = 0.0
+        self._last_reload = 0.0
+        self._pid = None
+        self._listener = None
+        if hasattr(os, "register_at_fork"):
+            # Locks, die beim Fork von einem anderen Thread gehalten wurden, bleiben im Kind sonst gesperrt
+            os.register_at_fork(after_in_child=self._reset_locks)
+
+    def init_app(self, app):
+        app.config.setdefault("TOKEN_REVOCATION_BLOOM_CAPACITY", 100000)
+        app.config.setdefault("TOKEN_REVOCATION_BLOOM_ERROR_RATE", 0.001)
+        app.config.setdefault("TOKEN_REVOCATION_LRU_SIZE", 10000)
+        app.config.setdefault("TOKEN_REVOCATION_SYNC_INTERVAL", 5)  # Sekunden
+        app.config.setdefault("TOKEN_REVOCATION_SYNC_OVERLAP", 60)  # Sekunden
+        app.config.setdefault("TOKEN_REVOCATION_FULL_RELOAD_INTERVAL", 300)  # Sekunden
+        app.config.setdefault("TOKEN_REVOCATION_REDIS_PREFIX", "token_blacklist:jti:")
+        app.config.setdefault("TOKEN_REVOCATION_REDIS_CHANNEL", "token_blacklist:revoked")
+        app.config.setdefault("TOKEN_BLACKLIST_PRUNE_INTERVAL", 3600)  # Sekunden, 0 = aus
+        app.config.setdefault("TOKEN_BLACKLIST_PRUNE_BATCH_SIZE", 1000)
+        app.extensions["token_revocation"] = self
+        app.cli.add_command(prune_token_blacklist_command)
+
+    # ------------------------------
+    # Öffentliche API
+    # ------------------------------
+
+    def is_revoked(self, jti):
+        """Prüft, ob ein Token widerrufen wurde."""
+        self._ensure_loaded()
+        self._maybe_sync()
+
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            if jti in self._revoked:
+                self._revoked.move_to_end(jti)
+                return True
+
+        revoked = self._lookup_redis(jti)
+        if revoked is None:
+            revoked = self._lookup_db(jti)
+        if revoked:
+            self._remember(jti)
+        return revoked
+
+    def revoke(self, jti, expires_at=None):
+        """Trägt einen (bereits in der DB gespeicherten) JTI in alle Caches ein."""
+        self._ensure_loaded()
+        with self._lock:
+            self._bloom.add(jti)
+        self._remember(jti)
+
+        client = get_redis()
+        if client is None:
+            return
+        config = current_app.config
+        # Der Redis-Eintrag läuft zusammen mit dem Token ab
+        ttl = None
+        if expires_at is not None:
+            ttl = max(int((expires_at - datetime.utcnow()).total_seconds()), 1)
+        try:
+            pipe = client.pipeline()
+            pipe.set(config["TOKEN_REVOCATION_REDIS_PREFIX"] + jti, 1, ex=ttl)
+            pipe.publish(config["TOKEN_REVOCATION_REDIS_CHANNEL"], jti)
+            pipe.execute()
+        except Exception as e:
+            # Die übrigen Worker holen den Eintrag spätestens beim nächsten Sync nach
+            logger.warning("Token revocation broadcast failed: %s", e)
+
+    def reload(self):
+        """Baut den Bloom-Filter komplett neu aus der Datenbank auf."""
+        config = current_app.config
+        rows = _active_entries().all()
+        capacity = max(config["TOKEN_REVOCATION_BLOOM_CAPACITY"], len(rows) * 2)
+        bloom = BloomFilter(capacity, config["TOKEN_REVOCATION_BLOOM_ERROR_RATE"])
+        for _, jti, _ in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._revoked.clear()
+            self._last_id = max((row_id for row_id, _, _ in rows), default=0)
+            self._last_created = max((created_at for _, _, created_at in rows), default=None)
+            self._last_sync = self._last_reload = time.monotonic()
+
+    # ------------------------------
+    # Interna
+    # ------------------------------
+
+    def _ensure_loaded(self):
+        # Lazy und fork-sicher: jeder Worker lädt beim ersten Zugriff selbst
+        if self._bloom is not None and self._pid == os.getpid():
+            return
+        with self._load_lock:
+            if self._bloom is not None and self._pid == os.getpid():
+                return
+            # _pid erst nach dem Laden setzen: bis dahin warten alle Threads hier,
+            # statt nach einem Fork den Filter des Elternprozesses zu verwenden
+            self._listener = None
+            self.reload()
+            self._pid = os.getpid()
+            self._start_listener()
+            self._start_pruner()
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _maybe_sync(self):
+        config = current_app.config
+        now = time.monotonic()
+        if now - self._last_sync < config["TOKEN_REVOCATION_SYNC_INTERVAL"]:
+            return
+        if (self._bloom.count > self._bloom.capacity
+                or now - self._last_reload >= config["TOKEN_REVOCATION_FULL_RELOAD_INTERVAL"]):
+            self.reload()
+            return
+
+        # Neue IDs plus Überlappungsfenster: eine Zeile mit kleinerer ID kann nach
+        # einer größeren committet werden und wäre über die ID allein verloren
+        condition = TokenBlacklist.id > self._last_id
+        if self._last_created is not None:
+            since = self._last_created - timedelta(seconds=config["TOKEN_REVOCATION_SYNC_OVERLAP"])
+            condition = db.or_(condition, TokenBlacklist.created_at >= since)
+        rows = _active_entries().filter(condition).all()
+        with self._lock:
+            for row_id, jti, created_at in rows:
+                # Bereits enthaltene JTIs nicht erneut zählen (count steuert den Neuaufbau)
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+                self._last_id = max(self._last_id, row_id)
+                if self._last_created is None or created_at > self._last_created:
+                    self._last_created = created_at
+            self._last_sync = time.monotonic()
+
+    def _remember(self, jti):
+        with self._lock:
+            self._revoked[jti] = True
+            self._revoked.move_to_end(jti)
+            while len(self._revoked) > current_app.config["TOKEN_REVOCATION_LRU_SIZE"]:
+                self._revoked.popitem(last=False)
+
+    def _lookup_redis(self, jti):
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            if client.exists(current_app.config["TOKEN_REVOCATION_REDIS_PREFIX"] + jti):
+                return True
+        except Exception as e:
+            logger.warning("Token revocation lookup in Redis failed: %s", e)
+        # Kein Treffer in Redis ist nicht verbindlich (z. B. nach Redis-Neustart)
+        return None
+
+    def _lookup_db(self, jti):
+        return db.session.query(
+            _active_entries().filter(TokenBlacklist.jti == jti).exists()
+        ).scalar()
+
+    def _start_listener(self):
+        """Startet den Pub/Sub-Listener, über den andere Worker Logouts melden."""
+        url = current_app.config.get("REDIS_URL")
+        if not url or self._listener is not None:
+            return
+        channel = current_app.config["TOKEN_REVOCATION_REDIS_CHANNEL"]
+        self._listener = threading.Thread(
+            target=self._listen, args=(url, channel), name="token-revocation-listener", daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self, url, channel):
+        import redis
+
+        while True:
+            try:
+                pubsub = redis.Redis.from_url(url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                for message in pubsub.listen():
+                    jti = message["data"].decode("utf-8")
+                    with self._lock:
+                        self._bloom.add(jti)
+            except Exception as e:
+                logger.warning("Token revocation listener error: %s", e)
+                time.sleep(5)
+
+    def _start_pruner(self):
+        """Startet den periodischen Pruning-Job dieses Prozesses."""
+        interval = current_app.config["TOKEN_BLACKLIST_PRUNE_INTERVAL"]
+        if not interval:
+            return
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=self._prune_periodically, args=(app, interval), name="token-blacklist-pruner", daemon=True
+        ).start()
+
+    def _prune_periodically(self, app, interval):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    if prune_expired_tokens(app.config["TOKEN_BLACKLIST_PRUNE_BATCH_SIZE"]):
+                        self.reload()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("Token blacklist pruning failed")
+                finally:
+                    db.session.remove()
+
+
+def _active_entries():
+    """Blacklist-Einträge, deren Token noch nicht abgelaufen ist."""
+    return db.session.query(TokenBlacklist.id, TokenBlacklist.jti, TokenBlacklist.created_at).filter(
+        db.or_(TokenBlacklist.expires_at.is_(None), TokenBlacklist.expires_at > datetime.utcnow())
+    )
+
+
+def prune_expired_tokens(batch_size=1000):
+    """
+    Löscht Blacklist-Einträge abgelaufener Tokens in Batches.
+    Gibt die Anzahl gelöschter Zeilen zurück.
+    """
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(TokenBlacklist.id).filter(
+            TokenBlacklist.expires_at <= datetime.utcnow()
+        ).limit(batch_size)]
+        if not ids:
+            break
+        TokenBlacklist.query.filter(TokenBlacklist.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+@click.command("prune-token-blacklist")
+@click.option("--batch-size", default=1000, show_default=True, help="Zeilen pro DELETE-Statement.")
+@with_appcontext
+def prune_token_blacklist_command(batch_size):
+    """Löscht Blacklist-Einträge abgelaufener Tokens."""
+    deleted = prune_expired_tokens(batch_size)
+    click.echo(f"Deleted {deleted} expired token_blacklist entries")
+
+
+revocation_cache = RevocationCache()
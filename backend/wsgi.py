@@ -0,0 +1,9 @@
+"""
+WSGI-Einstiegspunkt für den Produktionsbetrieb:
+
+    flask init-db
+    gunicorn --config gunicorn.conf.py wsgi:app
+"""
+from main import create_app
+
+app = create_app()
@@ -101,7 +101,8 @@ CREATE TABLE token_blacklist (
     id SERIAL PRIMARY KEY,
     jti VARCHAR(36) NOT NULL UNIQUE,
     token_type VARCHAR(10) NOT NULL CHECK (token_type IN ('access', 'refresh')),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP
 );
 
 -- Create indexes for better performance
@@ -111,6 +112,6 @@ CREATE INDEX case_criteria_criterion_id_idx ON case_criteria(criterion_id);
 CREATE INDEX case_technologies_case_id_idx ON case_technologies(case_id);
 CREATE INDEX case_technologies_technology_id_idx ON case_technologies(technology_id);
 CREATE INDEX case_rounds_case_id_idx ON case_rounds(case_id);
-CREATE INDEX evaluations_case_round_id_idx ON evaluations(case_round_id);
 CREATE INDEX evaluations_user_id_idx ON evaluations(user_id);
 CREATE INDEX evaluations_criterion_id_idx ON evaluations(criterion_id);
+CREATE INDEX ix_token_blacklist_expires_at ON token_blacklist(expires_at);